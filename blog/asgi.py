@@ -3,14 +3,31 @@ ASGI config for blog project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Under ASGI the API is served by the native async views in
+``myblog.async_views`` (see ``blog/urls_async.py``); the WSGI entry point
+keeps using ``ROOT_URLCONF``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog.settings')
 
-application = get_asgi_application()
+ASYNC_URLCONF = 'blog.urls_async'
+
+
+class BlogASGIHandler(ASGIHandler):
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = ASYNC_URLCONF
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = BlogASGIHandler()
@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from blog import sqlite
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,12 +35,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # kompresuje telo koje naprave svi ostali (myblog/compression.py)
+    'myblog.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'myblog.middleware.ReplicaMiddleware',
+    'myblog.middleware.LoadSheddingMiddleware',
 ]
 
 ROOT_URLCONF = 'blog.urls'
@@ -72,6 +78,108 @@ DATABASES = {
     }
 }
 
+# WAL, pragme i trajne konekcije (blog/sqlite.py), ukljucuje se sa BLOG_SQLITE_PERFORMANCE=1
+if sqlite.enabled(os.environ):
+    DATABASES['default'].update(sqlite.performance_settings())
+
+# replike za citanje (myblog/routers.py): {'alias': tezina}, prazno = iskljuceno.
+# Lokalno kopije SQLite fajla: BLOG_SQLITE_REPLICAS=db_replica1.sqlite3,db_replica2.sqlite3:2
+BLOG_READ_REPLICAS = {}
+for alias, database, weight in sqlite.replicas(os.environ.get('BLOG_SQLITE_REPLICAS', ''), BASE_DIR):
+    DATABASES[alias] = {**DATABASES['default'], 'NAME': database, 'TEST': {'MIRROR': 'default'}}
+    BLOG_READ_REPLICAS[alias] = weight
+
+DATABASE_ROUTERS = ['myblog.routers.ReplicaRouter']
+
+# posle pisanja klijent toliko sekundi cita sa primarne baze
+BLOG_REPLICA_PIN_SECONDS = 5
+
+# broj postova u feed-u (/api/feed.xml)
+BLOG_FEED_ITEMS = 20
+
+# trajanje API tokena u sekundama (myblog/tokens.py)
+BLOG_TOKEN_TTL = 60 * 60
+
+# token bucket ogranicenja (myblog/throttling.py): 'N/period' = kapacitet N, N novih po periodu; None = bez ogranicenja
+BLOG_RATE_LIMITS = {
+    'comment_user': '10/min',   # komentari po korisniku (anonimni po IP adresi)
+    'comment_ip': '30/min',     # komentari po IP adresi
+    'comment': '600/min',       # svi komentari zajedno
+    'login_user': '5/min',      # prijave po korisnickom imenu
+    'login_ip': '20/min',       # prijave po IP adresi
+    'login': '120/min',         # sve prijave zajedno
+}
+
+# najvise toliko istovremenih PBKDF2 hesiranja po procesu (myblog/hashers.py),
+# ostali cekaju do BLOG_PASSWORD_HASH_WAIT sekundi pa dobijaju 503
+BLOG_PASSWORD_HASH_CONCURRENCY = 4
+BLOG_PASSWORD_HASH_WAIT = 2
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    # verzije, brojaci pregleda, tiketi
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'myblog',
+    },
+    # tela odgovora, odvojeno da zahtevi sa novim parametrima ne istiskuju ostalo
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'myblog-responses',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    # kante ogranicenja zahteva (myblog/throttling.py), samo one, pa ih drugi kljucevi ne istiskuju
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'myblog-throttle',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# kes za postove i komentare (myblog/cache.py); tela odgovora idu u BLOG_RESPONSE_CACHE_ALIAS
+BLOG_CACHE_ALIAS = 'default'
+BLOG_RESPONSE_CACHE_ALIAS = 'responses'
+BLOG_THROTTLE_CACHE_ALIAS = 'throttle'
+BLOG_CACHE_TIMEOUT = 60 * 60
+
+# masovni unos (myblog/bulk.py)
+BLOG_BULK_BATCH_SIZE = 500
+BLOG_BULK_MAX_ITEMS = 5000
+
+# izvoz (myblog/export.py): broj postova po upitu
+BLOG_EXPORT_BATCH_SIZE = 500
+
+# brojac pregleda (myblog/viewcounts.py): upis u bazu na toliko sekundi ili pregleda
+BLOG_VIEW_FLUSH_SECONDS = 10
+BLOG_VIEW_FLUSH_MAX = 1000
+# i GET sa odgovorom 304 (klijent ili CDN proverava kesiranu kopiju) je pregled
+BLOG_VIEWS_COUNT_REVALIDATIONS = True
+
+# write-behind unos komentara (myblog/ingest.py): POST vraca 202 i tiket, a
+# komentari se upisuju u serijama od BLOG_INGEST_BATCH_SIZE ili posle BLOG_INGEST_FLUSH_MS
+BLOG_COMMENT_INGEST = False
+BLOG_INGEST_BATCH_SIZE = 200
+BLOG_INGEST_FLUSH_MS = 50
+BLOG_INGEST_MAX_QUEUE = 10000     # pun red -> 503
+BLOG_INGEST_WAIT_TIMEOUT = 5      # najduze cekanje za ?wait=1, posle toga 202
+
+# kompresija odgovora (myblog/compression.py): gzip, br kad je instaliran brotli
+BLOG_COMPRESS_MIN_SIZE = 1024     # manja tela idu nekompresovana
+BLOG_GZIP_LEVEL = 6
+BLOG_BROTLI_QUALITY = 5
+
+
+PASSWORD_HASHERS = [
+    'myblog.hashers.BoundedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -117,6 +225,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DATETIME_FORMAT' : "%Y-%m-%d %H:%M",
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'myblog.authentication.SignedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'myblog.pagination.KeysetPagination',
+    # orjson kad je instaliran, isti izlaz kao DRF-ov JSONRenderer/JSONParser (myblog/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'myblog.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'myblog.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'PAGE_SIZE': 20,
 }
 
 SPECTACULAR_SETTINGS = {
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from django.urls import path, include
+
+# URLconf za ASGI (blog/asgi.py), API ide na async view-ove
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/', include('myblog.urls_async')),
+]
@@ -0,0 +1,172 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import compression, conditional, documents, fastread, viewcounts, views
+from .cache import acached_post_entry
+from .models import BlogPost, Comment
+from .renderers import FastJSONRenderer
+from .serializer import ComSerializer
+
+
+# Async varijante view-ova za ASGI (blog/asgi.py ih ukljucuje preko
+# blog/urls_async.py). GET ide kroz async ORM, bez prelaska u thread.
+# Sve ostale metode (pisanje) i zahtevi sa Authorization zaglavljem idu u
+# postojeci sinhroni DRF view, pa su autentifikacija (i 401 za los token),
+# CSRF i dozvole potpuno iste kao pod WSGI-jem. Sesija u GET-u ne menja
+# odgovor (SessionAuthentication ne odbija bezbedne metode). Isto vazi i za
+# zahteve koji ne traze obican JSON (?format=api, Accept: text/html,
+# indent, nepodrzan Accept -> 406): renderer bira DRF.
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+def renders_json(request):
+    # isti izbor renderer-a kao u DRF view-u (Accept i ?format=)
+    renderers = [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]
+    try:
+        renderer, media_type = DefaultContentNegotiation().select_renderer(Request(request), renderers)
+    except NotAcceptable:
+        return False
+    return isinstance(renderer, FastJSONRenderer) and renderer.get_indent(media_type, {}) is None
+
+
+def needs_drf(request):
+    return (
+        request.method not in READ_METHODS
+        or 'HTTP_AUTHORIZATION' in request.META
+        or not renders_json(request)
+    )
+
+
+def render(data, status=status.HTTP_200_OK):
+    # isti JSON kao renderer u sinhronim view-ovima
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def render_cached(key, data):
+    # gzip iz kesa kao u sinhronim view-ovima (views.cached_gzip); middleware ga
+    # poziva u thread-u (sync_to_async), pa sinhroni kes ne blokira event loop
+    return compression.precompressed(render(data), {'gzip': lambda: views.cached_gzip(key, data)})
+
+
+def api_errors(view):
+    # greske iz paginacije (npr. neispravan kursor) kao u DRF-u
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            return render({'detail': exc.detail}, status=exc.status_code)
+    return inner
+
+
+_drf_blogposts = sync_to_async(views.blogposts)
+_drf_post_details = sync_to_async(views.post_details)
+_drf_comments = sync_to_async(views.comments)
+_drf_comments_details = sync_to_async(views.comments_details)
+
+
+async def _post_with_comments_data(request, pk, fields=None):
+    post = await BlogPost.objects.select_related('author').aget(id=pk)
+    paginator = views.comment_paginator(request)
+    comms = await paginator.apaginate_queryset(views.post_comments_query(pk, paginator), request)
+    return views.post_with_comments_payload(post, comms, paginator, fields)
+
+
+@csrf_exempt
+@conditional.async_condition(
+    conditional.aposts_state,
+    etag_func=conditional.posts_etag,
+    last_modified_func=conditional.posts_last_modified,
+)
+@api_errors
+async def blogposts(request):
+    if needs_drf(request):
+        return await _drf_blogposts(request)
+
+    request = Request(request)
+    fields = views.requested_fields(request)
+    paginator = views.post_paginator(request)
+    post_list, serializer_class = views.post_list_query(fields, paginator)
+
+    post_list = await paginator.apaginate_queryset(post_list, request)
+    data = fastread.to_dicts(post_list, serializer_class, fields)
+    ids = [row['id'] for row in post_list]
+    return render(paginator.get_paginated_response(viewcounts.with_current_views(data, ids)).data)
+
+
+@csrf_exempt
+@conditional.acounts_view(conditional.adocument_state)
+@conditional.async_condition(
+    conditional.adocument_state,
+    etag_func=conditional.document_etag,
+    last_modified_func=conditional.document_last_modified,
+)
+@api_errors
+async def post_details(request, pk):
+    if needs_drf(request):
+        return await _drf_post_details(request, pk)
+
+    if documents.can_serve(request):
+        doc = await documents.adocument_for(pk, conditional.document_state(request, pk))
+        if doc is not None:
+            return documents.response(request, doc, await conditional.aview_count(request, pk))
+
+    request = Request(request)
+    try:
+        key, data = await acached_post_entry(pk, 'detail', request, lambda: _post_with_comments_data(
+            request, pk, fields=views.requested_fields(request)
+        ))
+    except BlogPost.DoesNotExist:
+        return render({'details': 'Post ne postoji!'}, status=status.HTTP_404_NOT_FOUND)
+
+    return render_cached(key, views.with_views(data, await conditional.aview_count(request, pk)))
+
+
+@csrf_exempt
+@conditional.async_condition(
+    conditional.apost_state,
+    etag_func=conditional.post_etag,
+    last_modified_func=conditional.post_last_modified,
+)
+@api_errors
+async def comments(request, pk):
+    if needs_drf(request):
+        return await _drf_comments(request, pk)
+
+    request = Request(request)
+    try:
+        key, data = await acached_post_entry(pk, 'comments', request, lambda: _post_with_comments_data(
+            request, pk
+        ))
+    except BlogPost.DoesNotExist:
+        return render({'detail': 'Post ne postoji!'}, status=status.HTTP_404_NOT_FOUND)
+
+    return render_cached(key, views.with_views(data))
+
+
+@csrf_exempt
+@conditional.async_condition(
+    conditional.acomment_state,
+    etag_func=conditional.comment_etag,
+    last_modified_func=conditional.comment_last_modified,
+)
+@api_errors
+async def comments_details(request, id):
+    if needs_drf(request):
+        return await _drf_comments_details(request, id)
+
+    try:
+        com = await Comment.objects.select_related('author').aget(id=id)
+    except Comment.DoesNotExist:
+        return render({'detail': 'Komentar ne postoji!'}, status=status.HTTP_404_NOT_FOUND)
+
+    return render(ComSerializer(com).data)
@@ -0,0 +1,24 @@
+from rest_framework import authentication, exceptions
+
+from .tokens import InvalidToken, read_token, token_user
+
+
+class SignedTokenAuthentication(authentication.BaseAuthentication):
+    """Authorization: Bearer <token> iz /api/login_token/, korisnik se ne cita iz baze."""
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        header = authentication.get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise exceptions.AuthenticationFailed('Neispravno Authorization zaglavlje.')
+
+        try:
+            payload = read_token(header[1].decode('ascii'))
+        except (InvalidToken, UnicodeError) as exc:
+            raise exceptions.AuthenticationFailed(str(exc) if isinstance(exc, InvalidToken) else 'Neispravan token.')
+        return token_user(payload), payload
+
+    def authenticate_header(self, request):
+        return self.keyword
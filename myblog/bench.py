@@ -0,0 +1,315 @@
+import asyncio
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from importlib import import_module
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.db import connections
+from django.test import override_settings
+from django.utils.crypto import get_random_string
+
+
+# Jednostavan benchmark unutar procesa: isti zahtevi idu kroz WSGI handler
+# (thread pool, kao gunicorn sa thread-ovima) i kroz ASGI aplikaciju
+# (jedan event loop), pa se porede broj zahteva u sekundi i latencije.
+# Mreza i serveri nisu ukljuceni, meri se samo Django deo.
+
+HOST = 'localhost'
+
+
+def wsgi_request(handler, path, query='', method='GET', body=b'', headers=None):
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_ACCEPT': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if body:
+        environ['CONTENT_TYPE'] = 'application/json'
+    environ.update(headers or {})
+    result = {}
+
+    def start_response(status, headers, exc_info=None):
+        result['status'] = int(status.split()[0])
+
+    body = handler(environ, start_response)
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return result['status']
+
+
+async def asgi_request(application, path, query=''):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('ascii'),
+        'query_string': query.encode('ascii'),
+        'headers': [(b'host', HOST.encode('ascii')), (b'accept', b'application/json')],
+        'server': (HOST, 80),
+        'client': ('127.0.0.1', 50000),
+    }
+    result = {}
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # klijent ne prekida vezu dok odgovor ne stigne
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            result['status'] = message['status']
+
+    await application(scope, receive, send)
+    return result['status']
+
+
+def summarize(latencies, elapsed, statuses, queries=None):
+    # odbijeni zahtevi (429) su svoja kolona i ne ulaze u latencije, upite ni greske
+    served = [i for i, code in enumerate(statuses) if code != 429]
+    latencies = sorted(latencies[i] for i in served) or [0.0]
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    result = {
+        'requests': len(served),
+        'rps': len(served) / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': quantiles[94] * 1000,
+        'p99_ms': quantiles[98] * 1000,
+        'errors': sum(1 for i in served if statuses[i] >= 400),
+        'throttled': len(statuses) - len(served),
+    }
+    if queries is not None:
+        result['queries_per_request'] = sum(queries[i] for i in served) / len(served) if served else 0.0
+    return result
+
+
+def run_wsgi(handler, path, query='', requests=1000, concurrency=50):
+    def one(_):
+        start = time.perf_counter()
+        code = wsgi_request(handler, path, query)
+        return time.perf_counter() - start, code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return summarize([r[0] for r in results], elapsed, [r[1] for r in results])
+
+
+def run_asgi(application, path, query='', requests=1000, concurrency=50):
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                code = await asgi_request(application, path, query)
+                return time.perf_counter() - start, code
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(requests)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(main())
+    return summarize([r[0] for r in results], elapsed, [r[1] for r in results])
+
+
+# Mesovito opterecenje: svaki zahtev je jedan od scenarija ispod, izabran
+# po tezini iz random.Random(seed), pa je redosled isti iz pokretanja u
+# pokretanje. Pisanja idu kao prijavljen korisnik (sesija + CSRF token).
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    query: str = ''
+    body: dict = None
+    weight: int = 1
+
+
+def default_scenarios(post_id, comment_id):
+    return [
+        Scenario('blogposts', 'GET', '/api/blogposts/', weight=20),
+        Scenario('blogposts_fields', 'GET', '/api/blogposts/', 'fields=id,title,author_username', weight=5),
+        Scenario('post_details', 'GET', f'/api/blogposts/{post_id}/', weight=30),
+        Scenario('comments', 'GET', f'/api/blogposts/{post_id}/comments/', weight=15),
+        Scenario('comments_details', 'GET', f'/api/comments/{comment_id}/', weight=10),
+        Scenario('search', 'GET', '/api/search/', 'q=blog', weight=5),
+        Scenario('comment_post', 'POST', f'/api/blogposts/{post_id}/comments/',
+                 body={'content': 'Komentar iz benchmarka'}, weight=10),
+        Scenario('comment_edit', 'PUT', f'/api/comments/{comment_id}/',
+                 body={'content': 'Izmenjen komentar iz benchmarka'}, weight=5),
+    ]
+
+
+def login_headers(user):
+    # sesija kao posle login(), bez hesiranja lozinke u svakom zahtevu
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    csrf_token = get_random_string(32)
+    return {
+        'HTTP_COOKIE': f'{settings.SESSION_COOKIE_NAME}={session.session_key}; {settings.CSRF_COOKIE_NAME}={csrf_token}',
+        'HTTP_X_CSRFTOKEN': csrf_token,
+    }
+
+
+def run_mixed(handler, scenarios, requests=1000, concurrency=20, seed=0, headers=None, rate_limits=False):
+    """
+    Pusta `requests` zahteva kroz WSGI `handler` sa `concurrency` thread-ova.
+    Vraca {'total': {...}, 'endpoints': {ime scenarija: {...}}} sa req/s,
+    p50/p95/p99 (ms), brojem gresaka, brojem odbijenih (429) i prosecnim
+    brojem SQL upita po zahtevu. Bez `rate_limits` ogranicenja zahteva su
+    iskljucena, jer bi jedan korisnik vecinu novih komentara dobio kao 429
+    i merio bi se limiter, a ne upis.
+    """
+    rng = random.Random(seed)
+    plan = rng.choices(scenarios, weights=[scenario.weight for scenario in scenarios], k=requests)
+    local = threading.local()
+
+    def count_queries(execute, sql, params, many, context):
+        local.queries += 1
+        return execute(sql, params, many, context)
+
+    def one(scenario):
+        body = json.dumps(scenario.body).encode('utf-8') if scenario.body is not None else b''
+        local.queries = 0
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            # upiti na svim bazama (i replikama)
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(count_queries))
+            code = wsgi_request(handler, scenario.path, scenario.query, scenario.method, body, headers)
+        return scenario.name, time.perf_counter() - start, code, local.queries
+
+    # greske (npr. zakljucana SQLite baza) se broje, ne ispisuju
+    request_logger = logging.getLogger('django.request')
+    disabled, request_logger.disabled = request_logger.disabled, True
+    start = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            if not rate_limits:
+                stack.enter_context(override_settings(BLOG_RATE_LIMITS={}))
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(one, plan))
+    finally:
+        request_logger.disabled = disabled
+    elapsed = time.perf_counter() - start
+
+    by_name = defaultdict(list)
+    for result in results:
+        by_name[result[0]].append(result)
+    return {
+        'total': summarize([r[1] for r in results], elapsed, [r[2] for r in results], [r[3] for r in results]),
+        'endpoints': {
+            name: summarize([r[1] for r in rows], elapsed, [r[2] for r in rows], [r[3] for r in rows])
+            for name, rows in sorted(by_name.items())
+        },
+    }
+
+
+def compare(baseline, current):
+    # promena u procentima po endpointu, pozitivno je bolje za rps, negativno za latenciju
+    diff = {}
+    for name, result in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        diff[name] = {
+            key: (result[key] - before[key]) / before[key] * 100 if before[key] else None
+            for key in ('rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+            if key in result and key in before
+        }
+    return diff
+
+
+# Serijalizacija bez HTTP-a: ista lista kroz ModelSerializer i kroz brzi put
+# (.values() + fastread.to_dicts), najbolje od `repeat` merenja.
+
+def time_best(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare_reads(queryset, serializer_class, rows=1000, repeat=5, fields=None):
+    from . import fastread
+
+    queryset = queryset.order_by('-id')[:rows]
+    related = [lookup.split('__')[0] for _, lookup, _ in fastread.columns(serializer_class, fields) if '__' in lookup]
+
+    kwargs = {} if fields is None else {'fields': fields}
+
+    def serializer_path():
+        return serializer_class(list(queryset.select_related(*related)), many=True, **kwargs).data
+
+    def fast_path():
+        return fastread.to_dicts(list(fastread.values(queryset, serializer_class, fields)), serializer_class, fields)
+
+    count = len(fast_path())
+    slow, fast = time_best(serializer_path, repeat), time_best(fast_path, repeat)
+    return {
+        'rows': count,
+        'serializer_ms': slow * 1000,
+        'values_ms': fast * 1000,
+        'speedup': slow / fast if fast else None,
+    }
+
+
+# JSON renderer i parser: isti payload kroz DRF-ov JSONRenderer/JSONParser
+# (standardni json) i kroz FastJSONRenderer/FastJSONParser (orjson).
+
+def compare_json(data, repeat=5):
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from .parsers import FastJSONParser
+    from .renderers import FastJSONRenderer
+
+    body = JSONRenderer().render(data)
+    if FastJSONRenderer().render(data) != body:
+        raise AssertionError('FastJSONRenderer ne daje iste bajtove kao JSONRenderer')
+    timings = {}
+    for name, renderer, parser in (('json', JSONRenderer(), JSONParser()), ('fast', FastJSONRenderer(), FastJSONParser())):
+        timings[f'{name}_render_ms'] = time_best(lambda: renderer.render(data), repeat) * 1000
+        timings[f'{name}_parse_ms'] = time_best(lambda: parser.parse(BytesIO(body)), repeat) * 1000
+    return {'bytes': len(body), **timings}
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import transaction
+
+from .cache import invalidate_feed, invalidate_posts
+from .counters import comment_added
+from .models import BlogPost, Comment, make_excerpt
+
+
+# Masovno pravljenje postova i komentara. bulk_create ne poziva save() niti
+# salje signale, pa se ovde rucno racuna excerpt, azuriraju brojaci komentara
+# i ponistava kes.
+
+def get_batch_size():
+    return getattr(settings, 'BLOG_BULK_BATCH_SIZE', 500)
+
+
+def get_max_items():
+    return getattr(settings, 'BLOG_BULK_MAX_ITEMS', 5000)
+
+
+def validate_items(serializer_class, items, context=None):
+    """
+    Validira listu sa `many=True` serializerom. Vraca (validated_data, errors),
+    gde su errors recnici {'index': i, 'errors': {...}} za neispravne stavke.
+    Ispravne stavke se ne odbacuju zbog neispravnih.
+    """
+    serializer = serializer_class(data=items, many=True, max_length=get_max_items(), context=context or {})
+    if serializer.is_valid():
+        return serializer.validated_data, []
+
+    # starije verzije DRF-a vracaju listu (prazan recnik za ispravne stavke),
+    # novije recnik {indeks: greske} samo za neispravne
+    item_errors = serializer.errors
+    if isinstance(item_errors, list):
+        item_errors = {index: errors for index, errors in enumerate(item_errors) if errors}
+    elif not all(isinstance(index, int) for index in item_errors):
+        # nije lista ili je predugacka, nema smisla po stavkama
+        return [], [{'index': None, 'errors': item_errors}]
+
+    errors = [{'index': index, 'errors': item_errors[index]} for index in sorted(item_errors)]
+    valid = [item for index, item in enumerate(items) if index not in item_errors]
+    serializer = serializer_class(data=valid, many=True, context=context or {})
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data, errors
+
+
+def create_posts(author, validated_data):
+    posts = [
+        BlogPost(author=author, excerpt=make_excerpt(data['content']), **data)
+        for data in validated_data
+    ]
+    with transaction.atomic():
+        BlogPost.objects.bulk_create(posts, batch_size=get_batch_size())
+    invalidate_posts()
+    invalidate_feed()
+    return posts
+
+
+def create_comments(author, blog_post_id, validated_data):
+    comms = [
+        Comment(author=author, blog_post_id=blog_post_id, **data)
+        for data in validated_data
+    ]
+    with transaction.atomic():
+        Comment.objects.bulk_create(comms, batch_size=get_batch_size())
+        times = [com.created_at for com in comms]
+        comment_added(blog_post_id, max(times), count=len(comms), first_at=min(times))
+    return comms
@@ -0,0 +1,202 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .routers import use_primary
+
+
+# kes odgovora po postu; svaki post ima svoju "verziju" u kesu i pri
+# svakoj promeni posta ili komentara verzija se menja, pa stari kljucevi
+# vise nikad nisu procitani i sami isticu
+#
+# Verzija se menja tek posle commit-a izmene (transaction.on_commit; van
+# transakcije odmah). Da se menja pre commit-a, zahtev izmedju invalidacije
+# i commit-a bi procitao stare redove i upisao ih pod novu verziju.
+
+def get_cache():
+    return caches[getattr(settings, 'BLOG_CACHE_ALIAS', 'default')]
+
+
+def get_response_cache():
+    # tela odgovora (po postu i parametrima, feed, gzip) imaju svoj alias: svaki
+    # nov upit je nov kljuc, pa ne smeju da istiskuju verzije, brojace i tikete
+    alias = getattr(settings, 'BLOG_RESPONSE_CACHE_ALIAS', None)
+    return caches[alias] if alias else get_cache()
+
+
+def get_timeout():
+    return getattr(settings, 'BLOG_CACHE_TIMEOUT', 60 * 60)
+
+
+def version_key(pk):
+    return f'myblog:post:{pk}:version'
+
+
+def _version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def _aversion(key):
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def post_version(pk):
+    return _version(version_key(pk))
+
+
+async def apost_version(pk):
+    return await _aversion(version_key(pk))
+
+
+def version_time(version):
+    # verzija je time_ns() poslednje izmene, pa je ujedno i vreme izmene
+    # (i brisanja, koje ne ostavlja update_at); hladan kes daje sadasnje vreme
+    return datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+
+
+POSTS_VERSION_KEY = 'myblog:posts:version'
+
+
+# verzija liste postova, menja se kad se bilo koji post doda, izmeni ili obrise
+def posts_version():
+    return _version(POSTS_VERSION_KEY)
+
+
+async def aposts_version():
+    return await _aversion(POSTS_VERSION_KEY)
+
+
+def bump(key):
+    # nova verzija (time_ns) posle commit-a trenutne transakcije
+    transaction.on_commit(lambda: get_cache().set(key, time.time_ns(), timeout=None))
+
+
+def invalidate_posts():
+    bump(POSTS_VERSION_KEY)
+
+
+FEED_VERSION_KEY = 'myblog:feed:version'
+
+
+# verzija feed-a, menja se samo kad se post doda, izmeni ili obrise
+# (ne i kad se promene komentari, kao kod liste postova)
+def feed_version():
+    return _version(FEED_VERSION_KEY)
+
+
+def invalidate_feed():
+    bump(FEED_VERSION_KEY)
+
+
+def _query_digest(request):
+    # linkovi strana komentara (comments_next/previous) su apsolutni, pa i
+    # sema i host ulaze u kljuc (kao feed_key)
+    query = ''
+    if request is not None:
+        query = f'{request.scheme}://{request.get_host()}?{request.GET.urlencode()}'
+    return hashlib.md5(query.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def response_key(pk, kind, request=None):
+    return f'myblog:post:{pk}:{post_version(pk)}:{kind}:{_query_digest(request)}'
+
+
+async def aresponse_key(pk, kind, request=None):
+    version = await _aversion(version_key(pk))
+    return f'myblog:post:{pk}:{version}:{kind}:{_query_digest(request)}'
+
+
+def invalidate_post(pk):
+    bump(version_key(pk))
+
+
+def cached_post_data(pk, kind, request, build):
+    """
+    Vraca podatke odgovora iz kesa ili ih pravi pozivom `build()` i kesira.
+    Izuzeci iz `build` (npr. DoesNotExist) prolaze dalje i nista se ne kesira.
+    """
+    return cached_post_entry(pk, kind, request, build)[1]
+
+
+def cached_post_entry(pk, kind, request, build):
+    # (kljuc, podaci): uz podatke se pod istim kljucem kesira i gzip odgovora
+    cache = get_response_cache()
+    key = response_key(pk, kind, request)
+    data = cache.get(key)
+    if data is not None:
+        _count('hits')
+        return key, data
+
+    _count('misses')
+    # kes dele svi klijenti, pa se pravi sa primarne baze (replika moze da kasni)
+    with use_primary():
+        data = build()
+    cache.set(key, data, get_timeout())
+    return key, data
+
+
+async def acached_post_data(pk, kind, request, abuild):
+    # isto kao cached_post_data, za async view-ove; `abuild` je korutina
+    return (await acached_post_entry(pk, kind, request, abuild))[1]
+
+
+async def acached_post_entry(pk, kind, request, abuild):
+    cache = get_response_cache()
+    key = await aresponse_key(pk, kind, request)
+    data = await cache.aget(key)
+    if data is not None:
+        await _acount('hits')
+        return key, data
+
+    await _acount('misses')
+    with use_primary():
+        data = await abuild()
+    await cache.aset(key, data, get_timeout())
+    return key, data
+
+
+def _count(name):
+    cache = get_cache()
+    key = f'myblog:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+async def _acount(name):
+    cache = get_cache()
+    key = f'myblog:stats:{name}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            await cache.aincr(key)
+
+
+def cache_stats():
+    cache = get_cache()
+    stats = cache.get_many(['myblog:stats:hits', 'myblog:stats:misses'])
+    return {
+        'hits': stats.get('myblog:stats:hits', 0),
+        'misses': stats.get('myblog:stats:misses', 0),
+    }
+
+
+def reset_cache_stats():
+    get_cache().delete_many(['myblog:stats:hits', 'myblog:stats:misses'])
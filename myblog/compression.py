@@ -0,0 +1,151 @@
+import gzip
+import struct
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # bez brotli-ja samo gzip
+    brotli = None
+
+
+# Kompresija odgovora (CompressionMiddleware u myblog/middleware.py):
+# coding se bira po Accept-Encoding zahteva (q vrednosti), br kad je
+# instaliran brotli, inace gzip. Odgovor moze da ponese vec kompresovane
+# varijante tela (precompressed), pa se telo iz kesa ne kompresuje pri svakom
+# zahtevu: feed cuva kompresovan XML uz sirov, a dokument posta i ostali
+# kesirani odgovori posta (views.cached_gzip) kesiraju kompresovane staticke
+# delove i u gzip umecu samo broj pregleda (i link).
+
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'  # bez imena i vremena (mtime 0)
+
+# samo API (JSON) i feed (XML). HTML (login, browsable API) se ne kompresuje:
+# CSRF token i sesija uz vracen unos korisnika su BREACH napad na kompresiju.
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/xml',
+    'application/x-ndjson', 'application/atom+xml', 'application/rss+xml',
+}
+
+
+def get_min_size():
+    return getattr(settings, 'BLOG_COMPRESS_MIN_SIZE', 1024)
+
+
+def get_gzip_level():
+    return getattr(settings, 'BLOG_GZIP_LEVEL', 6)
+
+
+def get_brotli_quality():
+    return getattr(settings, 'BLOG_BROTLI_QUALITY', 5)
+
+
+def available_codings():
+    # redosled je prednost servera kad klijent prihvata vise sa istim q
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compressible_type(content_type):
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith(('+json', '+xml'))
+
+
+def parse_accept_encoding(header):
+    """'gzip;q=0.5, br' -> {'gzip': 0.5, 'br': 1.0}"""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted['gzip' if coding == 'x-gzip' else coding] = q
+    return accepted
+
+
+def negotiate(header, codings=None, prefer=()):
+    """
+    Coding iz `codings` (podrazumevano svi dostupni) sa najvecim q iz
+    Accept-Encoding, ili None kad klijent ne prihvata nijedan. Kod istog q
+    prednost imaju `prefer` (vec kompresovano telo), pa redosled `codings`.
+    """
+    codings = available_codings() if codings is None else codings
+    accepted = parse_accept_encoding(header or '')
+    best, best_rank = None, None
+    for position, coding in enumerate(codings):
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q <= 0:
+            continue
+        rank = (q, coding in prefer, -position)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = coding, rank
+    return best
+
+
+def compress(body, coding):
+    if coding == 'br':
+        return brotli.compress(body, quality=get_brotli_quality())
+    return gzip.compress(body, compresslevel=get_gzip_level(), mtime=0)
+
+
+def compress_all(body):
+    # sve varijante za telo koje se kesira; malo telo se ne kompresuje
+    if len(body) < get_min_size():
+        return {}
+    return {coding: compress(body, coding) for coding in available_codings()}
+
+
+def precompressed(response, variants):
+    """
+    Pridruzuje odgovoru vec kompresovana tela: coding -> bytes ili funkcija
+    koja ih pravi (poziva se samo ako klijent izabere taj coding).
+    """
+    response.precompressed = variants
+    return response
+
+
+# gzip od delova: svaki staticki deo je zaseban deflate (bez referenci na
+# prethodne bajtove, poravnat na bajt), pa se izmedju njih moze umetnuti
+# nekompresovan blok sa vrednoscu koja se menja po zahtevu. CRC32 i duzina se
+# racunaju nad celim telom, rezultat je obican gzip.
+
+def deflate_part(data, last=False):
+    compressor = zlib.compressobj(get_gzip_level(), zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def stored_blocks(data):
+    # deflate blokovi bez kompresije (BFINAL=0, BTYPE=00), do 65535 bajtova po bloku
+    blocks = []
+    for start in range(0, len(data), 0xffff):
+        chunk = data[start:start + 0xffff]
+        blocks.append(b'\x00' + struct.pack('<HH', len(chunk), len(chunk) ^ 0xffff) + chunk)
+    return b''.join(blocks)
+
+
+def deflate_parts(parts):
+    return [deflate_part(part, last=i == len(parts) - 1) for i, part in enumerate(parts)]
+
+
+def gzip_splice(parts, deflated, values):
+    """
+    gzip za parts[0] + values[0] + parts[1] + ... + parts[-1], gde je
+    `deflated` rezultat deflate_parts(parts) (kesiran).
+    """
+    crc, size, out = 0, 0, [GZIP_HEADER]
+    for i, part in enumerate(parts):
+        if i:
+            value = values[i - 1]
+            crc, size = zlib.crc32(value, crc), size + len(value)
+            out.append(stored_blocks(value))
+        crc, size = zlib.crc32(part, crc), size + len(part)
+        out.append(deflated[i])
+    out.append(struct.pack('<II', crc, size & 0xffffffff))
+    return b''.join(out)
@@ -0,0 +1,257 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import Max
+from django.views.decorators.http import condition
+
+from .cache import apost_version, aposts_version, post_version, posts_version, version_time
+from . import documents, viewcounts
+from .feeds import cached_feed
+from .models import BlogPost, Comment
+
+
+# ETag / Last-Modified za django.views.decorators.http.condition.
+# Stanje resursa se racuna jednim upitom i pamti na requestu, tako da ga
+# etag i last_modified funkcije dele. Racuna se samo za GET/HEAD.
+#
+# Brisanje posta ili komentara ne pomera MAX(update_at), pa Last-Modified
+# uzima u obzir i verziju iz kesa (vreme poslednje invalidacije). Tako
+# If-Modified-Since posle brisanja daje 200, a ne zastareli 304.
+#
+# Lista, post i komentari posta u telu imaju trenutni broj pregleda, koji
+# ne ulazi u stanje, pa je njihov ETag slab (W/"...").
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _state(request, compute):
+    if request.method not in SAFE_METHODS:
+        return None
+    if not hasattr(request, '_blog_state'):
+        request._blog_state = compute()
+    return request._blog_state
+
+
+def _etag(request, *parts, weak=False):
+    # isti resurs u drugom formatu ili sa drugim parametrima je druga reprezentacija
+    raw = '|'.join(str(part) for part in (*parts, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')))
+    etag = '"%s"' % hashlib.md5(raw.encode('utf-8'), usedforsecurity=False).hexdigest()
+    return 'W/' + etag if weak else etag
+
+
+def _latest(*dates):
+    dates = [date for date in dates if date is not None]
+    return max(dates) if dates else None
+
+
+def async_condition(astate_func, etag_func=None, last_modified_func=None):
+    """
+    `condition` za async view-ove: stanje se prvo racuna async ORM-om
+    (`astate_func(request, ...)`) i pamti na requestu, pa sinhrone
+    etag/last_modified funkcije ne idu u bazu.
+    """
+    def decorator(view):
+        conditioned = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view)
+
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            if request.method in SAFE_METHODS and not hasattr(request, '_blog_state'):
+                request._blog_state = await astate_func(request, *args, **kwargs)
+            return await conditioned(request, *args, **kwargs)
+        return inner
+    return decorator
+
+
+def _posts_aggregates():
+    return {'last_update': Max('update_at')}
+
+
+def posts_state(request):
+    # MAX(update_at) ide preko indeksa; brisanje posta ne menja MAX, pa
+    # u ETag ulazi i verzija liste iz kesa koju signali menjaju
+    return _state(request, lambda: {
+        **BlogPost.objects.aggregate(**_posts_aggregates()),
+        'version': posts_version(),
+    })
+
+
+async def aposts_state(request):
+    return {
+        **await BlogPost.objects.aaggregate(**_posts_aggregates()),
+        'version': await aposts_version(),
+    }
+
+
+def posts_etag(request):
+    state = posts_state(request)
+    if state is None:
+        return None
+    return _etag(request, state['last_update'], state['version'], weak=True)
+
+
+def posts_last_modified(request):
+    state = posts_state(request)
+    if state is None:
+        return None
+    return _latest(state['last_update'], version_time(state['version']))
+
+
+# feed: stanje je gotov feed iz kesa, pa je 304 bez upita u bazu
+def feed_state(request):
+    return _state(request, lambda: cached_feed(request, feed_format(request)))
+
+
+def feed_format(request):
+    return 'rss' if request.GET.get('format') == 'rss' else 'atom'
+
+
+def feed_etag(request):
+    state = feed_state(request)
+    return state and state['etag']
+
+
+def feed_last_modified(request):
+    state = feed_state(request)
+    return state and state['last_modified']
+
+
+# stanje posta je jedan red po primarnom kljucu: brojaci komentara su
+# denormalizovani (myblog/counters.py), a izmenu komentara (koja ne menja
+# post) pokazuje verzija posta iz kesa
+POST_STATE = {
+    'last_update': 'update_at',
+    'comms': 'comment_count',
+    'last_comment': 'last_comment_at',
+}
+
+
+def _post_row(qs, document):
+    columns = POST_STATE.values()
+    if document:
+        # gotov dokument detalja u istom upitu (LEFT JOIN po primarnom kljucu)
+        columns = [*columns, *documents.ROW_COLUMNS]
+    return qs.values(*columns)
+
+
+def _post_state(qs, row, version, document):
+    # baza sa koje je stanje procitano; gotov dokument se cita sa iste
+    state = {name: row and row[column] for name, column in POST_STATE.items()}
+    state.update(version=version, alias=qs.db)
+    if document:
+        state['document'] = documents.from_row(row)
+    return state
+
+
+def post_state(request, pk):
+    qs = BlogPost.objects.filter(id=pk)
+    return _state(request, lambda: _post_state(qs, _post_row(qs, False).first(), post_version(pk), False))
+
+
+async def apost_state(request, pk):
+    qs = BlogPost.objects.filter(id=pk)
+    return _post_state(qs, await _post_row(qs, False).afirst(), await apost_version(pk), False)
+
+
+def document_state(request, pk):
+    # stanje za detalj posta, uz dokument kad moze da bude odgovor (documents.with_state)
+    qs = BlogPost.objects.filter(id=pk)
+    document = documents.with_state(request)
+    return _state(request, lambda: _post_state(qs, _post_row(qs, document).first(), post_version(pk), document))
+
+
+async def adocument_state(request, pk):
+    qs = BlogPost.objects.filter(id=pk)
+    document = documents.with_state(request)
+    return _post_state(qs, await _post_row(qs, document).afirst(), await apost_version(pk), document)
+
+
+def _post_etag(request, state):
+    if state is None or state['last_update'] is None:
+        return None
+    return _etag(
+        request, state['last_update'], state['comms'], state['last_comment'], state['version'], weak=True
+    )
+
+
+def _post_last_modified(state):
+    if state is None or state['last_update'] is None:
+        return None
+    return _latest(state['last_update'], state['last_comment'], version_time(state['version']))
+
+
+def post_etag(request, pk):
+    return _post_etag(request, post_state(request, pk))
+
+
+def post_last_modified(request, pk):
+    return _post_last_modified(post_state(request, pk))
+
+
+def document_etag(request, pk):
+    return _post_etag(request, document_state(request, pk))
+
+
+def document_last_modified(request, pk):
+    return _post_last_modified(document_state(request, pk))
+
+
+# pregled posta se broji pre provere uslova, pa se broji i GET sa odgovorom 304
+# (BLOG_VIEWS_COUNT_REVALIDATIONS; iskljuceno: samo GET koji dobija telo);
+# broj ostaje na requestu (request._blog_views) za telo odgovora
+def counts_view(state_func):
+    def decorator(view):
+        @wraps(view)
+        def inner(request, pk, *args, **kwargs):
+            if (
+                request.method == 'GET' and viewcounts.counts_revalidations()
+                and not hasattr(request, '_blog_views')
+            ):
+                exists = state_func(request, pk)['last_update'] is not None
+                request._blog_views = viewcounts.record_view(pk) if exists else None
+            return view(request, pk, *args, **kwargs)
+        return inner
+    return decorator
+
+
+def acounts_view(astate_func):
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, pk, *args, **kwargs):
+            if request.method == 'GET' and viewcounts.counts_revalidations():
+                request._blog_state = await astate_func(request, pk)
+                exists = request._blog_state['last_update'] is not None
+                request._blog_views = await viewcounts.arecord_view(pk) if exists else None
+            return await view(request, pk, *args, **kwargs)
+        return inner
+    return decorator
+
+
+def view_count(request, pk):
+    # broj iz counts_view, ili pregled tek sada, kad se salje telo
+    views = getattr(request, '_blog_views', None)
+    return viewcounts.record_view(pk) if views is None else views
+
+
+async def aview_count(request, pk):
+    views = getattr(request, '_blog_views', None)
+    return await viewcounts.arecord_view(pk) if views is None else views
+
+
+def comment_state(request, id):
+    return _state(request, lambda: Comment.objects.filter(id=id).aggregate(last_update=Max('update_at')))
+
+
+async def acomment_state(request, id):
+    return await Comment.objects.filter(id=id).aaggregate(last_update=Max('update_at'))
+
+
+def comment_etag(request, id):
+    state = comment_state(request, id)
+    if state is None or state['last_update'] is None:
+        return None
+    return _etag(request, state['last_update'])
+
+
+def comment_last_modified(request, id):
+    state = comment_state(request, id)
+    return state and state['last_update']
@@ -0,0 +1,70 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from . import documents
+from .cache import invalidate_post, invalidate_posts
+from .models import BlogPost, Comment
+
+
+# Denormalizovani brojaci na BlogPost. Sve izmene su jedan UPDATE sa F()
+# izrazima, pa su tacne i kad vise zahteva istovremeno menja isti post.
+# Kes se ponistava tek posle commit-a (cache.bump), pa pozivi unutar
+# transaction.atomic() ne otvaraju prozor za stare podatke u kesu; gotov
+# dokument detalja se krpi jednom po postu posle commit-a (myblog/documents.py).
+
+def comment_stats_expressions():
+    """
+    Izrazi za UPDATE koji iz tabele komentara ponovo racunaju comment_count i
+    last_comment_at.
+    """
+    comms = Comment.objects.filter(blog_post_id=OuterRef('pk'))
+    return {
+        'comment_count': Coalesce(
+            Subquery(
+                comms.order_by().values('blog_post_id').annotate(count=Count('id')).values('count'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+        'last_comment_at': Subquery(comms.order_by('-created_at').values('created_at')[:1]),
+    }
+
+
+def comment_added(post_id, created_at, count=1, first_at=None):
+    # `created_at` najnovijeg, `first_at` najstarijeg dodatog komentara (isto ako nije dat)
+    BlogPost.objects.filter(id=post_id).update(
+        comment_count=F('comment_count') + count,
+        last_comment_at=Greatest(Coalesce('last_comment_at', created_at), created_at),
+    )
+    documents.comment_added(post_id, first_at or created_at)
+    invalidate_post(post_id)
+    invalidate_posts()
+
+
+def comment_removed(post_id, comment_ids):
+    # obrisani komentar je mozda bio poslednji, pa se last_comment_at racuna ponovo;
+    # brojac koji se razisao sa tabelom (pre recount_comments) ne pada ispod nule
+    BlogPost.objects.filter(id=post_id).update(
+        comment_count=Greatest(F('comment_count') - len(comment_ids), 0),
+        last_comment_at=comment_stats_expressions()['last_comment_at'],
+    )
+    documents.comments_removed(post_id, comment_ids)
+    invalidate_post(post_id)
+    invalidate_posts()
+
+
+def recount_comments(posts=None):
+    """
+    Racuna brojace iz tabele komentara za dati queryset postova (ili sve).
+    Vraca broj azuriranih postova.
+    """
+    if posts is None:
+        posts = BlogPost.objects.all()
+    updated = posts.update(**comment_stats_expressions())
+    for pk in posts.values_list('id', flat=True):
+        invalidate_post(pk)
+    invalidate_posts()
+    # gotovi dokumenti sa starim brojacima vise ne odgovaraju stanju posta;
+    # detalji idu iz kesa dok sledeci upis ili rebuild_documents ne napravi nove
+    documents.discard(posts)
+    return updated
@@ -0,0 +1,385 @@
+import hashlib
+import json
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework.utils.urls import replace_query_param
+
+from . import compression, fastread
+from .cache import get_response_cache, get_timeout
+from .models import BlogPost, Comment, PostDocument
+from .pagination import CommentPagination, Cursor, cursor_token
+from .renderers import FastJSONRenderer
+from .routers import use_primary
+from .serializer import BlogPostSerializer, ComSerializer
+
+
+# Materijalizovani detalj posta: za GET /blogposts/<pk>/ bez parametara
+# odgovor je vec gotov JSON iz tabele PostDocument, procitan u istom upitu
+# po primarnom kljucu kao stanje posta za ETag (conditional.document_state),
+# bez serializer-a. Broj pregleda i link na sledecu stranu komentara zavise
+# od trenutka i hosta, pa se umecu pri slanju.
+#
+# Izmene posta i komentara (signali, brojaci, masovni unos, write-behind) se
+# skupljaju po postu za celu transakciju i posle commit-a se dokument krpi
+# jednom po postu (jedan on_commit po transakciji), van transakcije izmene:
+# post se serijalizuje ponovo samo kad je izmenjen, inace mu se menjaju samo
+# brojaci; izmenjeni komentari sa prve strane se zamenjuju, obrisani
+# izbacuju, a prazna mesta na strani (novi ili obrisani komentari) popunjava
+# jedan upit od kraja strane. Ceo dokument se pravi ponovo samo za post bez
+# dokumenta i za komentar koji upada usred strane (npr. uvoz sa starim
+# vremenom). Dokument se krpi pre nego sto se promeni verzija posta u kesu
+# (izmene se belezi pre cache.invalidate_post), pa novi ETag ne stoji uz stari
+# dokument.
+#
+# Citanje nikad ne pise: uz dokument stoji stanje posta (kao za ETag), i kad
+# se ne slaze sa stanjem (dokument jos nije zakrpljen, post bez dokumenta)
+# odgovor ide kroz serializer-e i kes.
+#
+# Za gzip se staticki delovi dokumenta (izmedju mesta za umetanje) kompresuju
+# jednom i kesiraju po sadrzaju dokumenta; po zahtevu se umecu samo broj
+# pregleda i link (myblog/compression.py, gzip_splice).
+
+logger = logging.getLogger(__name__)
+
+VIEWS_PLACEHOLDER = b'"views":null'
+NEXT_PLACEHOLDER = b'"comments_next":null'
+# redom kojim se javljaju u dokumentu, svaki tacno jednom
+PLACEHOLDERS = (VIEWS_PLACEHOLDER, NEXT_PLACEHOLDER)
+
+
+def page_size():
+    return CommentPagination.page_size
+
+
+# polje dokumenta -> kolona posta; isto stanje kao za ETag (conditional.POST_STATE)
+STATE_COLUMNS = {
+    'update_state': 'update_at',
+    'comments_state': 'comment_count',
+    'last_comment_state': 'last_comment_at',
+}
+# polja posta koja se menjaju sa komentarima
+COUNTER_FIELDS = ('comment_count', 'last_comment_at')
+
+
+def state_fields(post):
+    return {name: getattr(post, column) for name, column in STATE_COLUMNS.items()}
+
+
+def render(data):
+    # isti bajtovi kao DRF odgovor, `views` se popunjava pri slanju
+    if 'views' in data['blog']:
+        data['blog']['views'] = None
+    return FastJSONRenderer().render(data)
+
+
+def blog_payload(pk):
+    post = BlogPost.objects.select_related('author').get(id=pk)
+    return post, BlogPostSerializer(post).data
+
+
+def page_query(pk):
+    # komentari prve strane, redom kao CommentPagination
+    comms = Comment.objects.filter(blog_post_id=pk)
+    return fastread.values(comms, ComSerializer, extra=('created_at', 'id')).order_by('created_at', 'id')
+
+
+def build(pk):
+    """
+    Pravi i cuva dokument za post `pk` sa primarne baze; BlogPost.DoesNotExist
+    ako ga nema. Upis je jedan upsert, pa istovremene izgradnje ne smetaju.
+    """
+    with use_primary(), transaction.atomic():
+        post, blog = blog_payload(pk)
+        comms = list(page_query(pk)[:page_size()])
+        doc = PostDocument(
+            post_id=pk,
+            body=render({
+                'blog': blog,
+                'comms': fastread.to_dicts(comms, ComSerializer),
+                'comments_count': post.comment_count,
+                'comments_next': None,
+                'comments_previous': None,
+            }),
+            page_end_at=comms[-1]['created_at'] if comms else None,
+            page_end_id=comms[-1]['id'] if comms else None,
+            **state_fields(post),
+        )
+        PostDocument.objects.bulk_create(
+            [doc], update_conflicts=True, unique_fields=['post'], update_fields=DOCUMENT_COLUMNS,
+        )
+    return doc
+
+
+# KRPLJENJE (posle commit-a izmene)
+
+def _new_changes():
+    return {'post': False, 'added_at': None, 'edited': set(), 'removed': set()}
+
+
+# zakazano krpljenje trenutne transakcije, po thread-u (kao konekcija)
+_local = threading.local()
+
+
+class _Scheduled:
+    """
+    on_commit callback jedne transakcije sa izmenama po postu. Na requestu je
+    samo slaba referenca; jaku drzi Django dok ceka commit, pa kad rollback
+    (i savepoint-a u kome je zakazan) odbaci callback, nestaju i izmene.
+    """
+    def __init__(self):
+        self.pending = {}
+
+    def __call__(self):
+        _local.scheduled = None
+        flush(self.pending)
+
+
+def _pending():
+    """
+    Izmene po postu u trenutnoj transakciji, za jedan on_commit koji ih krpi;
+    van transakcije None.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        return None
+    ref = getattr(_local, 'scheduled', None)
+    scheduled = ref and ref()
+    if scheduled is None:
+        scheduled = _Scheduled()
+        _local.scheduled = weakref.ref(scheduled)
+        transaction.on_commit(scheduled, robust=True)
+    return scheduled.pending
+
+
+@contextmanager
+def _changes(pk):
+    pending = _pending()
+    if pending is not None:
+        yield pending.setdefault(pk, _new_changes())
+        return
+    # van transakcije izmena je vec upisana, krpi se odmah
+    changes = _new_changes()
+    yield changes
+    flush({pk: changes})
+
+
+def post_changed(pk):
+    with _changes(pk) as changes:
+        changes['post'] = True
+
+
+def comment_added(pk, created_at):
+    # `created_at` najstarijeg dodatog komentara
+    with _changes(pk) as changes:
+        if changes['added_at'] is None or created_at < changes['added_at']:
+            changes['added_at'] = created_at
+
+
+def comment_changed(pk, comment_id):
+    with _changes(pk) as changes:
+        changes['edited'].add(comment_id)
+
+
+def comments_removed(pk, comment_ids):
+    with _changes(pk) as changes:
+        changes['removed'].update(comment_ids)
+
+
+def flush(pending):
+    for pk, changes in pending.items():
+        try:
+            patch(pk, changes)
+        except Exception:
+            logger.exception('Dokument posta %s nije zakrpljen', pk)
+            # izmena komentara ne menja stanje posta, pa zastareo dokument ne sme da ostane
+            discard([pk])
+
+
+def patch(pk, changes):
+    """
+    Krpi dokument posta `pk` za izmene `changes` (vidi _new_changes) sa
+    primarne baze. Red posta se zakljucava, pa se istovremena krpljenja istog
+    dokumenta ne gaze.
+    """
+    with use_primary(), transaction.atomic():
+        row = (
+            BlogPost.objects.select_for_update(of=('self',)).filter(id=pk)
+            .values(*STATE_COLUMNS.values(), *ROW_COLUMNS).first()
+        )
+        if row is None:
+            # post je obrisan, dokument brise CASCADE
+            return
+        doc = from_row(row)
+        added_at = changes['added_at']
+        if doc is None or (added_at is not None and doc.page_end_at is not None and added_at < doc.page_end_at):
+            build(pk)
+            return
+
+        data = json.loads(bytes(doc.body))
+        if changes['post']:
+            _, data['blog'] = blog_payload(pk)
+        else:
+            data['blog'].update(fastread.to_dicts([row], BlogPostSerializer, COUNTER_FIELDS)[0])
+        data['comments_count'] = row['comment_count']
+
+        comms = [com for com in data['comms'] if com['id'] not in changes['removed']]
+        edited = changes['edited'].intersection(com['id'] for com in comms)
+        if edited:
+            rows = page_query(pk).filter(id__in=edited)
+            fresh = {com['id']: com for com in fastread.to_dicts(rows, ComSerializer)}
+            comms = [fresh.get(com['id'], com) for com in comms]
+        if len(comms) < page_size() and (added_at is not None or len(comms) < len(data['comms'])):
+            # novi komentari su posle kraja strane, a iza obrisanih se dopunjava od kraja
+            rows = page_query(pk)
+            if doc.page_end_id is not None:
+                rows = CommentPagination().filter_after(rows, (doc.page_end_at, doc.page_end_id), True)
+            rows = list(rows[:page_size() - len(comms)])
+            comms += fastread.to_dicts(rows, ComSerializer)
+            if rows:
+                doc.page_end_at, doc.page_end_id = rows[-1]['created_at'], rows[-1]['id']
+        if len(comms) != min(row['comment_count'], page_size()):
+            # dokument ili brojac se razisao sa komentarima mimo signala
+            build(pk)
+            return
+        data['comms'] = comms
+
+        doc.body = render(data)
+        for name, column in STATE_COLUMNS.items():
+            setattr(doc, name, row[column])
+        PostDocument.objects.filter(post_id=pk).update(**{name: getattr(doc, name) for name in DOCUMENT_COLUMNS})
+
+
+def rebuild_all(batch_size=500):
+    last_id, total = 0, 0
+    while True:
+        ids = list(BlogPost.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        for pk in ids:
+            try:
+                build(pk)
+                total += 1
+            except BlogPost.DoesNotExist:
+                pass
+        last_id = ids[-1]
+
+
+def discard(posts=None):
+    # do sledece izmene posta ili rebuild_documents detalji idu iz kesa
+    docs = PostDocument.objects.all()
+    if posts is not None:
+        docs = docs.filter(post__in=posts)
+    docs.delete()
+
+
+def _matches(doc, state):
+    return (doc.update_state, doc.comments_state, doc.last_comment_state) == (
+        state['last_update'], state['comms'], state['last_comment']
+    )
+
+
+def inserts(request, doc, views):
+    # vrednosti koje se umecu umesto PLACEHOLDERS, istim redom
+    next_value = NEXT_PLACEHOLDER
+    if doc.comments_state > page_size():
+        link = replace_query_param(
+            request.build_absolute_uri(), CommentPagination.cursor_query_param,
+            cursor_token(Cursor((doc.page_end_at, doc.page_end_id), False)),
+        )
+        next_value = b'"comments_next":' + json.dumps(link).encode('utf-8')
+    return (b'"views":%d' % views, next_value)
+
+
+def split(body):
+    # delovi dokumenta izmedju PLACEHOLDERS
+    parts, rest = [], bytes(body)
+    for placeholder in PLACEHOLDERS:
+        part, _, rest = rest.partition(placeholder)
+        parts.append(part)
+    parts.append(rest)
+    return parts
+
+
+def finish(request, doc, views):
+    parts = split(doc.body)
+    body = [parts[0]]
+    for value, part in zip(inserts(request, doc, views), parts[1:]):
+        body += (value, part)
+    return b''.join(body)
+
+
+def compressed_key(doc):
+    # po sadrzaju: izmena komentara menja dokument, a ne i stanje posta
+    digest = hashlib.md5(bytes(doc.body), usedforsecurity=False).hexdigest()
+    return f'myblog:doc:{doc.post_id}:{digest}:gzip'
+
+
+def finish_gzip(request, doc, views):
+    """Isto telo kao finish(), kao gzip; staticki delovi se kompresuju jednom po dokumentu."""
+    parts = split(doc.body)
+    cache = get_response_cache()
+    key = compressed_key(doc)
+    deflated = cache.get(key)
+    if deflated is None:
+        deflated = compression.deflate_parts(parts)
+        cache.set(key, deflated, get_timeout())
+    return compression.gzip_splice(parts, deflated, inserts(request, doc, views))
+
+
+def response(request, doc, views):
+    return compression.precompressed(
+        HttpResponse(finish(request, doc, views), content_type='application/json'),
+        {'gzip': lambda: finish_gzip(request, doc, views)},
+    )
+
+
+def can_serve(request):
+    # samo podrazumevani prikaz: bez ?fields=, ?order=, ?cursor=...
+    return not request.GET
+
+
+DOCUMENT_COLUMNS = ('body', 'page_end_at', 'page_end_id', 'update_state', 'comments_state', 'last_comment_state')
+# kolone dokumenta uz red posta (LEFT JOIN), za from_row
+ROW_COLUMNS = ('document__post', *(f'document__{name}' for name in DOCUMENT_COLUMNS))
+
+
+def with_state(request):
+    """
+    Da li se dokument cita u istom upitu kao stanje posta. Uslovni zahtev se
+    obicno zavrsava sa 304, pa se telo tada ne cita dok ne zatreba.
+    """
+    conditional = 'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+    return can_serve(request) and not conditional
+
+
+def from_row(row):
+    # dokument iz reda posta sa ROW_COLUMNS, None kad ga nema
+    if row is None or row['document__post'] is None:
+        return None
+    return PostDocument(post_id=row['document__post'], **{name: row[f'document__{name}'] for name in DOCUMENT_COLUMNS})
+
+
+def _documents(pk, state):
+    return PostDocument.objects.using(state['alias']).filter(post_id=pk).only(*DOCUMENT_COLUMNS)
+
+
+def document_for(pk, state):
+    """
+    Dokument koji odgovara stanju posta `state` (iz ETag upita, sa iste baze)
+    ili None kad ga nema ili je zastareo.
+    """
+    doc = state['document'] if 'document' in state else _documents(pk, state).first()
+    if doc is None or not _matches(doc, state):
+        return None
+    return doc
+
+
+async def adocument_for(pk, state):
+    doc = state['document'] if 'document' in state else await _documents(pk, state).afirst()
+    if doc is None or not _matches(doc, state):
+        return None
+    return doc
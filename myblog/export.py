@@ -0,0 +1,89 @@
+import datetime
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import BlogPost, Comment
+
+
+# Izvoz celog bloga kao NDJSON: jedan red = jedan post sa svim komentarima.
+# Postovi se citaju u serijama po id-ju (keyset), a komentari za celu seriju
+# jednim upitom, oba preko .iterator(), pa memorija zavisi samo od velicine
+# serije, ne od broja postova.
+
+POST_FIELDS = ('id', 'title', 'content', 'author_id', 'author__username', 'created_at', 'update_at')
+COMMENT_FIELDS = ('id', 'blog_post_id', 'author_id', 'author__username', 'content', 'created_at', 'update_at')
+
+
+def get_batch_size():
+    return getattr(settings, 'BLOG_EXPORT_BATCH_SIZE', 500)
+
+
+def changed_posts(since=None):
+    """
+    Postovi za izvoz. Sa `since` samo oni kojima se posle tog trenutka menjao
+    post ili neki komentar (novi komentari imaju update_at = created_at).
+    Obrisani postovi i komentari se ne vide.
+    """
+    posts = BlogPost.objects.all()
+    if since is not None:
+        posts = posts.filter(
+            Q(update_at__gte=since)
+            | Q(id__in=Comment.objects.filter(update_at__gte=since).values('blog_post_id'))
+        )
+    return posts
+
+
+def _rename_author(row):
+    row['author_username'] = row.pop('author__username')
+    return row
+
+
+def export_posts(since=None, batch_size=None):
+    batch_size = batch_size or get_batch_size()
+    posts = changed_posts(since).order_by('id').values(*POST_FIELDS)
+    last_id = 0
+    while True:
+        batch = [_rename_author(row) for row in posts.filter(id__gt=last_id)[:batch_size].iterator()]
+        if not batch:
+            return
+        for post in batch:
+            post['comments'] = []
+        by_id = {post['id']: post for post in batch}
+
+        comms = (
+            Comment.objects.filter(blog_post_id__in=by_id)
+            .order_by('blog_post_id', 'created_at', 'id')
+            .values(*COMMENT_FIELDS)
+        )
+        for com in comms.iterator(chunk_size=batch_size):
+            by_id[com.pop('blog_post_id')]['comments'].append(_rename_author(com))
+
+        yield from batch
+        last_id = batch[-1]['id']
+
+
+class ExportJSONEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder sece vreme na milisekunde, a import_blog treba tacno vreme
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def ndjson_lines(posts):
+    for post in posts:
+        yield json.dumps(post, cls=ExportJSONEncoder, ensure_ascii=False).encode('utf-8') + b'\n'
+
+
+def gzip_stream(chunks, level=6):
+    # gzip zaglavlje i CRC (wbits=31), izlaz ide cim ga kompresor pusti
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,93 @@
+import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.fields import ISO_8601
+from rest_framework.settings import api_settings
+
+
+# Brz put citanja za liste: redovi se citaju sa .values() i od njih se prave
+# isti dict-ovi koje bi vratio serializer (ista polja, isti redosled, isti
+# DATETIME_FORMAT), bez pravljenja modela i bez poziva to_representation po
+# polju. Polja i izvori se uzimaju iz samog serializer-a, pa promena
+# serializer-a menja i brzi put. Testovi u tests.py (FastReadParityTests)
+# porede JSON oba puta.
+
+# polja cija je vrednost iz .values() vec ono sto bi serializer vratio
+RAW_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.PrimaryKeyRelatedField)
+
+
+@lru_cache(maxsize=256)
+def _columns(serializer_class, fields):
+    serializer = serializer_class() if fields is None else serializer_class(fields=list(fields))
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        columns.append((name, field.source.replace('.', '__'), field))
+    return tuple(columns)
+
+
+def columns(serializer_class, fields=None):
+    # (ime u odgovoru, lookup za .values(), polje serializer-a)
+    if fields is not None:
+        # ?fields= dolazi od klijenta: u kljuc kesa idu samo postojeca polja
+        declared = {name for name, _, _ in _columns(serializer_class, None)}
+        fields = tuple(sorted(declared.intersection(fields)))
+    return _columns(serializer_class, fields)
+
+
+def values(queryset, serializer_class, fields=None, extra=()):
+    """
+    `queryset.values()` sa kolonama za dati serializer; `extra` su dodatne
+    kolone koje ne idu u odgovor (npr. polja za kursor paginacije).
+    """
+    lookups = [lookup for _, lookup, _ in columns(serializer_class, fields)]
+    return queryset.values(*dict.fromkeys([*lookups, *extra]))
+
+
+def datetime_formatter():
+    """Isto kao DateTimeField.to_representation za REST_FRAMEWORK DATETIME_FORMAT."""
+    output_format = api_settings.DATETIME_FORMAT
+    if output_format is None:
+        return None
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+    iso = output_format.lower() == ISO_8601
+
+    def format(value):
+        if isinstance(value, str):
+            return value
+        if tz is not None:
+            value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, datetime.timezone.utc)
+        if iso:
+            value = value.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return value.strftime(output_format)
+    return format
+
+
+def to_dicts(rows, serializer_class, fields=None):
+    """Redovi iz `values(...)` -> isto sto i serializer_class(..., many=True).data."""
+    formatter = datetime_formatter()
+    plan = []
+    for name, lookup, field in columns(serializer_class, fields):
+        if isinstance(field, serializers.DateTimeField) and not hasattr(field, 'format'):
+            convert = formatter
+        elif isinstance(field, RAW_FIELDS):
+            convert = None
+        else:
+            convert = field.to_representation
+        plan.append((name, lookup, convert))
+
+    result = []
+    for row in rows:
+        item = {}
+        for name, lookup, convert in plan:
+            value = row[lookup]
+            item[name] = value if convert is None or value is None else convert(value)
+        result.append(item)
+    return result
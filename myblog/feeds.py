@@ -0,0 +1,93 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+
+from .cache import feed_version, get_response_cache, get_timeout, version_time
+from .compression import compress_all
+from .models import BlogPost
+
+
+# Atom i RSS feed poslednjih postova (/api/feed.xml, ?format=rss). Gotov XML
+# se kesira po verziji feed-a koju menjaju samo promene postova, pa ponovljeni
+# zahtevi ne idu u bazu, a uslovni GET (ETag / Last-Modified) je ceo iz kesa.
+
+FORMATS = {'atom': Atom1Feed, 'rss': Rss201rev2Feed}
+
+
+def get_feed_items():
+    return getattr(settings, 'BLOG_FEED_ITEMS', 20)
+
+
+class LatestPostsFeed(Feed):
+    title = 'My Blog Post'
+    description = 'Najnoviji postovi'
+
+    def __init__(self, feed_type=Atom1Feed):
+        super().__init__()
+        self.feed_type = feed_type
+
+    def link(self):
+        return reverse('blogposts')
+
+    def subtitle(self):
+        return self.description
+
+    def items(self):
+        return (
+            BlogPost.objects.select_related('author')
+            .only('id', 'title', 'excerpt', 'created_at', 'update_at', 'author__username')
+            .order_by('-created_at', '-id')[:get_feed_items()]
+        )
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_link(self, item):
+        return reverse('post_details', args=[item.id])
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.update_at
+
+
+def feed_key(request, format, version=None):
+    # linkovi u feed-u su apsolutni, pa i host ulazi u kljuc
+    host = hashlib.md5(request.get_host().encode('utf-8'), usedforsecurity=False).hexdigest()
+    version = feed_version() if version is None else version
+    return f'myblog:feed:{version}:{format}:{get_feed_items()}:{host}'
+
+
+def cached_feed(request, format):
+    """
+    Vraca {'body', 'content_type', 'last_modified', 'etag', 'compressed'} iz
+    kesa ili pravi feed i kesira ga.
+    """
+    cache = get_response_cache()
+    version = feed_version()
+    key = feed_key(request, format, version)
+    data = cache.get(key)
+    if data is None:
+        feedgen = LatestPostsFeed(FORMATS[format]).get_feed(None, request)
+        body = feedgen.writeString('utf-8').encode('utf-8')
+        data = {
+            'body': body,
+            'content_type': feedgen.content_type,
+            # brisanje posta ne pomera najnoviji datum, verzija feed-a da
+            'last_modified': max(feedgen.latest_post_date(), version_time(version)) if feedgen.items else None,
+            'etag': '"%s"' % hashlib.md5(key.encode('utf-8'), usedforsecurity=False).hexdigest(),
+            # kompresovan jednom po verziji feed-a, ne pri svakom zahtevu
+            'compressed': compress_all(body),
+        }
+        cache.set(key, data, get_timeout())
+    return data
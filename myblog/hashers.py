@@ -0,0 +1,43 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+# PBKDF2 je namerno spor (stotine ms CPU-a po lozinki). Ogranicavamo koliko
+# hesiranja radi istovremeno u procesu, da talas prijava (npr. pogadjanje
+# lozinki) ne bi zauzeo sve thread-ove i zaustavio citanja. Ko ne dobije
+# mesto za BLOG_PASSWORD_HASH_WAIT sekundi dobija 503 (LoadSheddingMiddleware).
+
+class HashingBusy(Exception):
+    pass
+
+
+_lock = threading.Lock()
+_slots = {}
+
+
+def _semaphore():
+    limit = getattr(settings, 'BLOG_PASSWORD_HASH_CONCURRENCY', 4)
+    with _lock:
+        if limit not in _slots:
+            _slots[limit] = threading.BoundedSemaphore(limit)
+        return _slots[limit]
+
+
+class hashing_slot:
+    def __enter__(self):
+        self.semaphore = _semaphore()
+        if not self.semaphore.acquire(timeout=getattr(settings, 'BLOG_PASSWORD_HASH_WAIT', 2)):
+            raise HashingBusy()
+
+    def __exit__(self, *exc_info):
+        self.semaphore.release()
+
+
+class BoundedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """Isti algoritam i format kao PBKDF2PasswordHasher, postojece lozinke vaze."""
+
+    def encode(self, password, salt, iterations=None):
+        with hashing_slot():
+            return super().encode(password, salt, iterations)
@@ -0,0 +1,244 @@
+import gzip
+import json
+import os
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .bulk import get_batch_size
+from .cache import invalidate_feed, invalidate_posts
+from .counters import recount_comments
+from .models import BlogPost, Comment, make_excerpt
+
+
+# Uvoz NDJSON arhive u formatu /api/export/ (jedan post sa komentarima po
+# redu). Fajl se cita red po red, a postovi i komentari idu kroz bulk_create
+# u serijama; na svakih `commit_every` redova je commit, a posle njega se u
+# checkpoint fajl upisuje pozicija u fajlu, pa prekinut uvoz nastavlja odatle.
+#
+# Podrazumevano se cuvaju originalni id-jevi. Post ciji id vec postoji se
+# preskace ako je to isti post (isti autor i created_at), pa je ponovni uvoz
+# iste serije bezopasan; inace post i njegovi komentari dobijaju nove id-jeve,
+# da se komentari ne bi zakacili za tudji post. Sa new_ids baza dodeljuje
+# nove id-jeve svima.
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def open_archive(path):
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == b'\x1f\x8b'
+    return gzip.open(path, 'rb') if compressed else open(path, 'rb')
+
+
+def read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'line': 0, 'offset': 0}
+
+
+def write_checkpoint(path, line, offset):
+    # atomicno: prvo privremeni fajl, pa zamena
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'line': line, 'offset': offset}, f)
+    os.replace(tmp, path)
+
+
+class BlogImporter:
+    """
+    Uvozi postove i komentare; `users` je mapa username -> id koja se puni
+    iz baze po potrebi i ostaje u memoriji do kraja uvoza.
+    """
+
+    def __init__(self, batch_size=None, commit_every=10000, new_ids=False, progress=None):
+        self.batch_size = batch_size or get_batch_size()
+        # commit (fsync) je najskuplji deo, pa je transakcija veca od bulk_create serije
+        self.commit_every = max(commit_every, self.batch_size)
+        self.new_ids = new_ids
+        self.progress = progress
+        self.users = {}
+        self.posts_created = 0
+        self.comments_created = 0
+        self._pending = []
+        self._pending_rows = 0
+
+    def run(self, path, checkpoint_path=None, restart=False):
+        checkpoint_path = checkpoint_path or f'{path}.checkpoint'
+        state = {'line': 0, 'offset': 0} if restart else read_checkpoint(checkpoint_path)
+        line_no, offset = state['line'], state['offset']
+        started = time.monotonic()
+
+        with open_archive(path) as f:
+            f.seek(offset)
+            for raw in f:
+                line_no += 1
+                offset += len(raw)
+                if not raw.strip():
+                    continue
+                try:
+                    self.add(json.loads(raw))
+                except (ValueError, KeyError, TypeError) as exc:
+                    raise ImportFormatError(f'Red {line_no}: {exc}') from exc
+
+                if self._pending_rows >= self.commit_every:
+                    self.flush()
+                    write_checkpoint(checkpoint_path, line_no, offset)
+                    self.report(line_no, started)
+            self.flush()
+
+        self.reset_sequences()
+        invalidate_posts()
+        invalidate_feed()
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return self.report(line_no, started)
+
+    def add(self, data):
+        # greske u redu se javljaju ovde, dok se zna broj reda
+        required = ('content', 'author_username') if self.new_ids else ('id', 'content', 'author_username')
+        for item in (data, *(data.get('comments') or ())):
+            missing = [key for key in required + (('title',) if item is data else ()) if key not in item]
+            if missing:
+                raise KeyError(', '.join(missing))
+            item['created_at'] = self.parse_time(item.get('created_at'))
+            item['update_at'] = self.parse_time(item['update_at']) if item.get('update_at') else item['created_at']
+        self._pending.append(data)
+        self._pending_rows += 1 + len(data.get('comments') or ())
+
+    def flush(self):
+        if not self._pending:
+            return
+        lines, self._pending, self._pending_rows = self._pending, [], 0
+
+        with transaction.atomic():
+            self.resolve_users(lines)
+            if not self.new_ids:
+                lines = self.resolve_conflicts(lines)
+            posts = [self.build_post(data) for data in lines]
+            created = BlogPost.objects.bulk_create(posts, batch_size=self.batch_size)
+            comms = [
+                self.build_comment(com, post)
+                for data, post in zip(lines, created)
+                for com in data.get('comments') or ()
+            ]
+            Comment.objects.bulk_create(comms, batch_size=self.batch_size)
+            # bulk_create ne salje signale, brojaci i kes se azuriraju ovde
+            recount_comments(BlogPost.objects.filter(id__in=[post.id for post in created]))
+
+        self.posts_created += len(posts)
+        self.comments_created += len(comms)
+
+    def resolve_users(self, lines):
+        names = {data['author_username'] for data in lines}
+        names.update(com['author_username'] for data in lines for com in data.get('comments') or ())
+        missing = names - self.users.keys()
+        if not missing:
+            return
+        self.users.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+
+        # korisnici koji ne postoje se prave bez lozinke (mogu da je resetuju)
+        new = [User(username=name, password=make_password(None)) for name in missing - self.users.keys()]
+        if new:
+            User.objects.bulk_create(new, batch_size=self.batch_size)
+            self.users.update(
+                User.objects.filter(username__in=[user.username for user in new]).values_list('username', 'id')
+            )
+
+    def resolve_conflicts(self, lines):
+        """
+        Vraca redove za upis: vec uvezeni postovi (isti id, autor i created_at)
+        se preskacu, a postovi i komentari ciji id zauzima nesto drugo dobijaju
+        id None (novi od baze).
+        """
+        existing = {
+            pk: (author_id, created_at)
+            for pk, author_id, created_at in BlogPost.objects.filter(
+                id__in=[data['id'] for data in lines]
+            ).values_list('id', 'author_id', 'created_at')
+        }
+        kept = []
+        for data in lines:
+            if data['id'] in existing:
+                if existing[data['id']] == (self.users[data['author_username']], data['created_at']):
+                    continue
+                data['id'] = None
+            kept.append(data)
+
+        comms = [com for data in kept for com in data.get('comments') or ()]
+        taken = set(Comment.objects.filter(id__in=[com['id'] for com in comms]).values_list('id', flat=True))
+        for data in kept:
+            for com in data.get('comments') or ():
+                # komentari posta sa novim id-jem ili tudji id
+                if data['id'] is None or com['id'] in taken:
+                    com['id'] = None
+        return kept
+
+    def build_post(self, data):
+        # keep_timestamps: bulk_create ne prepisuje created_at/update_at (TimestampField)
+        post = BlogPost(
+            id=None if self.new_ids else data['id'],
+            title=data['title'],
+            content=data['content'],
+            excerpt=make_excerpt(data['content']),
+            author_id=self.users[data['author_username']],
+            created_at=data['created_at'],
+            update_at=data['update_at'],
+        )
+        post.keep_timestamps = True
+        return post
+
+    def build_comment(self, data, post):
+        com = Comment(
+            id=None if self.new_ids else data['id'],
+            blog_post_id=post.id,
+            author_id=self.users[data['author_username']],
+            content=data['content'],
+            created_at=data['created_at'],
+            update_at=data['update_at'],
+        )
+        com.keep_timestamps = True
+        return com
+
+    @staticmethod
+    def parse_time(value):
+        if not value:
+            return timezone.now()
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f'neispravno vreme {value!r}')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def reset_sequences(self):
+        # posle eksplicitnih id-jeva (npr. PostgreSQL sekvence); na SQLite-u nista
+        if self.new_ids:
+            return
+        statements = connection.ops.sequence_reset_sql(no_style(), [BlogPost, Comment])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def report(self, line_no, started):
+        elapsed = time.monotonic() - started
+        rows = self.posts_created + self.comments_created
+        stats = {
+            'line': line_no,
+            'posts': self.posts_created,
+            'comments': self.comments_created,
+            'rows_per_sec': rows / elapsed if elapsed else 0.0,
+        }
+        if self.progress:
+            self.progress(stats)
+        return stats
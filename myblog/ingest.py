@@ -0,0 +1,224 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+from .cache import get_cache, get_timeout
+from .counters import comment_added
+from .models import Comment
+
+
+# Write-behind unos komentara (BLOG_COMMENT_INGEST = True). View samo
+# validira komentar i stavlja ga u red u memoriji procesa; jedan writer
+# thread ga prazni i upisuje serije kroz bulk_create, na svakih
+# BLOG_INGEST_BATCH_SIZE komentara ili najkasnije BLOG_INGEST_FLUSH_MS
+# milisekundi posle prvog komentara u seriji. Umesto commit-a po komentaru
+# ide jedan commit po seriji, pa talas komentara ne zakljucava bazu.
+#
+# Garancije:
+# - 202 znaci samo da je komentar ispravan i u redu ovog procesa. Ako proces
+#   padne pre upisa serije (kill -9, OOM), komentari iz reda su izgubljeni;
+#   pri normalnom gasenju (atexit) red se prvo isprazni. Sa ?wait=1 odgovor
+#   201 stize tek posle commit-a, isto kao bez ovog rezima.
+# - Jedan writer po procesu i FIFO red: komentari prihvaceni u jednom procesu
+#   upisuju se redom kojim su prihvaceni (rastuci id, created_at = vreme upisa),
+#   pa je i redosled u API-ju isti. Izmedju procesa redosled nije garantovan.
+# - Komentar koji ne moze da se upise (npr. post je u medjuvremenu obrisan,
+#   ili bilo koja druga greska pri upisu) dobija status 'failed' i ne obara
+#   ostatak serije. Svaki tiket iz serije se zavrsava i writer nastavlja rad.
+
+STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+def enabled():
+    return getattr(settings, 'BLOG_COMMENT_INGEST', False)
+
+
+def get_batch_size():
+    return getattr(settings, 'BLOG_INGEST_BATCH_SIZE', 200)
+
+
+def get_flush_ms():
+    return getattr(settings, 'BLOG_INGEST_FLUSH_MS', 50)
+
+
+def get_max_queue():
+    return getattr(settings, 'BLOG_INGEST_MAX_QUEUE', 10000)
+
+
+def get_wait_timeout():
+    return getattr(settings, 'BLOG_INGEST_WAIT_TIMEOUT', 5)
+
+
+def ticket_key(ticket):
+    return f'myblog:ingest:{ticket}'
+
+
+def set_status(ticket, status):
+    get_cache().set(ticket_key(ticket), status, get_timeout())
+
+
+def get_status(ticket):
+    """{'status': 'pending' | 'created' | 'failed', ...} ili None za nepoznat tiket."""
+    return get_cache().get(ticket_key(ticket))
+
+
+@dataclass(eq=False)
+class Pending:
+    ticket: str
+    comment: Comment
+    done: threading.Event = field(default_factory=threading.Event)
+    error: str = None
+
+
+class CommentIngestor:
+    def __init__(self, batch_size=None, flush_ms=None, max_queue=None, autostart=True):
+        self.batch_size = batch_size or get_batch_size()
+        self.flush_ms = get_flush_ms() if flush_ms is None else flush_ms
+        self.queue = queue.Queue(maxsize=max_queue or get_max_queue())
+        # bez autostart-a serije se upisuju samo kroz flush() (testovi)
+        self.autostart = autostart
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, comment):
+        item = Pending(uuid.uuid4().hex, comment)
+        set_status(item.ticket, {'status': 'pending'})
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            get_cache().delete(ticket_key(item.ticket))
+            raise IngestQueueFull()
+        if self.autostart:
+            self.start()
+        return item
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run, name='comment-ingest', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        # sve sto je vec u redu se upisuje pre nego sto writer izadje
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self.queue.put(STOP)
+        thread.join(timeout)
+
+    def run(self):
+        try:
+            while True:
+                batch, stop = self.next_batch()
+                if batch:
+                    self.write(batch)
+                    close_old_connections()
+                if stop:
+                    return
+        finally:
+            connections.close_all()
+
+    def next_batch(self):
+        """Ceka prvi komentar, pa skuplja do batch_size ili do isteka flush_ms."""
+        first = self.queue.get()
+        if first is STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def flush(self):
+        # upisuje sve iz reda u thread-u koji poziva
+        items = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not STOP:
+                items.append(item)
+        for start in range(0, len(items), self.batch_size):
+            self.write(items[start:start + self.batch_size])
+        return len(items)
+
+    def write(self, batch):
+        try:
+            try:
+                self.insert(batch)
+            except Exception:
+                # jedan los komentar ne sme da obori celu seriju, pa pojedinacno
+                for item in batch:
+                    item.comment.pk = None
+                for item in batch:
+                    try:
+                        self.insert([item])
+                    except Exception as exc:
+                        item.comment.pk = None
+                        item.error = str(exc)
+            self.publish(batch)
+        except Exception:
+            # npr. kes nedostupan: writer ne sme da stane zbog jedne serije
+            logger.exception('Serija komentara nije objavljena')
+        finally:
+            # ko ceka (?wait=1) ne sme da ceka zauvek
+            for item in batch:
+                item.done.set()
+
+    def insert(self, batch):
+        comms = [item.comment for item in batch]
+        with transaction.atomic():
+            Comment.objects.bulk_create(comms)
+            # bulk_create ne salje signale, brojaci i kes se azuriraju ovde
+            stats = defaultdict(list)
+            for com in comms:
+                stats[com.blog_post_id].append(com.created_at)
+            for post_id, times in stats.items():
+                comment_added(post_id, max(times), count=len(times), first_at=min(times))
+
+    def publish(self, batch):
+        statuses = {}
+        for item in batch:
+            if item.error is None:
+                statuses[ticket_key(item.ticket)] = {'status': 'created', 'comment': item.comment.pk}
+            else:
+                statuses[ticket_key(item.ticket)] = {'status': 'failed', 'detail': 'Komentar nije sacuvan.'}
+        get_cache().set_many(statuses, get_timeout())
+
+
+_ingestor = None
+_ingestor_lock = threading.Lock()
+
+
+def get_ingestor():
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = CommentIngestor()
+            atexit.register(_ingestor.stop, get_wait_timeout())
+        return _ingestor
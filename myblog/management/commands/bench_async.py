@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from myblog import bench
+from myblog.models import BlogPost
+
+
+class Command(BaseCommand):
+    help = 'Poredi WSGI (sinhroni view-ovi) i ASGI (async view-ovi) po broju zahteva u sekundi i p99 latenciji.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=None, help='podrazumevano detalj poslednjeg posta')
+        parser.add_argument('--query', default='')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=100)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path is None:
+            post = BlogPost.objects.order_by('-id').first()
+            if post is None:
+                raise CommandError('Nema postova u bazi, prosledi --path.')
+            path = f'/api/blogposts/{post.id}/'
+
+        from blog.asgi import application as asgi_application
+
+        kwargs = dict(query=options['query'], requests=options['requests'], concurrency=options['concurrency'])
+        self.stdout.write(f'{path} zahteva: {options["requests"]} istovremeno: {options["concurrency"]}')
+        for name, result in (
+            ('WSGI', bench.run_wsgi(get_wsgi_application(), path, **kwargs)),
+            ('ASGI', bench.run_asgi(asgi_application, path, **kwargs)),
+        ):
+            self.stdout.write(
+                f'{name}: {result["rps"]:.0f} req/s, p50 {result["p50_ms"]:.1f} ms, '
+                f'p99 {result["p99_ms"]:.1f} ms, greske {result["errors"]}'
+            )
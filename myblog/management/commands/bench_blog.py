@@ -0,0 +1,87 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from myblog import bench
+from myblog.models import BlogPost, Comment
+
+
+class Command(BaseCommand):
+    help = (
+        'Mesovito opterecenje (lista, detalj, komentari, pretraga, novi i izmenjen komentar) kroz WSGI. '
+        'Ispisuje req/s, p50/p95/p99 i SQL upite po zahtevu za svaki endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--post', type=int, default=None, help='podrazumevano post sa najvise komentara')
+        parser.add_argument('--output', default=None, help='JSON fajl sa rezultatima')
+        parser.add_argument('--compare', default=None, help='JSON fajl prethodnog pokretanja')
+        parser.add_argument(
+            '--rate-limits', action='store_true',
+            help='ukljucuje BLOG_RATE_LIMITS (odbijeni zahtevi su kolona 429, van latencija)',
+        )
+
+    def handle(self, *args, **options):
+        post = self.get_post(options['post'])
+        user, _ = User.objects.get_or_create(username='bench_runner')
+        # komentar koji benchmark menja mora biti njegov
+        comment = Comment.objects.filter(blog_post=post, author=user).first() or Comment.objects.create(
+            blog_post=post, author=user, content='Komentar za benchmark'
+        )
+
+        results = bench.run_mixed(
+            get_wsgi_application(),
+            bench.default_scenarios(post.id, comment.id),
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            seed=options['seed'],
+            headers=bench.login_headers(user),
+            rate_limits=options['rate_limits'],
+        )
+        results['config'] = {
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'seed': options['seed'],
+            'rate_limits': options['rate_limits'],
+            'post': post.id,
+            'posts': BlogPost.objects.count(),
+            'comments': Comment.objects.count(),
+        }
+
+        self.write_table(results)
+        if options['compare']:
+            with open(options['compare']) as f:
+                diff = bench.compare(json.load(f), results)
+            for name, changes in diff.items():
+                parts = ', '.join(f'{key} {value:+.1f}%' for key, value in changes.items() if value is not None)
+                self.stdout.write(f'{name}: {parts}')
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def get_post(self, pk):
+        if pk is not None:
+            try:
+                return BlogPost.objects.get(id=pk)
+            except BlogPost.DoesNotExist:
+                raise CommandError('Post ne postoji!')
+        post = BlogPost.objects.order_by('-comment_count', '-id').first()
+        if post is None:
+            raise CommandError('Nema postova u bazi, pokreni seed_blog.')
+        return post
+
+    def write_table(self, results):
+        self.stdout.write(
+            f'{"endpoint":<20}{"zahteva":>8}{"req/s":>9}{"p50":>8}{"p95":>8}{"p99":>8}{"upita":>7}{"greske":>8}{"429":>6}'
+        )
+        rows = list(results['endpoints'].items()) + [('UKUPNO', results['total'])]
+        for name, row in rows:
+            self.stdout.write(
+                f'{name:<20}{row["requests"]:>8}{row["rps"]:>9.0f}{row["p50_ms"]:>8.1f}{row["p95_ms"]:>8.1f}'
+                f'{row["p99_ms"]:>8.1f}{row["queries_per_request"]:>7.1f}{row["errors"]:>8}{row["throttled"]:>6}'
+            )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myblog import bench, fastread, renderers
+from myblog.models import BlogPost, Comment
+from myblog.serializer import BlogPostSerializer, BlogPostSummarySerializer, ComSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Poredi standardni json i orjson (myblog/renderers.py, myblog/parsers.py) na velikoj listi postova '
+        'i detalju posta sa mnogo komentara: vreme renderovanja i parsiranja.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='broj postova u listi')
+        parser.add_argument('--comments', type=int, default=1000, help='broj komentara u detalju')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if not renderers.available():
+            raise CommandError('orjson nije instaliran, oba puta su isti (standardni json).')
+        post = BlogPost.objects.order_by('-comment_count').first()
+        if post is None:
+            raise CommandError('Nema postova u bazi, pokreni seed_blog.')
+
+        posts = fastread.values(BlogPost.objects.order_by('-id')[:options['rows']], BlogPostSummarySerializer)
+        comms = fastread.values(
+            Comment.objects.filter(blog_post=post).order_by('created_at', 'id')[:options['comments']], ComSerializer
+        )
+        payloads = (
+            ('blogposts', {
+                'next': 'http://localhost/api/blogposts/?cursor=abc', 'previous': None,
+                'results': fastread.to_dicts(posts, BlogPostSummarySerializer),
+            }),
+            ('post_details', {
+                'blog': BlogPostSerializer(post).data, 'comms': fastread.to_dicts(comms, ComSerializer),
+                'comments_count': post.comment_count, 'comments_next': None, 'comments_previous': None,
+            }),
+        )
+        for name, data in payloads:
+            result = bench.compare_json(data, options['repeat'])
+            self.stdout.write(
+                f'{name} ({result["bytes"] // 1024} KB): render json {result["json_render_ms"]:.2f} ms, '
+                f'orjson {result["fast_render_ms"]:.2f} ms ({result["json_render_ms"] / result["fast_render_ms"]:.1f}x); '
+                f'parse json {result["json_parse_ms"]:.2f} ms, orjson {result["fast_parse_ms"]:.2f} ms '
+                f'({result["json_parse_ms"] / result["fast_parse_ms"]:.1f}x)'
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from myblog import bench
+from myblog.models import BlogPost, Comment
+from myblog.serializer import BlogPostSerializer, BlogPostSummarySerializer, ComSerializer
+
+
+class Command(BaseCommand):
+    help = 'Poredi serijalizaciju liste kroz ModelSerializer i kroz .values() (myblog/fastread.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        kwargs = dict(rows=options['rows'], repeat=options['repeat'])
+        for name, queryset, serializer_class, fields in (
+            ('postovi (lista)', BlogPost.objects.all(), BlogPostSummarySerializer, None),
+            ('postovi ?fields=id,title,created_at', BlogPost.objects.all(), BlogPostSerializer, ['id', 'title', 'created_at']),
+            ('komentari', Comment.objects.all(), ComSerializer, None),
+        ):
+            result = bench.compare_reads(queryset, serializer_class, fields=fields, **kwargs)
+            self.stdout.write(
+                f'{name}: {result["rows"]} redova, serializer {result["serializer_ms"]:.1f} ms, '
+                f'values {result["values_ms"]:.1f} ms, {result["speedup"]:.1f}x'
+            )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myblog.importer import BlogImporter, ImportFormatError
+
+
+class Command(BaseCommand):
+    help = (
+        'Uvozi postove, komentare i autore iz NDJSON arhive (format /api/export/, moze i .gz). '
+        'Prekinut uvoz nastavlja od poslednjeg checkpoint-a.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file')
+        parser.add_argument('--batch-size', type=int, default=None, help='redova po bulk_create upitu')
+        parser.add_argument('--commit-every', type=int, default=10000, help='redova (postova + komentara) po transakciji')
+        parser.add_argument('--checkpoint', default=None, help='podrazumevano <file>.checkpoint')
+        parser.add_argument('--restart', action='store_true', help='ignorise postojeci checkpoint')
+        parser.add_argument('--new-ids', action='store_true', help='baza dodeljuje nove id-jeve umesto originalnih')
+
+    def handle(self, *args, **options):
+        importer = BlogImporter(
+            batch_size=options['batch_size'],
+            commit_every=options['commit_every'],
+            new_ids=options['new_ids'],
+            progress=self.write_progress if options['verbosity'] > 1 else None,
+        )
+        try:
+            stats = importer.run(options['file'], checkpoint_path=options['checkpoint'], restart=options['restart'])
+        except FileNotFoundError:
+            raise CommandError(f'Fajl {options["file"]} ne postoji.')
+        except ImportFormatError as exc:
+            raise CommandError(f'{exc} (uvezeno do poslednjeg checkpoint-a, ispravi fajl i pokreni ponovo)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Uvezeno postova: {stats["posts"]}, komentara: {stats["comments"]}, '
+            f'{stats["rows_per_sec"]:.0f} redova/s'
+        ))
+
+    def write_progress(self, stats):
+        self.stdout.write(
+            f'red {stats["line"]}: postova {stats["posts"]}, komentara {stats["comments"]}, '
+            f'{stats["rows_per_sec"]:.0f} redova/s'
+        )
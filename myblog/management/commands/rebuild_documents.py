@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from myblog.documents import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Ponovo pravi gotove JSON dokumente detalja za sve postove (myblog/documents.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = rebuild_all(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Napravljeno dokumenata: {total} ({total / elapsed if elapsed else 0:.0f}/s)'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from myblog.counters import recount_comments
+from myblog.models import BlogPost
+
+
+class Command(BaseCommand):
+    help = 'Ponovo racuna comment_count i last_comment_at za sve postove iz tabele komentara.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id, total = 0, 0
+        while True:
+            ids = list(
+                BlogPost.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            total += recount_comments(BlogPost.objects.filter(id__in=ids))
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Azurirano postova: {total}'))
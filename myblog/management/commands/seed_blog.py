@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from myblog.seed import seed_blog
+
+
+class Command(BaseCommand):
+    help = 'Pravi sinteticke korisnike, postove i komentare (isti --seed daje iste podatke).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['posts'], options['comments']) < 0:
+            raise CommandError('Brojevi ne smeju biti negativni.')
+
+        post_ids = seed_blog(
+            options['users'], options['posts'], options['comments'],
+            seed=options['seed'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Napravljeno postova: {len(post_ids)}, komentara: {options["comments"] if post_ids else 0}'
+        ))
@@ -0,0 +1,106 @@
+import time
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from . import compression, routers
+from .hashers import HashingBusy
+
+
+# view-ovi cija se citanja salju na replike (imena iz myblog/urls.py)
+REPLICA_VIEWS = {'blogposts', 'post_details', 'comments', 'comments_details'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PIN_COOKIE = 'blog_primary'
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """
+    GET na REPLICA_VIEWS cita sa replike. Posle uspesnog pisanja klijent
+    dobija kolacic, pa narednih BLOG_REPLICA_PIN_SECONDS sekundi cita sa
+    primarne baze i vidi svoje izmene (read-your-writes).
+    """
+
+    def process_request(self, request):
+        # thread (WSGI) ili kontekst se mogu ponovo koristiti, krece se od primarne
+        routers.set_read_alias(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not routers.get_replicas() or request.method not in SAFE_METHODS:
+            return None
+        match = request.resolver_match
+        if match is None or match.url_name not in REPLICA_VIEWS or self.pinned(request):
+            return None
+        request.read_alias = routers.choose_replica()
+        routers.set_read_alias(request.read_alias)
+        return None
+
+    def process_response(self, request, response):
+        routers.set_read_alias(None)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400 and routers.get_pin_seconds() > 0:
+            pin_seconds = routers.get_pin_seconds()
+            response.set_cookie(
+                PIN_COOKIE, str(time.time() + pin_seconds), max_age=pin_seconds, httponly=True, samesite='Lax'
+            )
+        return response
+
+    def pinned(self, request):
+        try:
+            return float(request.COOKIES[PIN_COOKIE]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+
+class LoadSheddingMiddleware(MiddlewareMixin):
+    """Kad su sva mesta za hesiranje lozinki zauzeta, odmah 503 umesto cekanja."""
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingBusy):
+            response = HttpResponse('Server je preopterecen, pokusaj kasnije.', status=503,
+                                    content_type='text/plain; charset=utf-8')
+            response['Retry-After'] = '1'
+            return response
+        return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    gzip (i br kad je instaliran brotli) za JSON i XML odgovore (ne HTML,
+    compression.COMPRESSIBLE_TYPES) od najmanje BLOG_COMPRESS_MIN_SIZE
+    bajtova, po Accept-Encoding zahteva. Vec
+    kompresovana tela (compression.precompressed) se koriste kako jesu.
+    Strimovani odgovori i oni sa Content-Encoding (izvoz) se ne diraju.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        compressible = compression.compressible_type(response.get('Content-Type', ''))
+        # i nekompresovan odgovor zavisi od Accept-Encoding (304 kao i 200)
+        if compressible or response.status_code == 304:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        if not compressible or len(response.content) < compression.get_min_size():
+            return response
+
+        variants = getattr(response, 'precompressed', {})
+        coding = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING'), prefer=variants)
+        if coding is None:
+            return response
+        body = variants.get(coding)
+        if callable(body):
+            body = body()
+        if body is None:
+            body = compression.compress(response.content, coding)
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = coding
+        # kompresovani bajtovi su druga reprezentacija, ETag postaje slab (kao GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
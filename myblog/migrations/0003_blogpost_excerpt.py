@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+# prepisano iz myblog.models u trenutku migracije, da kasnije izmene
+# make_excerpt ne menjaju sta ova migracija radi
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    text = ' '.join(content.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut + '…'
+
+
+def fill_excerpts(apps, schema_editor):
+    BlogPost = apps.get_model('myblog', 'BlogPost')
+    batch = []
+    for post in BlogPost.objects.only('id', 'content').iterator(chunk_size=500):
+        post.excerpt = make_excerpt(post.content)
+        batch.append(post)
+        if len(batch) == 500:
+            BlogPost.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    if batch:
+        BlogPost.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myblog', '0002_comment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=201),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
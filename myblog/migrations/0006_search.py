@@ -0,0 +1,100 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+# FTS5 indeks za /api/search/ (vidi myblog/search.py). Samo za SQLite;
+# ako baza nije SQLite ili nema FTS5, migracija ne radi nista i pretraga
+# koristi icontains.
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE myblog_search USING fts5(
+        title, content, post_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    # naslov je vazniji od sadrzaja
+    "INSERT INTO myblog_search(myblog_search, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    """
+    INSERT INTO myblog_search(rowid, title, content, post_id)
+    SELECT id * 2, title, content, id FROM myblog_blogpost
+    """,
+    """
+    INSERT INTO myblog_search(rowid, title, content, post_id)
+    SELECT id * 2 + 1, '', content, blog_post_id FROM myblog_comment
+    """,
+    """
+    CREATE TRIGGER myblog_search_post_insert AFTER INSERT ON myblog_blogpost BEGIN
+        INSERT INTO myblog_search(rowid, title, content, post_id)
+        VALUES (new.id * 2, new.title, new.content, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER myblog_search_post_update AFTER UPDATE OF title, content ON myblog_blogpost BEGIN
+        UPDATE myblog_search SET title = new.title, content = new.content WHERE rowid = new.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER myblog_search_post_delete AFTER DELETE ON myblog_blogpost BEGIN
+        DELETE FROM myblog_search WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER myblog_search_comment_insert AFTER INSERT ON myblog_comment BEGIN
+        INSERT INTO myblog_search(rowid, title, content, post_id)
+        VALUES (new.id * 2 + 1, '', new.content, new.blog_post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER myblog_search_comment_update AFTER UPDATE OF content ON myblog_comment BEGIN
+        UPDATE myblog_search SET content = new.content WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER myblog_search_comment_delete AFTER DELETE ON myblog_comment BEGIN
+        DELETE FROM myblog_search WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS myblog_search_post_insert',
+    'DROP TRIGGER IF EXISTS myblog_search_post_update',
+    'DROP TRIGGER IF EXISTS myblog_search_post_delete',
+    'DROP TRIGGER IF EXISTS myblog_search_comment_insert',
+    'DROP TRIGGER IF EXISTS myblog_search_comment_update',
+    'DROP TRIGGER IF EXISTS myblog_search_comment_delete',
+    'DROP TABLE IF EXISTS myblog_search',
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.myblog_fts5_check USING fts5(x)")
+            cursor.execute("DROP TABLE temp.myblog_fts5_check")
+        except OperationalError:
+            return
+        for sql in CREATE_SQL:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in DROP_SQL:
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myblog', '0005_indexes_and_ordering'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
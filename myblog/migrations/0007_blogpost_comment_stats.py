@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:50
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_stats(apps, schema_editor):
+    # izrazi su prepisani iz myblog.counters, da migracija ne zavisi od
+    # kasnijih izmena aplikacionog koda
+    BlogPost = apps.get_model('myblog', 'BlogPost')
+    Comment = apps.get_model('myblog', 'Comment')
+    comms = Comment.objects.filter(blog_post_id=OuterRef('pk'))
+    BlogPost.objects.update(
+        comment_count=Coalesce(
+            Subquery(
+                comms.order_by().values('blog_post_id').annotate(count=Count('id')).values('count'),
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+        last_comment_at=Subquery(comms.order_by('-created_at').values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myblog', '0006_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_comment_stats, migrations.RunPython.noop),
+    ]
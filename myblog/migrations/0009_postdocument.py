@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myblog', '0008_blogpost_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostDocument',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='myblog.blogpost')),
+                ('body', models.BinaryField()),
+                ('page_end_at', models.DateTimeField(null=True)),
+                ('page_end_id', models.PositiveIntegerField(null=True)),
+                ('update_state', models.DateTimeField(null=True)),
+                ('comments_state', models.PositiveIntegerField(default=0)),
+                ('last_comment_state', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myblog', '0010_revokedtoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['update_at', 'blog_post'], name='comment_update_post_idx'),
+        ),
+    ]
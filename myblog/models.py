@@ -2,21 +2,108 @@ from django.db import models
 from django.contrib.auth.models import User
 
 
+EXCERPT_LENGTH = 200
+
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    # kratak izvod za listu postova, secen na granici reci
+    text = ' '.join(content.split())
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0] or text[:length]
+    return cut + '…'
+
+
+class TimestampField(models.DateTimeField):
+    """
+    DateTimeField za auto_now/auto_now_add koji ne prepisuje vreme vec
+    postavljeno na instanci sa keep_timestamps = True (uvoz sa originalnim
+    vremenima). Za migracije je obican DateTimeField.
+    """
+    def pre_save(self, model_instance, add):
+        if getattr(model_instance, 'keep_timestamps', False):
+            return getattr(model_instance, self.attname)
+        return super().pre_save(model_instance, add)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        return name, 'django.db.models.DateTimeField', args, kwargs
+
+
 class BlogPost(models.Model):
     title = models.CharField(max_length=100)
     content = models.TextField()
     author = models.ForeignKey(User, on_delete = models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add = True)
-    update_at = models.DateTimeField(auto_now = True)
+    created_at = TimestampField(auto_now_add = True)
+    update_at = TimestampField(auto_now = True)
+    excerpt = models.CharField(max_length = EXCERPT_LENGTH + 1, blank = True, editable = False)
+    # denormalizovano, odrzava myblog/counters.py
+    comment_count = models.PositiveIntegerField(default = 0, editable = False)
+    last_comment_at = models.DateTimeField(null = True, blank = True, editable = False)
+    # broj pregleda, upisuje se u serijama (myblog/viewcounts.py)
+    views = models.PositiveIntegerField(default = 0, editable = False)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['created_at'], name='blogpost_created_idx'),
+            models.Index(fields=['author', 'created_at'], name='blogpost_author_created_idx'),
+            # MAX(update_at) za ETag liste postova
+            models.Index(fields=['update_at'], name='blogpost_update_idx'),
+            # ?order=views (najcitaniji)
+            models.Index(fields=['views'], name='blogpost_views_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.excerpt = make_excerpt(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
 class Comment(models.Model):
     blog_post = models.ForeignKey(BlogPost, on_delete=models.CASCADE)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = TimestampField(auto_now_add=True)
+    update_at = TimestampField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['blog_post', 'created_at'], name='comment_post_created_idx'),
+            models.Index(fields=['author', 'created_at'], name='comment_author_created_idx'),
+            # izvoz sa since: opseg po update_at, post_id se cita iz indeksa
+            models.Index(fields=['update_at', 'blog_post'], name='comment_update_post_idx'),
+        ]
 
     def __str__(self):
         return self.content[:50]
+
+
+class PostDocument(models.Model):
+    """
+    Gotov JSON detalja posta (GET /blogposts/<pk>/ bez parametara), odrzava
+    ga myblog/documents.py. Polja *_state su stanje posta iz kog je dokument
+    napravljen; dok se ne slazu sa bazom, detalji idu kroz serializer-e i kes.
+    """
+    post = models.OneToOneField(BlogPost, on_delete = models.CASCADE, primary_key = True, related_name = 'document')
+    body = models.BinaryField()
+    # (created_at, id) poslednjeg komentara u dokumentu, za kursor sledece strane
+    page_end_at = models.DateTimeField(null = True)
+    page_end_id = models.PositiveIntegerField(null = True)
+    update_state = models.DateTimeField(null = True)
+    comments_state = models.PositiveIntegerField(default = 0)
+    last_comment_state = models.DateTimeField(null = True)
+
+
+class RevokedToken(models.Model):
+    """
+    Opozvan API token (myblog/tokens.py). U bazi, a ne u kesu, jer kes
+    izbacuje stare kljuceve pod opterecenjem, pa bi opozvan token opet vazio.
+    """
+    jti = models.CharField(max_length = 32, primary_key = True)
+    expires_at = models.DateTimeField(db_index = True)
@@ -0,0 +1,216 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+Cursor = namedtuple('Cursor', ['position', 'reverse'])
+
+
+def cursor_token(cursor):
+    # vrednost `cursor` parametra u linkovima
+    value, pk = cursor.position
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    payload = json.dumps([value, pk, int(cursor.reverse)], separators=(',', ':'))
+    return urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) paginacija po paru (polje, id).
+
+    Umesto OFFSET-a kursor pamti poslednji red prethodne strane, pa je cena
+    svake strane ista bez obzira na velicinu tabele. Kursori su neprozirni
+    base64 stringovi.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Neispravan kursor.'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        return self.finish_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request)
+        return self.finish_page([obj async for obj in queryset])
+
+    def page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request, queryset.model)
+
+        self.forward = not self.cursor.reverse
+        order = self.ordering if self.forward else self._reversed(self.ordering)
+        queryset = queryset.order_by(*order)
+        if self.cursor.position is not None:
+            queryset = self.filter_after(queryset, self.cursor.position, self.forward)
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, results):
+        forward = self.forward
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if not forward:
+            results.reverse()
+
+        if forward:
+            self.has_next = has_more
+            self.has_previous = self.cursor.position is not None
+        else:
+            self.has_next = True
+            self.has_previous = has_more
+
+        if results:
+            self.next_position = self.get_position(results[-1])
+            self.previous_position = self.get_position(results[0])
+        else:
+            # prazna strana (npr. obrisani redovi), vracamo se sa iste pozicije
+            self.next_position = self.previous_position = self.cursor.position
+            if forward:
+                self.has_next = False
+            else:
+                self.has_previous = False
+
+        self.page = results
+        return results
+
+    def filter_after(self, queryset, position, forward):
+        # (polje, id) > pozicija u smeru sortiranja, napisano tako da baza
+        # moze da koristi indeks nad poljem: range + izbacivanje jednakih
+        field, tiebreak = (name.lstrip('-') for name in self.ordering)
+        descending = self.ordering[0].startswith('-')
+        op = 'lt' if descending == forward else 'gt'
+        value, pk = position
+        return queryset.filter(**{f'{field}__{op}e': value}).exclude(
+            **{field: value, f'{tiebreak}__{"gt" if op == "lt" else "lt"}e': pk}
+        )
+
+    def ordering_fields(self):
+        return tuple(name.lstrip('-') for name in self.ordering)
+
+    def get_position(self, item):
+        field, tiebreak = self.ordering_fields()
+        if isinstance(item, dict):
+            return (item[field], item[tiebreak])
+        return (getattr(item, field), getattr(item, tiebreak))
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(self.next_position, False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(self.previous_position, True))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return Cursor(None, False)
+
+        field, tiebreak = (name.lstrip('-') for name in self.ordering)
+        try:
+            value, pk, reverse = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            value = model._meta.get_field(field).to_python(value)
+            pk = model._meta.get_field(tiebreak).to_python(pk)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        if value is None or pk is None:
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor((value, pk), bool(reverse))
+
+    def encode_cursor(self, cursor):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor_token(cursor))
+
+    @staticmethod
+    def _reversed(ordering):
+        return tuple(name[1:] if name.startswith('-') else '-' + name for name in ordering)
+
+
+class BlogPostPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class CommentPagination(KeysetPagination):
+    page_size = 50
+    max_page_size = 200
+    ordering = ('created_at', 'id')
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Kursor za rezultate pretrage: pozicija je (rank, rowid), samo unapred.
+    Umesto queryset-a prima funkciju `search(after, limit)` koja vraca redove.
+    """
+    page_size = 20
+    max_page_size = 100
+    ordering = ('rank', 'rowid')
+
+    def paginate_queryset(self, search, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        results = search(self.cursor.position, self.page_size + 1)
+        self.has_next = len(results) > self.page_size
+        self.has_previous = False
+        results = results[:self.page_size]
+        if results:
+            self.next_position = self.get_position(results[-1])
+        return results
+
+    def decode_cursor(self, request, model=None):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return Cursor(None, False)
+        try:
+            rank, rowid, _ = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            return Cursor((float(rank), int(rowid)), False)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
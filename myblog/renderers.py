@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # bez orjson-a sve ide kroz standardni json
+    orjson = None
+
+
+# Brzi JSON renderer: sa orjson-om (ako je instaliran) pravi iste bajtove kao
+# DRF-ov JSONRenderer za nase podesavanje (COMPACT_JSON, UNICODE_JSON).
+# Datumi koje vrate serializer-i su vec stringovi (DATETIME_FORMAT), a
+# datetime/Decimal/lazy stringove van serializer-a formatira isti DRF-ov
+# JSONEncoder kao i do sada. Sve sto orjson ne pokriva ide u standardni json:
+# uvlacenje (?format=json; indent=4, browsable API), ensure_ascii, kljucevi
+# koji nisu stringovi, int-ovi veci od 64 bita.
+#
+# Jedina razlika je zapis float-ova: `rank` u rezultatima pretrage (bm25) moze
+# biti npr. -1.8e-6 umesto -1.8e-06 ili 0.000015 umesto 1.5e-05, ista vrednost
+# posle parsiranja. Kursor pretrage (sa rank-om) pravi standardni json u
+# pagination.cursor_token, pa ne zavisi od renderer-a.
+
+LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def available():
+    return orjson is not None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # kao DRF: U+2028 i U+2029 uvek escape-ovani (JSON kao podskup JavaScript-a)
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
@@ -0,0 +1,95 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+# Citanje sa replika. ReplicaMiddleware za GET na listu postova, detalj
+# posta, komentare i detalj komentara bira jednu repliku (tezinski
+# round-robin iz BLOG_READ_REPLICAS) i postavlja je ovde; ruter onda sve
+# upite nad modelima iz myblog-a tog zahteva salje na nju. Pisanje, sesije,
+# korisnici i svi ostali zahtevi idu na `default`.
+
+_read_alias = ContextVar('myblog_read_alias', default=None)
+
+
+def get_replicas():
+    # {'alias': tezina}, prazno = replike iskljucene
+    return getattr(settings, 'BLOG_READ_REPLICAS', {})
+
+
+def get_pin_seconds():
+    return getattr(settings, 'BLOG_REPLICA_PIN_SECONDS', 5)
+
+
+class WeightedRoundRobin:
+    """
+    "Smooth" tezinski round-robin (kao u nginx-u): za tezine {a: 2, b: 1}
+    redosled je a, b, a, a, b, a... bez grupisanja istog aliasa.
+    """
+
+    def __init__(self, weights):
+        self.weights = {alias: weight for alias, weight in weights.items() if weight > 0}
+        self.current = dict.fromkeys(self.weights, 0)
+        self.total = sum(self.weights.values())
+        self.lock = threading.Lock()
+
+    def next(self):
+        if not self.weights:
+            return None
+        with self.lock:
+            for alias, weight in self.weights.items():
+                self.current[alias] += weight
+            alias = max(self.current, key=self.current.get)
+            self.current[alias] -= self.total
+            return alias
+
+
+_selectors = {}
+
+
+def choose_replica():
+    replicas = get_replicas()
+    key = tuple(sorted(replicas.items()))
+    if key not in _selectors:
+        _selectors[key] = WeightedRoundRobin(replicas)
+    return _selectors[key].next()
+
+
+def read_alias():
+    return _read_alias.get()
+
+
+def set_read_alias(alias):
+    _read_alias.set(alias)
+
+
+@contextmanager
+def use_primary():
+    # npr. kad se podaci pisu u deljeni kes, ne smeju biti sa replike koja kasni
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'myblog':
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replike su kopije iste baze
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
@@ -0,0 +1,185 @@
+import html
+import re
+from functools import reduce
+from operator import and_
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import BlogPost, Comment
+
+
+# Pretraga postova i komentara.
+#
+# Na SQLite-u sa FTS5 koristi se virtuelna tabela `myblog_search` koju
+# migracija 0006 pravi i trigerima drzi uskladjenom sa tabelama postova i
+# komentara. rowid u njoj je id*2 za post i id*2+1 za komentar, pa su svi
+# trigeri pretraga po kljucu. Rezultati su sortirani po (rank, rowid),
+# gde je rank bm25 (manji je bolji), i taj par je ujedno i kursor.
+#
+# Na ostalim bazama (ili bez FTS5) radi se icontains pretraga, bez ranga.
+
+SEARCH_TABLE = 'myblog_search'
+SNIPPET_TOKENS = 12
+SNIPPET_CHARS = 60
+
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_fts_tables = {}
+
+# isti trigeri kao u migraciji 0006; SQLite brise trigere kad migracija
+# ponovo pravi tabelu (npr. AddField), pa ih post_migrate vraca
+SEARCH_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS myblog_search_post_insert AFTER INSERT ON myblog_blogpost BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, content, post_id)
+        VALUES (new.id * 2, new.title, new.content, new.id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS myblog_search_post_update AFTER UPDATE OF title, content ON myblog_blogpost BEGIN
+        UPDATE {SEARCH_TABLE} SET title = new.title, content = new.content WHERE rowid = new.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS myblog_search_post_delete AFTER DELETE ON myblog_blogpost BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS myblog_search_comment_insert AFTER INSERT ON myblog_comment BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, title, content, post_id)
+        VALUES (new.id * 2 + 1, '', new.content, new.blog_post_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS myblog_search_comment_update AFTER UPDATE OF content ON myblog_comment BEGIN
+        UPDATE {SEARCH_TABLE} SET content = new.content WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS myblog_search_comment_delete AFTER DELETE ON myblog_comment BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+
+def fts_available():
+    if connection.vendor != 'sqlite':
+        return False
+    key = (connection.alias, str(connection.settings_dict['NAME']))
+    if key not in _fts_tables:
+        _fts_tables[key] = SEARCH_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+def ensure_search_triggers(using='default'):
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or SEARCH_TABLE not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        for sql in SEARCH_TRIGGERS:
+            cursor.execute(sql)
+
+
+def search_terms(query):
+    return [term for term in query.split() if any(ch.isalnum() for ch in term)]
+
+
+def search_rows(query, after, limit):
+    """
+    Vraca najvise `limit` pogodaka posle pozicije `after` ((rank, rowid) ili None),
+    kao recnike sa kljucevima type, id, post_id, title, snippet, rank i rowid.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    if fts_available():
+        rows = _fts_search(terms, after, limit)
+    else:
+        rows = _like_search(terms, after, limit)
+
+    titles = dict(
+        BlogPost.objects
+        .filter(id__in={row['post_id'] for row in rows if row['type'] == 'comment'})
+        .values_list('id', 'title')
+    )
+    for row in rows:
+        if row['title'] is None:
+            row['title'] = titles.get(row['post_id'])
+    return rows
+
+
+def _fts_search(terms, after, limit):
+    match = ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+    sql = (
+        f'SELECT rowid, post_id, title, rank, '
+        f"snippet({SEARCH_TABLE}, -1, char(2), char(3), '…', {SNIPPET_TOKENS}) "
+        f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+    )
+    params = [match]
+    if after is not None:
+        sql += ' AND (rank, rowid) > (%s, %s)'
+        params += list(after)
+    sql += ' ORDER BY rank, rowid LIMIT %s'
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {
+                'type': 'comment' if rowid % 2 else 'post',
+                'id': rowid // 2,
+                'post_id': post_id,
+                'title': None if rowid % 2 else title,
+                'snippet': _render_marks(snippet),
+                'rank': rank,
+                'rowid': rowid,
+            }
+            for rowid, post_id, title, rank, snippet in cursor.fetchall()
+        ]
+
+
+def _like_search(terms, after, limit):
+    pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+    posts = BlogPost.objects.filter(
+        reduce(and_, (Q(title__icontains=term) | Q(content__icontains=term) for term in terms))
+    )
+    comms = Comment.objects.filter(reduce(and_, (Q(content__icontains=term) for term in terms)))
+    if after is not None:
+        rowid = after[1]
+        posts = posts.filter(id__gt=rowid // 2)
+        comms = comms.filter(id__gt=(rowid - 1) // 2)
+
+    rows = [
+        {
+            'type': 'post', 'id': post.id, 'post_id': post.id, 'title': post.title,
+            'snippet': _snippet(post.content if pattern.search(post.content) else post.title, pattern),
+            'rank': 0, 'rowid': post.id * 2,
+        }
+        for post in posts.order_by('id')[:limit]
+    ] + [
+        {
+            'type': 'comment', 'id': com.id, 'post_id': com.blog_post_id, 'title': None,
+            'snippet': _snippet(com.content, pattern),
+            'rank': 0, 'rowid': com.id * 2 + 1,
+        }
+        for com in comms.order_by('id')[:limit]
+    ]
+    rows.sort(key=lambda row: row['rowid'])
+    return rows[:limit]
+
+
+def _snippet(text, pattern):
+    match = pattern.search(text)
+    start = max(0, match.start() - SNIPPET_CHARS) if match else 0
+    end = min(len(text), (match.end() if match else 0) + SNIPPET_CHARS)
+    window = pattern.sub(lambda m: _MARK_START + m.group(0) + _MARK_END, text[start:end])
+    return _render_marks(('…' if start else '') + window + ('…' if end < len(text) else ''))
+
+
+def _render_marks(text):
+    # sadrzaj se escapuje, a samo oznake pogodaka postaju <mark>
+    return html.escape(text).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
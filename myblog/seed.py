@@ -0,0 +1,106 @@
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .bulk import get_batch_size
+from .cache import invalidate_feed, invalidate_posts
+from .counters import recount_comments
+from .models import BlogPost, Comment, make_excerpt
+
+
+# Sinteticki podaci za benchmark. Isti `seed` uvek daje iste korisnike,
+# naslove, sadrzaje i raspodelu komentara. Sve ide kroz bulk_create u
+# serijama, pa se u memoriji drzi samo jedna serija objekata (i id-jevi).
+
+SEED_PASSWORD = 'seed-blog'
+USERNAME_PREFIX = 'seed_user_'
+
+WORDS = (
+    'blog post komentar django brzina baza upit indeks kes kursor strana '
+    'autor naslov sadrzaj server klijent zahtev odgovor vreme mreza test '
+    'podatak lista detalj pretraga broj red tabela kolona verzija izmena'
+).split()
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def sentence(rng, min_words, max_words):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize()
+
+
+def seed_users(count, batch_size):
+    # isti hes lozinke za sve (fiksna so), hesiranje je skupo
+    password = make_password(SEED_PASSWORD, salt='seedblog')
+    existing = set(
+        User.objects.filter(username__startswith=USERNAME_PREFIX).values_list('username', flat=True)
+    )
+    users = (
+        User(username=f'{USERNAME_PREFIX}{i}', password=password, email=f'{USERNAME_PREFIX}{i}@example.com')
+        for i in range(count)
+        if f'{USERNAME_PREFIX}{i}' not in existing
+    )
+    for batch in batched(users, batch_size):
+        User.objects.bulk_create(batch)
+    return list(
+        User.objects.filter(username__in=[f'{USERNAME_PREFIX}{i}' for i in range(count)])
+        .order_by('id').values_list('id', flat=True)
+    )
+
+
+def seed_posts(count, user_ids, rng, batch_size):
+    post_ids = []
+
+    def posts():
+        for _ in range(count):
+            content = '\n\n'.join(sentence(rng, 20, 80) + '.' for _ in range(rng.randint(1, 5)))
+            yield BlogPost(
+                title=sentence(rng, 2, 8)[:100],
+                content=content,
+                excerpt=make_excerpt(content),
+                author_id=rng.choice(user_ids),
+            )
+
+    for batch in batched(posts(), batch_size):
+        BlogPost.objects.bulk_create(batch)
+        post_ids.extend(post.id for post in batch)
+    return post_ids
+
+
+def seed_comments(count, user_ids, post_ids, rng, batch_size):
+    def comments():
+        for _ in range(count):
+            yield Comment(
+                blog_post_id=rng.choice(post_ids),
+                author_id=rng.choice(user_ids),
+                content=sentence(rng, 3, 40),
+            )
+
+    for batch in batched(comments(), batch_size):
+        Comment.objects.bulk_create(batch)
+
+
+def seed_blog(users, posts, comments, seed=0, batch_size=None):
+    """
+    Pravi `users` korisnika (postojeci seed korisnici se ponovo koriste),
+    `posts` postova i `comments` komentara. Vraca id-jeve novih postova.
+    bulk_create ne salje signale, pa se brojaci i kes azuriraju na kraju.
+    """
+    rng = random.Random(seed)
+    batch_size = batch_size or get_batch_size()
+    with transaction.atomic():
+        user_ids = seed_users(max(users, 1), batch_size)
+        post_ids = seed_posts(posts, user_ids, rng, batch_size)
+        if post_ids and comments:
+            seed_comments(comments, user_ids, post_ids, rng, batch_size)
+            for batch in batched(post_ids, batch_size):
+                recount_comments(BlogPost.objects.filter(id__in=batch))
+    invalidate_posts()
+    invalidate_feed()
+    return post_ids
@@ -1,8 +1,22 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import BlogPost, Comment
 
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    # prima `fields` argument i ostavlja samo trazena polja (?fields=)
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class BlogPostSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    author_username = serializers.CharField(source='author.username', read_only=True)
+
     class Meta:
         model = BlogPost
         fields = '__all__'
@@ -25,7 +39,17 @@ class BlogPostSerializer(serializers.ModelSerializer):
         return value 
 
 
+# skracen prikaz za listu postova, bez celog sadrzaja
+class BlogPostSummarySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = BlogPost
+        fields = ('id', 'title', 'author', 'excerpt', 'created_at', 'update_at', 'comment_count', 'last_comment_at', 'views')
+        read_only_fields = fields
+
+
 class ComSerializer(serializers.ModelSerializer):
+    author_username = serializers.CharField(source='author.username', read_only=True)
+
     class Meta:
         model = Comment
         fields = '__all__'
@@ -36,7 +60,9 @@ class ComSerializer(serializers.ModelSerializer):
         user = request.user
         blog_post_id = self.context.get('pk')
         blog_post = BlogPost.objects.get(id=blog_post_id)
-        return Comment.objects.create(author=user, blog_post=blog_post, **validated_data)
+        # komentar i brojaci na postu (signal) zajedno
+        with transaction.atomic():
+            return Comment.objects.create(author=user, blog_post=blog_post, **validated_data)
     
     def update(self, instance, validated_data):
         request = self.context.get('request')
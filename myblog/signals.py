@@ -0,0 +1,44 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import documents
+from .cache import invalidate_feed, invalidate_post, invalidate_posts
+from .counters import comment_added, comment_removed
+from .models import BlogPost, Comment
+from .search import ensure_search_triggers
+
+
+@receiver([post_save, post_delete], sender=BlogPost)
+def blogpost_changed(sender, instance, created=False, **kwargs):
+    # dokument obrisanog posta brise CASCADE; izmena dokumenta se belezi
+    # pre invalidacije, pa se posle commit-a krpi pre nove verzije posta
+    if kwargs['signal'] is post_save:
+        documents.post_changed(instance.pk)
+    invalidate_post(instance.pk)
+    invalidate_posts()
+    invalidate_feed()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        comment_added(instance.blog_post_id, instance.created_at)
+    else:
+        documents.comment_changed(instance.blog_post_id, instance.id)
+        invalidate_post(instance.blog_post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, origin=None, **kwargs):
+    # komentari koji se brisu zajedno sa postom ne menjaju brojace
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is BlogPost:
+        return
+    comment_removed(instance.blog_post_id, [instance.id])
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'myblog':
+        ensure_search_triggers(using)
@@ -1,18 +1,70 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import os
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+from xml.etree import ElementTree
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from django.contrib.auth.models import User 
-from .models import BlogPost, Comment
+from .models import BlogPost, Comment, PostDocument, RevokedToken, EXCERPT_LENGTH, make_excerpt
 # za testiranje korisnika
 from django.test import Client
-from django.urls import reverse
+from django.urls import resolve, reverse
 from django.contrib import messages
 from django.core import mail
 from .forms import RegisterUserForm
 from django.contrib.auth import logout
 
 #from django.middleware.csrf import get_token
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
+from django.db import connection, connections, transaction
+from django.db.models import QuerySet
+from django.db.utils import ConnectionHandler
+from blog import sqlite as blog_sqlite
+from django.core.cache import cache, caches
+from .cache import cache_stats, cached_post_data, invalidate_post, post_version
+from .search import fts_available
+from . import async_views, bulk, compression, counters, documents, fastread, tokens, viewcounts, views
+from .serializer import BlogPostSerializer, BlogPostSummarySerializer, ComSerializer
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.decorators import api_view, renderer_classes
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from django.utils.translation import gettext_lazy
+from decimal import Decimal
+import datetime
+import zoneinfo
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+from .export import changed_posts, export_posts, gzip_stream, ndjson_lines
+from .middleware import PIN_COOKIE, CompressionMiddleware
+from .routers import ReplicaRouter, WeightedRoundRobin, read_alias, set_read_alias
+from .throttling import consume, parse_rate, take
+from .hashers import hashing_slot
+from .ingest import CommentIngestor
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils.cache import get_cache_key, learn_cache_key
+from django.utils import timezone
+
+
+def clear_caches():
+    # tela odgovora su u zasebnom aliasu (BLOG_RESPONSE_CACHE_ALIAS)
+    for alias in settings.CACHES:
+        caches[alias].clear()
 
 
 class BlogPostTests(APITestCase):
@@ -30,8 +82,8 @@ class BlogPostTests(APITestCase):
         url = '/api/blogposts/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)  # jedan post
-        self.assertEqual(response.data[0]['title'], 'Test naslov')
+        self.assertEqual(len(response.data['results']), 1)  # jedan post
+        self.assertEqual(response.data['results'][0]['title'], 'Test naslov')
 
     # NEMA POSTOVA ZA PRIKAZIVANJE
     def test_get_no_blogposts(self):
@@ -39,7 +91,7 @@ class BlogPostTests(APITestCase):
         url = '/api/blogposts/'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)  # nema postova
+        self.assertEqual(len(response.data['results']), 0)  # nema postova
 
     # KREIRANJE POSTA
     def test_blogpost_create(self):
@@ -451,6 +503,1277 @@ class BlogPostTests(APITestCase):
         self.assertFalse(Comment.objects.filter(id=self.comment.id).exists())
 
 
+# PAGINACIJA POSTOVA
+class BlogPostPaginationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.posts = [
+            BlogPost.objects.create(title=f'Post {i}', content='Test content', author=self.user)
+            for i in range(7)
+        ]
+        # isti created_at za nekoliko postova, id mora da razresi redosled
+        BlogPost.objects.filter(id__in=[p.id for p in self.posts[2:5]]).update(
+            created_at=self.posts[2].created_at
+        )
+
+    def collect(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [post['id'] for post in response.data['results']]
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_pages_cover_all_posts_once(self):
+        ids, pages = self.collect('/api/blogposts/?page_size=2')
+        expected = list(BlogPost.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 4)
+
+    def test_previous_link(self):
+        first = self.client.get('/api/blogposts/?page_size=3')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [post['id'] for post in back.data['results']],
+            [post['id'] for post in first.data['results']],
+        )
+        self.assertIsNone(back.data['previous'])
+
+    def test_default_page_size(self):
+        for i in range(25):
+            BlogPost.objects.create(title=f'Extra {i}', content='Test content', author=self.user)
+        response = self.client.get('/api/blogposts/')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_no_offset_in_query(self):
+        first = self.client.get('/api/blogposts/?page_size=2')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(first.data['next'])
+        # stanje za ETag + jedna strana
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertNotIn('OFFSET', ctx.captured_queries[1]['sql'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/blogposts/?cursor=nije-kursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+# SKRACEN PRIKAZ I ?fields=
+class BlogPostFieldsTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.long_content = ' '.join(['rec'] * 200)
+        self.blog_post = BlogPost.objects.create(title='Dug post', content=self.long_content, author=self.user)
+
+    def test_excerpt_saved_with_post(self):
+        self.assertTrue(self.blog_post.excerpt.endswith('…'))
+        self.assertLessEqual(len(self.blog_post.excerpt), EXCERPT_LENGTH + 1)
+        self.assertTrue(self.long_content.startswith(self.blog_post.excerpt[:-1]))
+
+        self.blog_post.content = 'Kratko'
+        self.blog_post.save()
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.excerpt, 'Kratko')
+
+    def test_list_returns_summary(self):
+        response = self.client.get('/api/blogposts/')
+        post = response.data['results'][0]
+        self.assertNotIn('content', post)
+        self.assertEqual(post['excerpt'], self.blog_post.excerpt)
+        self.assertEqual(
+            set(post), {
+                'id', 'title', 'author', 'excerpt', 'created_at', 'update_at',
+                'comment_count', 'last_comment_at', 'views',
+            }
+        )
+
+    def test_list_sparse_fields(self):
+        response = self.client.get('/api/blogposts/?fields=id,title,content')
+        post = response.data['results'][0]
+        self.assertEqual(set(post), {'id', 'title', 'content'})
+        self.assertEqual(post['content'], self.long_content)
+
+    def test_details_sparse_fields(self):
+        response = self.client.get(f'/api/blogposts/{self.blog_post.id}/?fields=title')
+        self.assertEqual(response.data['blog'], {'title': 'Dug post'})
+
+    def test_excerpt_read_only(self):
+        self.client.force_authenticate(user=self.user)
+        data = {'title': 'Novi', 'content': 'Sadrzaj', 'excerpt': 'podmetnut'}
+        response = self.client.post('/api/blogposts/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['excerpt'], 'Sadrzaj')
+
+
+# AUTORI U DETALJIMA, BROJ UPITA
+class PostDetailQueryTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+
+    def add_comments(self, count):
+        for i in range(count):
+            author = User.objects.create_user(username=f'citalac{Comment.objects.count()}')
+            Comment.objects.create(blog_post=self.blog_post, author=author, content=f'Komentar {i}')
+
+    def test_author_usernames(self):
+        self.add_comments(2)
+        for url in (f'/api/blogposts/{self.blog_post.id}/', f'/api/blogposts/{self.blog_post.id}/comments/'):
+            response = self.client.get(url).json()
+            self.assertEqual(response['blog']['author_username'], 'pera')
+            self.assertEqual(
+                [c['author_username'] for c in response['comms']],
+                ['citalac0', 'citalac1'],
+            )
+
+    def test_fixed_number_of_queries(self):
+        # stanje za ETag + post sa autorom + komentari sa autorima
+        # (bez parametara detalj je gotov dokument, vidi PostDocumentTests)
+        # brojac pregleda se prvo ucita u kes
+        self.client.get(f'/api/blogposts/{self.blog_post.id}/')
+        for count in (1, 10):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.add_comments(count)
+            with self.assertNumQueries(3):
+                self.client.get(f'/api/blogposts/{self.blog_post.id}/?order=oldest')
+            with self.assertNumQueries(3):
+                self.client.get(f'/api/blogposts/{self.blog_post.id}/comments/')
+
+    def test_comment_details_author(self):
+        self.add_comments(1)
+        comment = Comment.objects.get()
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/comments/{comment.id}/')
+        self.assertEqual(response.data['author_username'], 'citalac0')
+
+
+# PAGINACIJA KOMENTARA
+class CommentPaginationTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.comments = [
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content=f'Komentar {i}')
+            for i in range(5)
+        ]
+        self.ids = [c.id for c in self.comments]
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.data['comments_count'], 5)
+            ids += [c['id'] for c in response.data['comms']]
+            url = response.data['comments_next']
+        return ids
+
+    def test_oldest_first(self):
+        for url in (f'/api/blogposts/{self.blog_post.id}/', f'/api/blogposts/{self.blog_post.id}/comments/'):
+            self.assertEqual(self.collect(url + '?page_size=2'), self.ids)
+
+    @override_settings(ALLOWED_HOSTS=['internal.local', 'public.example.com', 'testserver'])
+    def test_links_use_request_host(self):
+        # ista strana na dva hosta: kesiran odgovor nosi linkove svog hosta
+        url = f'/api/blogposts/{self.blog_post.id}/comments/?page_size=2'
+        first = self.client.get(url, HTTP_HOST='internal.local')
+        second = self.client.get(first.data['comments_next'], HTTP_HOST='internal.local')
+        hosts = {'internal.local': 'http://internal.local/', 'public.example.com': 'https://public.example.com/'}
+        for host, prefix in hosts.items():
+            secure = prefix.startswith('https')
+            for page_url in (url, second.request['PATH_INFO'] + '?' + second.request['QUERY_STRING']):
+                response = self.client.get(page_url, HTTP_HOST=host, secure=secure)
+                links = [response.data['comments_next'], response.data['comments_previous']]
+                self.assertTrue(any(links), page_url)
+                for link in filter(None, links):
+                    self.assertTrue(link.startswith(prefix), link)
+        # i pod ASGI-jem (isti kes), treci host
+        response = async_to_sync(self.async_client.get)(url, secure=True)
+        self.assertTrue(json.loads(response.content)['comments_next'].startswith('https://testserver/'))
+
+    def test_newest_first(self):
+        url = f'/api/blogposts/{self.blog_post.id}/comments/?order=newest&page_size=2'
+        self.assertEqual(self.collect(url), self.ids[::-1])
+
+    def test_count_without_count_query(self):
+        url = f'/api/blogposts/{self.blog_post.id}/comments/'
+        for query in ('', '?page_size=2'):
+            # i uslovni upit (stanje za ETag) i strana komentara iz baze
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url + query)
+            self.assertEqual(response.data['comments_count'], 5)
+            self.assertTrue(ctx.captured_queries)
+            self.assertFalse([q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Jos jedan')
+        response = self.client.get(url)
+        self.assertEqual(response.data['comments_count'], 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comments[0].delete()
+        response = self.client.get(url)
+        self.assertEqual(response.data['comments_count'], 5)
+
+
+# BROJACI KOMENTARA NA POSTU
+class CommentCountersTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.comments_url = f'/api/blogposts/{self.blog_post.id}/comments/'
+
+    def list_post(self):
+        return self.client.get('/api/blogposts/').data['results'][0]
+
+    def test_counters_follow_api_writes(self):
+        post = self.list_post()
+        self.assertEqual(post['comment_count'], 0)
+        self.assertIsNone(post['last_comment_at'])
+
+        self.client.post(self.comments_url, {'content': 'Prvi'}, format='json')
+        self.client.post(self.comments_url, {'content': 'Drugi'}, format='json')
+        self.client.post(self.comments_url + 'bulk/', [{'content': 'Treci'}, {'content': 'Cetvrti'}], format='json')
+        self.blog_post.refresh_from_db()
+        latest = Comment.objects.latest('created_at', 'id')
+        self.assertEqual(self.blog_post.comment_count, 4)
+        self.assertEqual(self.blog_post.last_comment_at, latest.created_at)
+        self.assertEqual(self.list_post()['comment_count'], 4)
+
+        self.client.delete(f'/api/comments/{latest.id}/')
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 3)
+        self.assertEqual(self.blog_post.last_comment_at, Comment.objects.latest('created_at', 'id').created_at)
+
+    def test_drifted_counter_does_not_block_delete(self):
+        comment = Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Prvi')
+        BlogPost.objects.filter(id=self.blog_post.id).update(comment_count=0)
+        response = self.client.delete(f'/api/comments/{comment.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 0)
+        self.assertIsNone(self.blog_post.last_comment_at)
+
+    def test_list_has_no_extra_queries(self):
+        for i in range(5):
+            post = BlogPost.objects.create(title=f'Post {i}', content='Test content', author=self.user)
+            Comment.objects.create(blog_post=post, author=self.user, content='Komentar')
+        # stanje za ETag + strana postova
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/blogposts/')
+        self.assertEqual([p['comment_count'] for p in response.data['results']], [1] * 5 + [0])
+
+    def test_stale_read_before_commit_not_cached(self):
+        # citalac koji napuni kes pre commit-a ne sme da ostavi stare podatke
+        def writes():
+            yield lambda: Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Signal')
+            yield lambda: bulk.create_comments(self.user, self.blog_post.id, [{'content': 'Bulk'}])
+            yield lambda: CommentIngestor(autostart=False).insert(
+                [mock.Mock(comment=Comment(blog_post=self.blog_post, author=self.user, content='Ingest'))]
+            )
+            yield lambda: Comment.objects.latest('id').delete()
+
+        for write in writes():
+            with transaction.atomic(), self.captureOnCommitCallbacks(execute=True):
+                write()
+                cached_post_data(self.blog_post.id, 'comments', None, lambda: 'staro')
+            self.assertEqual(cached_post_data(self.blog_post.id, 'comments', None, lambda: 'novo'), 'novo')
+
+    def test_post_delete_skips_counters(self):
+        for i in range(3):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Komentar')
+        with CaptureQueriesContext(connection) as ctx:
+            self.blog_post.delete()
+        self.assertFalse(any(q['sql'].startswith('UPDATE') for q in ctx.captured_queries))
+
+    def test_recount_command(self):
+        for i in range(3):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Komentar')
+        BlogPost.objects.update(comment_count=42, last_comment_at=None)
+
+        out = StringIO()
+        call_command('recount_comments', batch_size=1, stdout=out)
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 3)
+        self.assertEqual(self.blog_post.last_comment_at, Comment.objects.latest('created_at', 'id').created_at)
+        self.assertIn('1', out.getvalue())
+
+
+# KES ODGOVORA
+class PostCacheTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.url = f'/api/blogposts/{self.blog_post.id}/'
+
+    def test_second_read_from_cache(self):
+        # podrazumevani prikaz ide iz dokumenta, ostali iz kesa
+        url = self.url + '?order=oldest'
+        self.client.get(url)
+        # ostaje samo stanje za ETag
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data['blog']['title'], 'Test naslov')
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_query_string_is_part_of_key(self):
+        self.client.get(self.url)
+        response = self.client.get(self.url + '?fields=title')
+        self.assertEqual(response.data['blog'], {'title': 'Test naslov'})
+
+    @override_settings(ALLOWED_HOSTS=['internal.local', 'public.example.com'])
+    def test_links_not_shared_between_hosts(self):
+        for i in range(3):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content=f'Komentar {i} ' * 200)
+        url = self.url + '?page_size=1'
+        internal = self.client.get(url, HTTP_HOST='internal.local')
+        public = self.client.get(url, HTTP_HOST='public.example.com', secure=True)
+        self.assertTrue(internal.data['comments_next'].startswith('http://internal.local/'))
+        self.assertTrue(public.data['comments_next'].startswith('https://public.example.com/'))
+        # i gzip iz kesa je po hostu
+        public = self.client.get(url, HTTP_HOST='public.example.com', HTTP_ACCEPT_ENCODING='gzip', secure=True)
+        self.assertIn(b'https://public.example.com/', gzip.decompress(public.content))
+
+    def test_invalidated_by_post_update(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(self.url, {'title': 'Novi naslov'}, format='json')
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['blog']['title'], 'Novi naslov')
+
+    def test_invalidated_by_comment(self):
+        comments_url = f'{self.url}comments/'
+        self.client.get(comments_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(comments_url, {'content': 'Novi komentar'}, format='json')
+        response = self.client.get(comments_url)
+        self.assertEqual(len(response.data['comms']), 1)
+
+        comment = Comment.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/comments/{comment.id}/')
+        response = self.client.get(comments_url)
+        self.assertEqual(len(response.data['comms']), 0)
+
+    def test_version_bumped_after_commit(self):
+        # unutar transakcije verzija ostaje ista, menja se tek posle commit-a
+        version = post_version(self.blog_post.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_post(self.blog_post.id)
+            self.assertEqual(post_version(self.blog_post.id), version)
+        self.assertNotEqual(post_version(self.blog_post.id), version)
+
+    def test_invalidated_by_post_delete(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog_post.delete()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stats_endpoint(self):
+        self.client.get(self.url + '?order=oldest')
+        response = self.client.get('/api/cache/stats/')
+        self.assertEqual(response.data, {'hits': 0, 'misses': 1})
+
+        self.client.force_authenticate(user=User.objects.create_user(username='marko'))
+        response = self.client.get('/api/cache/stats/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+# USLOVNI GET (ETag / Last-Modified)
+class ConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.comment = Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Komentar')
+        self.urls = [
+            '/api/blogposts/',
+            f'/api/blogposts/{self.blog_post.id}/',
+            f'/api/blogposts/{self.blog_post.id}/comments/',
+            f'/api/comments/{self.comment.id}/',
+        ]
+
+    def test_headers_present(self):
+        for url in self.urls:
+            response = self.client.get(url)
+            # telo sa trenutnim brojem pregleda ima slab ETag, komentar jak
+            self.assertEqual(response['ETag'].startswith('W/"'), url != self.urls[3], url)
+            self.assertIn('Last-Modified', response, url)
+
+    def test_not_modified_with_one_query(self):
+        for url in self.urls:
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+    def test_post_state_without_comments_scan(self):
+        # stanje posta je red posta (denormalizovani brojaci), bez upita nad komentarima
+        for i in range(5):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content=f'Komentar {i}')
+        for url in self.urls[1:3]:
+            etag = self.client.get(url)['ETag']
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+            self.assertEqual(len(ctx.captured_queries), 1)
+            self.assertNotIn('myblog_comment', ctx.captured_queries[0]['sql'])
+
+    def test_if_modified_since(self):
+        for url in self.urls:
+            last_modified = self.client.get(url)['Last-Modified']
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED, url)
+
+    def test_etag_changes_on_comment_edit(self):
+        url = f'/api/blogposts/{self.blog_post.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/comments/{self.comment.id}/', {'content': 'Izmenjen'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['comms'][0]['content'], 'Izmenjen')
+
+    def test_etag_changes_on_delete(self):
+        etag = self.client.get('/api/blogposts/')['ETag']
+        BlogPost.objects.create(title='Drugi', content='Test content', author=self.user)
+        self.client.delete(f'/api/blogposts/{self.blog_post.id}/')
+        response = self.client.get('/api/blogposts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @contextmanager
+    def later(self):
+        # commit i invalidacija (verzija u kesu) kao da je brisanje bilo nekoliko sekundi kasnije
+        with mock.patch('time.time_ns', return_value=time.time_ns() + 5 * 10 ** 9), \
+                self.captureOnCommitCallbacks(execute=True):
+            yield
+
+    def assertModifiedSince(self, url, last_modified):
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+
+    def test_if_modified_since_after_post_delete(self):
+        other = BlogPost.objects.create(title='Drugi', content='Test content', author=self.user)
+        last_modified = self.client.get('/api/blogposts/')['Last-Modified']
+        # obrisan je stariji post, MAX(update_at) ostaje isti
+        with self.later():
+            self.client.delete(f'/api/blogposts/{self.blog_post.id}/')
+        self.assertModifiedSince('/api/blogposts/', last_modified)
+        self.assertEqual([post['id'] for post in self.client.get('/api/blogposts/').json()['results']], [other.id])
+
+    def test_if_modified_since_after_comment_delete(self):
+        detail = f'/api/blogposts/{self.blog_post.id}/'
+        urls = (detail, f'{detail}comments/', f'{detail}?order=newest')
+        Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Drugi')
+        dates = {url: self.client.get(url)['Last-Modified'] for url in urls}
+        with self.later():
+            self.client.delete(f'/api/comments/{self.comment.id}/')
+        for url in urls:
+            self.assertModifiedSince(url, dates[url])
+        self.assertEqual([com['content'] for com in self.client.get(detail).json()['comms']], ['Drugi'])
+
+    def test_feed_if_modified_since_after_post_delete(self):
+        BlogPost.objects.create(title='Drugi', content='Test content', author=self.user)
+        last_modified = self.client.get('/api/feed.xml')['Last-Modified']
+        with self.later():
+            self.client.delete(f'/api/blogposts/{self.blog_post.id}/')
+        self.assertModifiedSince('/api/feed.xml', last_modified)
+
+    def test_etag_depends_on_query(self):
+        url = f'/api/blogposts/{self.blog_post.id}/'
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url + '?fields=title')['ETag'])
+
+    def test_missing_resource(self):
+        response = self.client.get('/api/blogposts/999/', HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+# MASOVNI UNOS
+class BulkCreateTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.non_staff_user = User.objects.create_user(username='marko', password='sifra2323', is_staff=False)
+        self.client.force_authenticate(user=self.user)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+
+    def test_bulk_posts(self):
+        data = [
+            {'title': 'Prvi', 'content': 'Sadrzaj 1'},
+            {'title': '', 'content': 'Bez naslova'},
+            {'title': 'Treci', 'content': 'Sadrzaj 3'},
+        ]
+        response = self.client.post('/api/blogposts/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([post['title'] for post in response.data['created']], ['Prvi', 'Treci'])
+        self.assertTrue(all(post['id'] for post in response.data['created']))
+        self.assertEqual([error['index'] for error in response.data['errors']], [1])
+        self.assertIn('title', response.data['errors'][0]['errors'])
+
+        post = BlogPost.objects.get(title='Treci')
+        self.assertEqual(post.author, self.user)
+        self.assertEqual(post.excerpt, 'Sadrzaj 3')
+
+    def test_bulk_posts_one_insert_per_batch(self):
+        data = [{'title': f'Post {i}', 'content': 'Sadrzaj'} for i in range(30)]
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post('/api/blogposts/bulk/', data, format='json')
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "myblog_blogpost"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(BlogPost.objects.count(), 31)
+
+    def test_bulk_posts_permissions(self):
+        data = [{'title': 'Prvi', 'content': 'Sadrzaj'}]
+        self.client.force_authenticate(user=self.non_staff_user)
+        response = self.client.post('/api/blogposts/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        response = self.client.post('/api/blogposts/bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_posts_not_a_list(self):
+        response = self.client.post('/api/blogposts/bulk/', {'title': 'Prvi', 'content': 'Sadrzaj'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIsNone(response.data['errors'][0]['index'])
+
+    def test_bulk_comments(self):
+        url = f'/api/blogposts/{self.blog_post.id}/comments/'
+        self.assertEqual(self.client.get(url).data['comments_count'], 0)
+
+        self.client.force_authenticate(user=self.non_staff_user)
+        data = [{'content': 'Prvi'}, {'content': '  '}, {'content': 'Treci'}]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url + 'bulk/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertEqual(response.data['created'][0]['author_username'], 'marko')
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+
+        # kes i broj komentara su osvezeni
+        response = self.client.get(url)
+        self.assertEqual(response.data['comments_count'], 2)
+        self.assertEqual([c['content'] for c in response.data['comms']], ['Prvi', 'Treci'])
+
+    def test_bulk_comments_all_invalid(self):
+        url = f'/api/blogposts/{self.blog_post.id}/comments/bulk/'
+        response = self.client.post(url, [{'content': ''}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Comment.objects.count(), 0)
+
+    def test_bulk_comments_missing_post(self):
+        response = self.client.post('/api/blogposts/999/comments/bulk/', [{'content': 'x'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+# ASYNC VIEW-OVI (ASGI)
+@override_settings(ROOT_URLCONF='blog.urls_async')
+class AsyncViewsTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        for i in range(3):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content=f'Komentar {i}')
+        self.comment = Comment.objects.first()
+        self.urls = [
+            '/api/blogposts/',
+            '/api/blogposts/?page_size=1&fields=id,title,author_username',
+            f'/api/blogposts/{self.blog_post.id}/',
+            f'/api/blogposts/{self.blog_post.id}/?order=newest&page_size=2',
+            f'/api/blogposts/{self.blog_post.id}/comments/',
+            f'/api/comments/{self.comment.id}/',
+            '/api/blogposts/999/',
+            '/api/blogposts/999/comments/',
+            '/api/comments/999/',
+            '/api/blogposts/?cursor=nije-kursor',
+        ]
+
+    def test_async_views_are_routed(self):
+        self.assertIs(resolve('/api/blogposts/').func, async_views.blogposts)
+        self.assertIs(resolve('/api/blogposts/1/').func, async_views.post_details)
+        self.assertIs(resolve('/api/blogposts/1/comments/').func, async_views.comments)
+        self.assertIs(resolve('/api/comments/1/').func, async_views.comments_details)
+        # ostale putanje ostaju sinhrone
+        self.assertIs(resolve('/api/search/').func, views.search)
+
+    def test_asgi_handler_uses_async_urlconf(self):
+        from blog.asgi import ASYNC_URLCONF, BlogASGIHandler
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/api/blogposts/', 'query_string': b'',
+            'headers': [(b'host', b'localhost')],
+        }
+        request, error = BlogASGIHandler().create_request(scope, BytesIO())
+        self.assertIsNone(error)
+        self.assertEqual(request.urlconf, ASYNC_URLCONF)
+
+    async def assertSameAsSync(self, url, headers=None):
+        headers = headers or {}
+        await sync_to_async(clear_caches)()
+        async_response = await self.async_client.get(url, headers=headers)
+        with override_settings(ROOT_URLCONF='blog.urls'):
+            await sync_to_async(clear_caches)()
+            sync_response = await sync_to_async(self.client.get)(url, headers={'accept': 'application/json', **headers})
+        self.assertEqual(async_response.status_code, sync_response.status_code, url)
+        self.assertEqual(async_response.get('WWW-Authenticate'), sync_response.get('WWW-Authenticate'), url)
+        async_data, sync_data = json.loads(async_response.content), json.loads(sync_response.content)
+        # svaki GET detalja je jos jedan pregled
+        if url.split('?')[0] == f'/api/blogposts/{self.blog_post.id}/' and async_response.status_code == 200:
+            self.assertEqual(sync_data['blog'].pop('views'), async_data['blog'].pop('views') + 1)
+        self.assertEqual(async_data, sync_data, url)
+        return async_response
+
+    async def test_same_output_as_sync_views(self):
+        for url in self.urls:
+            await self.assertSameAsSync(url)
+
+    async def test_authorization_same_as_sync_views(self):
+        # los token ili lozinka daju 401 i pod ASGI-jem, kao kroz DRF autentifikaciju
+        token = await sync_to_async(tokens.issue_token)(self.user)
+        basic = 'Basic ' + base64.b64encode(b'pera:pogresna').decode('ascii')
+        cases = {'Bearer nije-token': 401, 'Bearer': 401, basic: 401, f'Bearer {token}': 200}
+        for header, expected in cases.items():
+            for url in self.urls[:6]:
+                with self.subTest(header=header[:10], url=url):
+                    response = await self.assertSameAsSync(url, {'authorization': header})
+                    self.assertEqual(response.status_code, expected)
+
+    async def test_conditional_get(self):
+        url = f'/api/blogposts/{self.blog_post.id}/'
+        response = await self.async_client.get(url)
+        self.assertIn('ETag', response)
+        seen = json.loads(response.content)['blog']['views']
+        response = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # i 304 je pregled
+        response = await self.async_client.get(url)
+        self.assertEqual(json.loads(response.content)['blog']['views'], seen + 2)
+
+    async def test_content_negotiation_same_as_sync_views(self):
+        # sve sto nije obican JSON bira DRF: browsable API, uvlacenje, 406
+        cases = [
+            ('format=api', {}, 200, 'text/html'),
+            ('', {'accept': 'text/html'}, 200, 'text/html'),
+            ('', {'accept': 'application/json; indent=4'}, 200, 'application/json'),
+            ('', {'accept': 'application/xml'}, 406, 'application/json'),
+            ('format=xml', {}, 404, None),
+        ]
+        for url in self.urls[:6]:
+            for query, headers, expected, content_type in cases:
+                full_url = f"{url}{'&' if '?' in url else '?'}{query}" if query else url
+                with self.subTest(url=full_url, headers=headers):
+                    response = await self.async_client.get(full_url, headers=headers)
+                    with override_settings(ROOT_URLCONF='blog.urls'):
+                        sync_response = await sync_to_async(self.client.get)(full_url, headers=headers)
+                    self.assertEqual(response.status_code, expected)
+                    self.assertEqual(response.status_code, sync_response.status_code)
+                    if content_type:
+                        self.assertTrue(response['Content-Type'].startswith(content_type))
+                    if 'indent' in headers.get('accept', ''):
+                        self.assertIn(b'\n    ', response.content)
+                        self.assertIn(b'\n    ', sync_response.content)
+
+    async def test_writes_keep_permissions(self):
+        url = f'/api/blogposts/{self.blog_post.id}/comments/'
+        response = await self.async_client.post(url, {'content': 'Novi'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        marko = await User.objects.acreate(username='marko', is_staff=False)
+        await self.async_client.aforce_login(marko)
+        response = await self.async_client.post(url, {'content': 'Novi'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = await self.async_client.post(
+            '/api/blogposts/', {'title': 'Novi', 'content': 'Sadrzaj'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = await self.async_client.delete(f'/api/comments/{self.comment.id}/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+# IZVOZ
+class ExportTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.non_staff_user = User.objects.create_user(username='marko', password='sifra2323', is_staff=False)
+        self.client.force_authenticate(user=self.user)
+        self.posts = [
+            BlogPost.objects.create(title=f'Post {i}', content=f'Sadrzaj {i}', author=self.user)
+            for i in range(5)
+        ]
+        for i in range(3):
+            Comment.objects.create(blog_post=self.posts[1], author=self.non_staff_user, content=f'Komentar {i}')
+
+    def read_lines(self, response):
+        body = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return [json.loads(line) for line in body.decode('utf-8').splitlines()]
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=self.non_staff_user)
+        self.assertEqual(self.client.get('/api/export/').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        self.assertIn(self.client.get('/api/export/').status_code,
+                      (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_export_all_posts_with_comments(self):
+        response = self.client.get('/api/export/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn('X-Export-Until', response)
+
+        lines = self.read_lines(response)
+        self.assertEqual([line['id'] for line in lines], [post.id for post in self.posts])
+        self.assertEqual(lines[0]['author_username'], 'pera')
+        self.assertEqual(lines[0]['comments'], [])
+        self.assertEqual([com['content'] for com in lines[1]['comments']], ['Komentar 0', 'Komentar 1', 'Komentar 2'])
+        self.assertEqual(lines[1]['comments'][0]['author_username'], 'marko')
+
+    @override_settings(BLOG_EXPORT_BATCH_SIZE=2)
+    def test_batched_queries(self):
+        response = self.client.get('/api/export/')
+        with CaptureQueriesContext(connection) as ctx:
+            lines = self.read_lines(response)
+        self.assertEqual(len(lines), 5)
+        # 3 serije po 2 upita (postovi + komentari) i jedan prazan upit na kraju
+        self.assertEqual(len(ctx.captured_queries), 7)
+
+    def test_gzip(self):
+        response = self.client.get('/api/export/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(len(self.read_lines(response)), 5)
+
+    def test_since(self):
+        until = self.client.get('/api/export/')['X-Export-Until']
+        BlogPost.objects.filter(id=self.posts[3].id).update(update_at=timezone.now())
+        Comment.objects.create(blog_post=self.posts[0], author=self.user, content='Novi')
+
+        lines = self.read_lines(self.client.get('/api/export/', {'since': until}))
+        self.assertEqual([line['id'] for line in lines], [self.posts[0].id, self.posts[3].id])
+
+        lines = self.read_lines(self.client.get('/api/export/', {'since': '2000-01-01'}))
+        self.assertEqual(len(lines), 5)
+
+    def test_invalid_since(self):
+        response = self.client.get('/api/export/', {'since': 'juce'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# UVOZ
+class ImportBlogTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.user = User.objects.create_user(username='pera', password='kojot2323')
+        self.other = User.objects.create_user(username='marko', password='sifra2323')
+        for i in range(4):
+            post = BlogPost.objects.create(title=f'Post {i}', content=f'Sadrzaj {i} ' * 50, author=self.user)
+            for j in range(i):
+                Comment.objects.create(blog_post=post, author=self.other, content=f'Komentar {i}.{j}')
+
+    def write_archive(self, name='blog.ndjson.gz'):
+        path = os.path.join(self.tmp.name, name)
+        lines = ndjson_lines(export_posts())
+        with open(path, 'wb') as f:
+            for chunk in (gzip_stream(lines) if name.endswith('.gz') else lines):
+                f.write(chunk)
+        return path
+
+    def snapshot(self):
+        return (
+            list(BlogPost.objects.order_by('id').values_list(
+                'id', 'title', 'content', 'excerpt', 'author__username', 'created_at', 'update_at',
+                'comment_count', 'last_comment_at',
+            )),
+            list(Comment.objects.order_by('id').values_list(
+                'id', 'blog_post_id', 'author__username', 'content', 'created_at', 'update_at',
+            )),
+        )
+
+    def test_roundtrip(self):
+        before = self.snapshot()
+        path = self.write_archive()
+        BlogPost.objects.all().delete()
+        User.objects.filter(username='marko').delete()
+
+        out = StringIO()
+        call_command('import_blog', path, batch_size=2, commit_every=3, stdout=out)
+        self.assertIn('Uvezeno postova: 4, komentara: 6', out.getvalue())
+        self.assertEqual(self.snapshot(), before)
+        # korisnik koji ne postoji se pravi bez lozinke
+        self.assertFalse(User.objects.get(username='marko').has_usable_password())
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+        # ponovni uvoz sa istim id-jevima ne pravi duplikate
+        call_command('import_blog', path, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_conflicting_ids(self):
+        path = self.write_archive('blog.ndjson')
+        posts, comms = self.snapshot()
+        BlogPost.objects.all().delete()
+        # id-jeve Post 0, Post 1 i prvog komentara na Post 3 zauzimaju tudji redovi
+        taken = [BlogPost.objects.create(id=row[0], title='Tudji', content='x', author=self.other) for row in posts[:2]]
+        Comment.objects.create(id=comms[3][0], blog_post=taken[0], author=self.user, content='Tudji komentar')
+
+        call_command('import_blog', path, stdout=StringIO())
+        self.assertEqual(list(Comment.objects.filter(blog_post__in=taken).values_list('content', flat=True)), ['Tudji komentar'])
+        for i, row in enumerate(posts):
+            post = BlogPost.objects.get(title=f'Post {i}')
+            self.assertEqual(post.id == row[0], i >= 2)
+            self.assertEqual((post.created_at, post.update_at), row[5:7])
+            self.assertEqual(sorted(post.comment_set.values_list('content', flat=True)), [f'Komentar {i}.{j}' for j in range(i)])
+            self.assertEqual(post.comment_count, i)
+
+        # drugi uvoz prepoznaje vec uvezene postove sa istim id-jem
+        call_command('import_blog', path, stdout=StringIO())
+        self.assertEqual(BlogPost.objects.filter(title='Post 3').count(), 1)
+        self.assertEqual(BlogPost.objects.filter(title='Post 1').count(), 2)
+
+    def test_model_fields_untouched(self):
+        # vremena se ne cuvaju iskljucivanjem auto_now na polju, koje deli ceo proces
+        path = self.write_archive('blog.ndjson')
+        BlogPost.objects.all().delete()
+        bulk_create, flags = QuerySet.bulk_create, []
+
+        def checked(queryset, *args, **kwargs):
+            flags.append(queryset.model._meta.get_field('update_at').auto_now)
+            return bulk_create(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', autospec=True, side_effect=checked):
+            call_command('import_blog', path, stdout=StringIO())
+        self.assertEqual(flags, [True, True])
+
+    def test_new_ids(self):
+        path = self.write_archive('blog.ndjson')
+        call_command('import_blog', path, new_ids=True, stdout=StringIO())
+        self.assertEqual(BlogPost.objects.count(), 8)
+        self.assertEqual(Comment.objects.count(), 12)
+        copy = BlogPost.objects.filter(title='Post 3').order_by('id').last()
+        self.assertEqual(copy.comment_count, 3)
+        self.assertEqual(copy.comment_set.count(), 3)
+
+    def test_resume_from_checkpoint(self):
+        path = self.write_archive('blog.ndjson')
+        with open(path, 'rb') as f:
+            first_two = f.readline() + f.readline()
+        with open(path + '.checkpoint', 'w') as f:
+            json.dump({'line': 2, 'offset': len(first_two)}, f)
+        BlogPost.objects.all().delete()
+
+        call_command('import_blog', path, stdout=StringIO())
+        self.assertEqual(list(BlogPost.objects.values_list('title', flat=True)), ['Post 2', 'Post 3'])
+
+    def test_invalid_line_keeps_checkpoint(self):
+        path = self.write_archive('blog.ndjson')
+        with open(path, 'ab') as f:
+            f.write(b'{"title": "bez sadrzaja"\n')
+        BlogPost.objects.all().delete()
+
+        with self.assertRaisesMessage(CommandError, 'Red 5'):
+            call_command('import_blog', path, batch_size=1, commit_every=1, stdout=StringIO())
+        self.assertEqual(BlogPost.objects.count(), 4)
+        with open(path + '.checkpoint') as f:
+            self.assertEqual(json.load(f)['line'], 4)
+
+
+# SQLITE PROFIL
+class SQLitePerformanceTests(TestCase):
+
+    def make_connection(self, **db_settings):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        handler = ConnectionHandler({'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(tmp.name, 'perf.sqlite3'),
+            **db_settings,
+        }})
+        conn = handler['default']
+        self.addCleanup(conn.close)
+        return conn
+
+    def pragma(self, conn, name):
+        with conn.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_enabled_from_environment(self):
+        self.assertTrue(blog_sqlite.enabled({'BLOG_SQLITE_PERFORMANCE': '1'}))
+        self.assertTrue(blog_sqlite.enabled({'BLOG_SQLITE_PERFORMANCE': 'true'}))
+        self.assertFalse(blog_sqlite.enabled({'BLOG_SQLITE_PERFORMANCE': '0'}))
+        self.assertFalse(blog_sqlite.enabled({}))
+
+    def test_pragmas_applied_on_new_connection(self):
+        conn = self.make_connection(**blog_sqlite.performance_settings())
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conn, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(conn, 'mmap_size'), blog_sqlite.PERFORMANCE_PRAGMAS['mmap_size'])
+        self.assertEqual(self.pragma(conn, 'cache_size'), blog_sqlite.PERFORMANCE_PRAGMAS['cache_size'])
+        self.assertEqual(self.pragma(conn, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(conn, 'temp_store'), 2)  # MEMORY
+        self.assertEqual(conn.transaction_mode, 'IMMEDIATE')
+
+        # posle ponovnog povezivanja pragme se opet primenjuju
+        conn.close()
+        self.assertEqual(self.pragma(conn, 'busy_timeout'), 5000)
+
+    def test_persistent_connection_with_health_checks(self):
+        conn = self.make_connection(**blog_sqlite.performance_settings(conn_max_age=600))
+        conn.ensure_connection()
+        self.assertTrue(conn.health_check_enabled)
+        self.assertIsNotNone(conn.close_at)
+
+        raw = conn.connection
+        conn.close_if_unusable_or_obsolete()
+        self.assertIs(conn.connection, raw)
+
+    def test_default_profile_unchanged(self):
+        conn = self.make_connection()
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'delete')
+        self.assertIsNone(conn.transaction_mode)
+
+
+# REPLIKE ZA CITANJE
+@override_settings(BLOG_READ_REPLICAS={'replica1': 2, 'replica2': 1}, BLOG_REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(APITestCase):
+    replicas = ('replica1', 'replica2')
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.comment = Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Komentar')
+        # replike u testu su ista konekcija kao default (kao TEST MIRROR)
+        for alias in self.replicas:
+            connections.settings[alias] = connections.settings['default']
+            connections[alias] = connections['default']
+            self.addCleanup(connections.settings.pop, alias)
+            self.addCleanup(delattr, connections._connections, alias)
+        self.reads = []
+        original = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = original(router, model, **hints)
+            self.reads.append((model._meta.label, alias))
+            return alias
+
+        patcher = mock.patch.object(ReplicaRouter, 'db_for_read', record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def aliases(self, label='myblog.BlogPost'):
+        return {alias for model, alias in self.reads if model == label}
+
+    def test_weighted_round_robin(self):
+        selector = WeightedRoundRobin({'a': 2, 'b': 1, 'c': 0})
+        self.assertEqual([selector.next() for _ in range(6)], ['a', 'b', 'a', 'a', 'b', 'a'])
+        self.assertIsNone(WeightedRoundRobin({}).next())
+
+    def test_reads_go_to_replicas(self):
+        for url in ('/api/blogposts/', f'/api/blogposts/{self.blog_post.id}/',
+                    f'/api/blogposts/{self.blog_post.id}/comments/', f'/api/comments/{self.comment.id}/'):
+            self.client.get(url)  # kes
+            self.reads.clear()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+            used = {alias for model, alias in self.reads if model.startswith('myblog.')}
+            self.assertTrue(used, url)
+            self.assertLessEqual(used, set(self.replicas), url)
+        self.assertIsNone(read_alias())
+
+    @override_settings(ROOT_URLCONF='blog.urls_async')
+    async def test_async_views_read_from_replicas(self):
+        response = await self.async_client.get('/api/blogposts/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.aliases())
+        self.assertLessEqual(self.aliases(), set(self.replicas))
+
+    def test_one_replica_per_request_round_robin(self):
+        used = []
+        for _ in range(3):
+            self.reads.clear()
+            self.client.get('/api/blogposts/')
+            self.assertEqual(len(self.aliases()), 1)
+            used.append(self.aliases().pop())
+        self.assertEqual(sorted(used), ['replica1', 'replica1', 'replica2'])
+
+    def test_other_views_and_models_use_primary(self):
+        self.client.get('/api/search/', {'q': 'Komentar'})
+        self.assertEqual(self.aliases(), {None})
+
+        set_read_alias('replica1')
+        self.addCleanup(set_read_alias, None)
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(BlogPost), 'replica1')
+        self.assertIsNone(router.db_for_read(User))
+        self.assertEqual(router.db_for_write(BlogPost), 'default')
+        self.assertFalse(router.allow_migrate('replica1', 'myblog'))
+
+    def test_document_read_with_state(self):
+        # dokument i stanje za ETag sa iste replike
+        documents.build(self.blog_post.id)
+        served = []
+
+        def document_for(pk, state):
+            doc = original(pk, state)
+            served.append((state['alias'], doc is not None))
+            return doc
+
+        original = documents.document_for
+        for _ in range(3):
+            self.reads.clear()
+            served.clear()
+            with mock.patch('myblog.documents.document_for', document_for):
+                self.client.get(f'/api/blogposts/{self.blog_post.id}/')
+            self.assertEqual([found for alias, found in served], [True])
+            self.assertEqual({alias for alias, found in served}, self.aliases())
+            self.assertLessEqual(self.aliases(), set(self.replicas))
+
+    def test_cache_is_built_from_primary(self):
+        self.client.get(f'/api/blogposts/{self.blog_post.id}/')
+        detail_reads = [alias for model, alias in self.reads if model == 'myblog.Comment']
+        self.assertEqual(set(detail_reads), {None})
+
+    def test_read_your_writes(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f'/api/blogposts/{self.blog_post.id}/comments/', {'content': 'Novi'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        self.reads.clear()
+        self.client.get('/api/blogposts/')
+        self.assertEqual(self.aliases(), {None})
+
+        # posle isteka prozora opet replike
+        with mock.patch('myblog.middleware.time.time', return_value=time.time() + 10):
+            self.reads.clear()
+            self.client.get('/api/blogposts/')
+        self.assertTrue(self.aliases() <= set(self.replicas))
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post(f'/api/blogposts/{self.blog_post.id}/comments/', {'content': 'Novi'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(BLOG_READ_REPLICAS={})
+    def test_disabled_without_replicas(self):
+        self.client.get('/api/blogposts/')
+        self.assertEqual(self.aliases(), {None})
+
+
+# SINTETICKI PODACI I BENCHMARK
+class SeedBlogTests(TestCase):
+
+    def test_seed_is_deterministic(self):
+        call_command('seed_blog', users=3, posts=20, comments=100, seed=7, batch_size=8, stdout=StringIO())
+        first = list(BlogPost.objects.order_by('id').values_list('title', 'content', 'author__username', 'comment_count'))
+        BlogPost.objects.all().delete()
+
+        call_command('seed_blog', users=3, posts=20, comments=100, seed=7, batch_size=8, stdout=StringIO())
+        second = list(BlogPost.objects.order_by('id').values_list('title', 'content', 'author__username', 'comment_count'))
+        self.assertEqual(first, second)
+        self.assertEqual(User.objects.filter(username__startswith='seed_user_').count(), 3)
+
+    def test_seed_updates_counters_and_excerpts(self):
+        call_command('seed_blog', users=2, posts=10, comments=50, stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 50)
+        for post in BlogPost.objects.all():
+            self.assertEqual(post.comment_count, post.comment_set.count())
+            self.assertEqual(post.excerpt, make_excerpt(post.content))
+
+    def test_compare_results(self):
+        from .bench import compare, summarize
+        before = {'endpoints': {'blogposts': summarize([0.01, 0.02, 0.03], 1.0, [200, 200, 200], [2, 2, 2])}}
+        after = {'endpoints': {'blogposts': summarize([0.01, 0.02, 0.03], 0.5, [200, 200, 500], [1, 1, 1])}}
+        self.assertEqual(after['endpoints']['blogposts']['errors'], 1)
+        # 429 je svoja kolona, van latencija
+        throttled = summarize([0.01, 5.0, 5.0], 1.0, [201, 429, 429], [3, 0, 0])
+        self.assertEqual((throttled['requests'], throttled['throttled'], throttled['errors']), (1, 2, 0))
+        self.assertAlmostEqual(throttled['p99_ms'], 10.0)
+        self.assertEqual(throttled['queries_per_request'], 3)
+        diff = compare(before, after)
+        self.assertAlmostEqual(diff['blogposts']['rps'], 100.0)
+        self.assertAlmostEqual(diff['blogposts']['queries_per_request'], -50.0)
+
+
+# PRETRAGA
+class SearchTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.in_title = BlogPost.objects.create(title='Django brzina', content='Nesto drugo', author=self.user)
+        self.in_content = BlogPost.objects.create(title='Drugi post', content='Pisem o <b>django</b> aplikaciji', author=self.user)
+        self.other = BlogPost.objects.create(title='Treci post', content='Bez pojma', author=self.user)
+        self.comment = Comment.objects.create(blog_post=self.other, author=self.user, content='Koristim django svaki dan')
+
+    def search(self, query, **params):
+        return self.client.get('/api/search/', {'q': query, **params})
+
+    def test_posts_and_comments(self):
+        response = self.search('django')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        found = {(row['type'], row['id']) for row in response.data['results']}
+        self.assertEqual(found, {
+            ('post', self.in_title.id), ('post', self.in_content.id), ('comment', self.comment.id),
+        })
+        comment = next(row for row in response.data['results'] if row['type'] == 'comment')
+        self.assertEqual(comment['post_id'], self.other.id)
+        self.assertEqual(comment['title'], 'Treci post')
+
+    def test_snippet_is_escaped(self):
+        response = self.search('django')
+        row = next(row for row in response.data['results'] if row['id'] == self.in_content.id and row['type'] == 'post')
+        self.assertIn('<mark>django</mark>', row['snippet'])
+        self.assertIn('&lt;b&gt;', row['snippet'])
+
+    def test_cursor_pages(self):
+        ids, url = [], '/api/search/?q=django&page_size=1'
+        while url:
+            response = self.client.get(url)
+            ids += [(row['type'], row['id']) for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(len(set(ids)), 3)
+
+    def test_empty_query(self):
+        self.assertEqual(self.search('').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search('"  ').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fallback_without_fts(self):
+        with mock.patch('myblog.search.fts_available', return_value=False):
+            response = self.search('DJANGO')
+            found = {(row['type'], row['id']) for row in response.data['results']}
+            self.assertEqual(len(found), 3)
+            row = next(row for row in response.data['results'] if row['id'] == self.in_content.id and row['type'] == 'post')
+            self.assertIn('<mark>django</mark>', row['snippet'])
+
+            ids, url = [], '/api/search/?q=django&page_size=1'
+            while url:
+                response = self.client.get(url)
+                ids += [(row['type'], row['id']) for row in response.data['results']]
+                url = response.data['next']
+            self.assertEqual(set(ids), found)
+
+
+class SearchIndexTests(APITestCase):
+
+    def setUp(self):
+        if not fts_available():
+            self.skipTest('FTS5 nije dostupan')
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.post = BlogPost.objects.create(title='Pocetak', content='Prvi sadrzaj', author=self.user)
+
+    def found(self, query):
+        return {(row['type'], row['id']) for row in self.client.get('/api/search/', {'q': query}).data['results']}
+
+    def test_title_ranks_above_content(self):
+        other = BlogPost.objects.create(title='Drugo', content='pocetak je u tekstu', author=self.user)
+        results = self.client.get('/api/search/', {'q': 'pocetak'}).data['results']
+        self.assertEqual([row['id'] for row in results], [self.post.id, other.id])
+
+    def test_triggers_follow_changes(self):
+        self.post.content = 'Promenjen sadrzaj'
+        self.post.save()
+        self.assertEqual(self.found('prvi'), set())
+        self.assertEqual(self.found('promenjen'), {('post', self.post.id)})
+
+        comment = Comment.objects.create(blog_post=self.post, author=self.user, content='Komentar ovde')
+        self.assertEqual(self.found('komentar'), {('comment', comment.id)})
+        comment.content = 'Izmenjeno'
+        comment.save()
+        self.assertEqual(self.found('komentar'), set())
+
+        self.post.delete()
+        self.assertEqual(self.found('promenjen'), set())
+        self.assertEqual(self.found('izmenjeno'), set())
+
+
+# PLAN UPITA (EXPLAIN)
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN je specifican za SQLite')
+class QueryPlanTests(APITestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.posts = [
+            BlogPost.objects.create(title=f'Post {i}', content='Test content', author=self.user)
+            for i in range(3)
+        ]
+        for post in self.posts:
+            for i in range(3):
+                Comment.objects.create(blog_post=post, author=self.user, content=f'Komentar {i}')
+
+    def hot_queries(self):
+        post = self.posts[0]
+        comment = Comment.objects.filter(blog_post=post).first()
+        with CaptureQueriesContext(connection) as ctx:
+            first = self.client.get('/api/blogposts/?page_size=1')
+            self.client.get(first.data['next'])
+            self.client.get('/api/blogposts/?page_size=1&fields=id,title,author_username')
+            for url in (f'/api/blogposts/{post.id}/', f'/api/blogposts/{post.id}/comments/'):
+                for order in ('oldest', 'newest'):
+                    clear_caches()
+                    page = self.client.get(f'{url}?page_size=1&order={order}')
+                    self.client.get(page.data['comments_next'])
+            self.client.get(f'/api/comments/{comment.id}/')
+        return [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+
+    def test_no_full_scans(self):
+        queries = self.hot_queries()
+        self.assertTrue(queries)
+        with connection.cursor() as cursor:
+            for sql in queries:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+                for step in plan:
+                    self.assertNotIn('USE TEMP B-TREE', step, f'{sql}\n{plan}')
+                    if ' WHERE ' in sql:
+                        # upit sa filterom mora da trazi po indeksu, SCAN ... USING INDEX cita celu tabelu
+                        self.assertRegex(step, r'^SEARCH ', f'{sql}\n{plan}')
+                    elif step.startswith('SCAN '):
+                        # prva strana bez filtera sme samo da ide redom po indeksu do LIMIT-a
+                        self.assertRegex(step, r'^SCAN \w+ USING INDEX ', f'{sql}\n{plan}')
+                        self.assertIn(' LIMIT ', sql, f'{sql}\n{plan}')
+
+    def test_export_since_searches_comments_by_index(self):
+        sql, params = changed_posts(timezone.now()).values('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        # komentari izmenjeni posle since, bez citanja same tabele komentara
+        self.assertTrue(any(
+            step.startswith('SEARCH ') and 'COVERING INDEX comment_update_post_idx' in step for step in plan
+        ), plan)
+
+
 # TESTIRANJE KORISNIKA
 class UserRegistrationTests(TestCase):
     def setUp(self):
@@ -606,3 +1929,1323 @@ class LogoutUserTestCase(TestCase):
 
     
 
+
+
+# API TOKENI
+
+class TokenAuthTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.staff = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.user = User.objects.create_user(username='marko', password='sifra2323', is_staff=False)
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.staff)
+
+    def login(self, username, password):
+        response = self.client.post(reverse('login_token'), {'username': username, 'password': password}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['token']
+
+    def use(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_login_token(self):
+        response = self.client.post(reverse('login_token'), {'username': 'pera', 'password': 'kojot2323'}, format='json')
+        self.assertEqual(response.data['token_type'], 'Bearer')
+        self.assertEqual(response.data['expires_in'], 3600)
+
+        response = self.client.post(reverse('login_token'), {'username': 'pera', 'password': 'pogresna'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('login_token'), {'username': 'pera'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_check_without_queries(self):
+        self.use(self.login('marko', 'sifra2323'))
+        # jedini upit je provera opoziva, korisnik se ne cita
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/blogposts/', {'title': 'Novi', 'content': 'Sadrzaj'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.use(self.login('pera', 'kojot2323'))
+        response = self.client.post('/api/blogposts/', {'title': 'Novi', 'content': 'Sadrzaj'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(BlogPost.objects.get(title='Novi').author, self.staff)
+
+    def test_write_as_token_user(self):
+        self.use(self.login('marko', 'sifra2323'))
+        response = self.client.post(f'/api/blogposts/{self.blog_post.id}/comments/', {'content': 'Novi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['author_username'], 'marko')
+
+        com_id = response.data['id']
+        response = self.client.put(f'/api/comments/{com_id}/', {'content': 'Izmenjen'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_tokens(self):
+        token = self.login('marko', 'sifra2323')
+        for bad in (token[:-2] + 'xx', 'nije-token', f'{token} visak'):
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {bad}')
+            response = self.client.post(f'/api/blogposts/{self.blog_post.id}/comments/', {'content': 'Novi'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED, bad)
+            self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+    def test_expired_token(self):
+        self.use(self.login('marko', 'sifra2323'))
+        with override_settings(BLOG_TOKEN_TTL=-1):
+            response = self.client.post(f'/api/blogposts/{self.blog_post.id}/comments/', {'content': 'Novi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['detail'], 'Token je istekao.')
+
+    def test_revoked_token(self):
+        token = self.login('marko', 'sifra2323')
+        self.use(token)
+        self.assertEqual(self.client.post(reverse('logout_token')).status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.post(f'/api/blogposts/{self.blog_post.id}/comments/', {'content': 'Novi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['detail'], 'Token je opozvan.')
+
+        # ostali tokeni istog korisnika i dalje vaze
+        self.use(self.login('marko', 'sifra2323'))
+        response = self.client.post(f'/api/blogposts/{self.blog_post.id}/comments/', {'content': 'Novi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_revocation_survives_cache_eviction(self):
+        token = self.login('marko', 'sifra2323')
+        self.use(token)
+        self.client.post(reverse('logout_token'))
+        # opoziv nije u kesu: ni puno novih kljuceva ni praznjenje kesa ga ne brisu
+        for i in range(400):
+            self.client.get(f'/api/blogposts/{self.blog_post.id}/comments/', {'x': i})
+        clear_caches()
+        response = self.client.post(f'/api/blogposts/{self.blog_post.id}/comments/', {'content': 'Novi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data['detail'], 'Token je opozvan.')
+
+    def test_expired_revocations_are_removed(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti='stari', expires_at=now - datetime.timedelta(seconds=1))
+        tokens.revoke({'jti': 'novi'})
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['novi'])
+        self.assertTrue(tokens.is_revoked('novi'))
+        self.assertFalse(tokens.is_revoked('stari'))
+
+    def test_logout_token_requires_token(self):
+        self.assertEqual(self.client.post(reverse('logout_token')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+# OGRANICENJA ZAHTEVA
+
+class ThrottlingTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323')
+        self.other = User.objects.create_user(username='marko', password='sifra2323')
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.url = f'/api/blogposts/{self.blog_post.id}/comments/'
+
+    def post_comment(self, user, ip='10.0.0.1'):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.url, {'content': 'Komentar'}, format='json', REMOTE_ADDR=ip)
+
+    def test_token_bucket(self):
+        self.assertEqual(parse_rate('10/min'), (10, 60))
+        self.assertEqual(parse_rate('5/10s'), (5, 10))
+        self.assertEqual(parse_rate('100/hour'), (100, 3600))
+
+        now = 1000.0
+        self.assertEqual(consume('test', 'a', '2/min', now=now), 0)
+        self.assertEqual(consume('test', 'a', '2/min', now=now), 0)
+        self.assertAlmostEqual(consume('test', 'a', '2/min', now=now), 30)
+        # posle 30 s kanta ima jedan token
+        self.assertEqual(consume('test', 'a', '2/min', now=now + 30), 0)
+        self.assertGreater(consume('test', 'a', '2/min', now=now + 30), 0)
+        self.assertEqual(consume('test', 'b', '2/min', now=now), 0)
+
+    @override_settings(BLOG_RATE_LIMITS={'comment_user': '2/min'})
+    def test_comment_per_user(self):
+        self.assertEqual(self.post_comment(self.user).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post_comment(self.user).status_code, status.HTTP_201_CREATED)
+        response = self.post_comment(self.user)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn(int(response['Retry-After']), (29, 30))
+
+        # drugi korisnik i citanje nisu ograniceni
+        self.assertEqual(self.post_comment(self.other).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+        self.assertEqual(Comment.objects.count(), 3)
+
+    def test_denied_bucket_takes_nothing(self):
+        now = 1000.0
+        self.assertEqual(take([('test', 'a', '1/min'), ('test', 'all', '3/min')], now=now), 0)
+        for _ in range(5):
+            self.assertAlmostEqual(take([('test', 'a', '1/min'), ('test', 'all', '3/min')], now=now), 60)
+        # zajednicka kanta ima jos dva tokena
+        self.assertEqual(consume('test', 'all', '3/min', now=now), 0)
+        self.assertEqual(consume('test', 'all', '3/min', now=now), 0)
+        self.assertGreater(consume('test', 'all', '3/min', now=now), 0)
+
+    def test_concurrent_requests_spend_distinct_tokens(self):
+        # cache.get koji je sporiji od upisa: bez brave bi svi procitali punu kantu
+        from concurrent.futures import ThreadPoolExecutor
+        cache_class = type(caches['throttle'])
+        get_many = cache_class.get_many
+
+        def slow_get_many(self, keys, version=None):
+            states = get_many(self, keys, version)
+            time.sleep(0.005)
+            return states
+
+        with mock.patch.object(cache_class, 'get_many', slow_get_many):
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                waits = list(pool.map(lambda _: consume('test', 'a', '5/min', now=1000.0), range(20)))
+        self.assertEqual(waits.count(0), 5)
+
+    @override_settings(BLOG_RATE_LIMITS={'comment_user': '2/min'})
+    def test_limits_survive_response_cache_churn(self):
+        for _ in range(2):
+            self.assertEqual(self.post_comment(self.user).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post_comment(self.user).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.client.force_authenticate(user=None)
+        for i in range(400):
+            self.client.get(self.url, {'x': i})
+        self.assertEqual(self.post_comment(self.user).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(BLOG_RATE_LIMITS={'comment_user': '2/min', 'comment': '5/min'})
+    def test_flooder_does_not_drain_global_bucket(self):
+        codes = [self.post_comment(self.user).status_code for _ in range(10)]
+        self.assertEqual(codes, [status.HTTP_201_CREATED] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS] * 8)
+        self.assertEqual(self.post_comment(self.other, ip='10.0.0.2').status_code, status.HTTP_201_CREATED)
+
+    @override_settings(BLOG_RATE_LIMITS={'login_ip': '1/min', 'login': '3/min'})
+    def test_login_flooder_does_not_drain_global_bucket(self):
+        data = {'username': 'pera', 'password': 'pogresna'}
+        codes = [
+            self.client.post(reverse('login_token'), data, format='json', REMOTE_ADDR='10.0.0.1').status_code
+            for _ in range(6)
+        ]
+        self.assertEqual(codes, [status.HTTP_401_UNAUTHORIZED] + [status.HTTP_429_TOO_MANY_REQUESTS] * 5)
+        data = {'username': 'marko', 'password': 'sifra2323'}
+        response = self.client.post(reverse('login_token'), data, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(BLOG_RATE_LIMITS={'comment_ip': '1/min'})
+    def test_comment_per_ip(self):
+        self.assertEqual(self.post_comment(self.user).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post_comment(self.other).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.post_comment(self.other, ip='10.0.0.2').status_code, status.HTTP_201_CREATED)
+
+    @override_settings(BLOG_RATE_LIMITS={'comment': '1/min'})
+    def test_comment_endpoint(self):
+        self.assertEqual(self.post_comment(self.user).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.post_comment(self.other, ip='10.0.0.2').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.client.force_authenticate(user=self.other)
+        response = self.client.post(f'{self.url}bulk/', [{'content': 'Jedan'}], format='json', REMOTE_ADDR='10.0.0.3')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(BLOG_RATE_LIMITS={'login_ip': '1/min'})
+    def test_login_user_form(self):
+        self.client.post(reverse('login_user'), {'username': 'pera', 'password': 'pogresna'})
+        response = self.client.post(reverse('login_user'), {'username': 'pera', 'password': 'kojot2323'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+        # GET forme nije ogranicen
+        self.assertEqual(self.client.get(reverse('login_user')).status_code, status.HTTP_200_OK)
+
+    @override_settings(BLOG_RATE_LIMITS={'login_user': '1/min'})
+    def test_login_token_per_username(self):
+        data = {'username': 'pera', 'password': 'pogresna'}
+        self.assertEqual(self.client.post(reverse('login_token'), data, format='json', REMOTE_ADDR='10.0.0.1').status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(reverse('login_token'), data, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+        data = {'username': 'marko', 'password': 'sifra2323'}
+        self.assertEqual(self.client.post(reverse('login_token'), data, format='json').status_code, status.HTTP_200_OK)
+
+    @override_settings(BLOG_PASSWORD_HASH_CONCURRENCY=1, BLOG_PASSWORD_HASH_WAIT=0.01)
+    def test_password_hashing_cap(self):
+        data = {'username': 'pera', 'password': 'kojot2323'}
+        with hashing_slot():
+            response = self.client.post(reverse('login_token'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+
+        self.assertEqual(self.client.post(reverse('login_token'), data, format='json').status_code, status.HTTP_200_OK)
+        self.assertTrue(User.objects.get(username='pera').check_password('kojot2323'))
+
+
+# FEED
+
+class FeedTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.posts = [
+            BlogPost.objects.create(title=f'Naslov {i}', content=f'Sadrzaj {i} <b>', author=self.user)
+            for i in range(3)
+        ]
+
+    def test_atom_feed(self):
+        response = self.client.get('/api/feed.xml')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('application/atom+xml'))
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        root = ElementTree.fromstring(response.content)
+        ns = {'a': 'http://www.w3.org/2005/Atom'}
+        entries = root.findall('a:entry', ns)
+        self.assertEqual([e.find('a:title', ns).text for e in entries], ['Naslov 2', 'Naslov 1', 'Naslov 0'])
+        self.assertEqual(entries[0].find('a:author/a:name', ns).text, 'pera')
+        self.assertTrue(entries[0].find('a:link', ns).get('href').endswith(f'/api/blogposts/{self.posts[2].id}/'))
+
+    def test_rss_feed(self):
+        response = self.client.get('/api/feed.xml', {'format': 'rss'})
+        self.assertTrue(response['Content-Type'].startswith('application/rss+xml'))
+        items = ElementTree.fromstring(response.content).findall('channel/item')
+        self.assertEqual(items[0].find('title').text, 'Naslov 2')
+        self.assertEqual(items[0].find('description').text, 'Sadrzaj 2 <b>')
+
+    @override_settings(BLOG_FEED_ITEMS=2)
+    def test_latest_n(self):
+        items = ElementTree.fromstring(self.client.get('/api/feed.xml', {'format': 'rss'}).content).findall('channel/item')
+        self.assertEqual(len(items), 2)
+
+    def test_cached_and_conditional(self):
+        response = self.client.get('/api/feed.xml')
+        with self.assertNumQueries(0):
+            again = self.client.get('/api/feed.xml')
+            self.assertEqual(again.content, response.content)
+            not_modified = self.client.get('/api/feed.xml', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+            not_modified = self.client.get('/api/feed.xml', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # RSS je druga reprezentacija
+        rss = self.client.get('/api/feed.xml', {'format': 'rss'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(rss.status_code, status.HTTP_200_OK)
+
+    def test_invalidated_by_post_changes(self):
+        etag = self.client.get('/api/feed.xml')['ETag']
+        Comment.objects.create(blog_post=self.posts[0], author=self.user, content='Komentar')
+        # komentari ne menjaju feed
+        self.assertEqual(self.client.get('/api/feed.xml', HTTP_IF_NONE_MATCH=etag).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+        self.posts[0].title = 'Izmenjen'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[0].save()
+        response = self.client.get('/api/feed.xml', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'Izmenjen', response.content)
+
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.posts[2].delete()
+        response = self.client.get('/api/feed.xml', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(b'Naslov 2', response.content)
+
+        etag = response['ETag']
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/blogposts/bulk/', [{'title': 'Masovni', 'content': 'x'}], format='json')
+        response = self.client.get('/api/feed.xml', HTTP_IF_NONE_MATCH=etag)
+        self.assertIn(b'Masovni', response.content)
+
+    def test_empty_feed_and_methods(self):
+        BlogPost.objects.all().delete()
+        response = self.client.get('/api/feed.xml')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.post('/api/feed.xml').status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+# MATERIJALIZOVANI DOKUMENTI
+
+class PostDocumentTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.url = f'/api/blogposts/{self.blog_post.id}/'
+
+    def add_comments(self, count):
+        for i in range(count):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content=f'Komentar {i}')
+
+    def get(self, url=None):
+        response = self.client.get(url or self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def assertSameAsSerializer(self):
+        # isti JSON kao kroz serializer-e (odgovor za /comments/ je isti payload)
+        data = self.get()
+        expected = self.get(f'{self.url}comments/')
+        self.assertEqual(data['blog'].pop('views'), expected['blog'].pop('views'))
+        if expected['comments_next']:
+            self.assertEqual(data['comments_next'], expected['comments_next'].replace('/comments/', '/'))
+        data.pop('comments_next'), expected.pop('comments_next')
+        self.assertEqual(data, expected)
+
+    def test_same_output_as_serializers(self):
+        self.assertSameAsSerializer()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_comments(documents.page_size() + 1)
+        self.assertSameAsSerializer()
+        second = self.get(self.get()['comments_next'])
+        self.assertEqual([com['content'] for com in second['comms']], [f'Komentar {documents.page_size()}'])
+
+    def test_read_is_one_lookup_without_serializers(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_comments(3)
+        self.get()
+        with mock.patch('myblog.serializer.BlogPostSerializer.to_representation', side_effect=AssertionError), \
+                mock.patch('myblog.serializer.ComSerializer.to_representation', side_effect=AssertionError):
+            # stanje za ETag i dokument u jednom upitu po primarnom kljucu
+            with self.assertNumQueries(1):
+                data = self.get()
+        self.assertEqual(len(data['comms']), 3)
+        self.assertEqual(PostDocument.objects.count(), 1)
+
+    def test_patched_after_commit(self):
+        self.client.force_authenticate(user=self.user)
+        with mock.patch('myblog.documents.patch', wraps=documents.patch) as patch, \
+                mock.patch('myblog.documents.build', side_effect=AssertionError):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'{self.url}comments/', {'content': 'Novi'}, format='json')
+                # ne u transakciji izmene
+                patch.assert_not_called()
+            patch.assert_called_once()
+            comment = Comment.objects.get()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.put(f'/api/comments/{comment.id}/', {'content': 'Izmenjen'}, format='json')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.put(self.url, {'title': 'Novi naslov'}, format='json')
+        # brojac pregleda se prvo ucita u kes
+        self.get()
+        with self.assertNumQueries(1):
+            data = self.get()
+        self.assertEqual(data['blog']['title'], 'Novi naslov')
+        self.assertEqual(data['blog']['comment_count'], 1)
+        self.assertEqual([com['content'] for com in data['comms']], ['Izmenjen'])
+        self.assertSameAsSerializer()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/comments/{comment.id}/')
+        self.assertEqual(self.get()['comms'], [])
+        self.assertSameAsSerializer()
+
+    def test_patch_without_rerender(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_comments(2)
+        self.client.force_authenticate(user=self.user)
+        with mock.patch('myblog.documents.build', side_effect=AssertionError), \
+                mock.patch('myblog.serializer.BlogPostSerializer.to_representation', side_effect=AssertionError), \
+                mock.patch('myblog.serializer.ComSerializer.to_representation', side_effect=AssertionError):
+            with self.captureOnCommitCallbacks() as callbacks:
+                Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Novi')
+            with CaptureQueriesContext(connection) as ctx:
+                for callback in callbacks:
+                    callback()
+        # red posta sa dokumentom, novi komentar od kraja strane, upis dokumenta
+        queries = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(queries), 3, queries)
+        self.assertEqual([com['content'] for com in self.get()['comms']], ['Komentar 0', 'Komentar 1', 'Novi'])
+        self.assertSameAsSerializer()
+
+    def test_one_patch_per_post_and_transaction(self):
+        reader = User.objects.create_user(username='citalac')
+        with self.captureOnCommitCallbacks(execute=True):
+            other = BlogPost.objects.create(title='Drugi', content='x', author=self.user)
+            for post in (self.blog_post, other):
+                for i in range(3):
+                    Comment.objects.create(blog_post=post, author=reader, content=f'Komentar {i}')
+        with mock.patch('myblog.documents.patch', wraps=documents.patch) as patch:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self.add_comments(2)
+                # brisanje korisnika brise i sve njegove komentare (CASCADE)
+                reader.delete()
+        self.assertEqual(sorted(call.args[0] for call in patch.call_args_list), sorted([self.blog_post.id, other.id]))
+        self.assertEqual([com['content'] for com in self.get()['comms']], ['Komentar 0', 'Komentar 1'])
+        self.assertSameAsSerializer()
+
+        # izmene iz rollback-ovane transakcije ne ostaju, sledeca se krpi
+        with mock.patch('myblog.documents.patch', wraps=documents.patch) as patch:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(ValueError), transaction.atomic():
+                    self.add_comments(1)
+                    raise ValueError
+                Comment.objects.filter(content='Komentar 0').get().delete()
+        self.assertEqual([call.args[0] for call in patch.call_args_list], [self.blog_post.id])
+        self.assertEqual([com['content'] for com in self.get()['comms']], ['Komentar 1'])
+
+    def test_page_refilled_after_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_comments(documents.page_size() + 2)
+        first = Comment.objects.first()
+        with mock.patch('myblog.documents.build', side_effect=AssertionError), \
+                self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        data = self.get()
+        self.assertEqual(len(data['comms']), documents.page_size())
+        self.assertEqual(data['comms'][-1]['content'], f'Komentar {documents.page_size()}')
+        self.assertSameAsSerializer()
+        second = self.get(data['comments_next'])
+        self.assertEqual([com['content'] for com in second['comms']], [f'Komentar {documents.page_size() + 1}'])
+
+    def test_conditional_request_skips_body(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_comments(2)
+        response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertNotIn('myblog_postdocument', ctx.captured_queries[0]['sql'])
+
+        # ETag koji se ne slaze: dokument se cita posebno
+        with mock.patch('myblog.serializer.ComSerializer.to_representation', side_effect=AssertionError):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['comms']), 2)
+
+    def test_stale_document_is_not_rebuilt_on_read(self):
+        # izmena cija izgradnja dokumenta jos nije stigla (callback-ovi se ne izvrsavaju)
+        self.add_comments(1)
+        doc = PostDocument.objects.get()
+        with mock.patch('myblog.documents.build', side_effect=AssertionError), \
+                self.captureOnCommitCallbacks() as callbacks:
+            data = self.get()
+        self.assertEqual(callbacks, [])
+        self.assertEqual([com['content'] for com in data['comms']], ['Komentar 0'])
+        self.assertEqual(data['comments_count'], 1)
+        self.assertEqual(PostDocument.objects.get().body, doc.body)
+
+        # post bez dokumenta (npr. bulk_create) isto ide iz kesa
+        PostDocument.objects.all().delete()
+        self.assertEqual(self.get()['comments_count'], 1)
+        self.assertFalse(PostDocument.objects.exists())
+
+    def test_out_of_order_comments(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_comments(documents.page_size() + 1)
+        # komentar sa starim vremenom (npr. uvoz) upada u prvu stranu
+        yesterday = timezone.now() - timezone.timedelta(days=1)
+        old = Comment(blog_post=self.blog_post, author=self.user, content='Stari',
+                      created_at=yesterday, update_at=yesterday)
+        old.keep_timestamps = True
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.bulk_create([old])
+            counters.comment_added(self.blog_post.id, old.created_at)
+        self.assertEqual(self.get()['comms'][0]['content'], 'Stari')
+        self.assertSameAsSerializer()
+
+    def test_bulk_writes_and_recount(self):
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{self.url}comments/bulk/', [{'content': 'A'}, {'content': 'B'}], format='json')
+        data = self.get()
+        self.assertEqual([com['content'] for com in data['comms']], ['A', 'B'])
+        self.assertEqual(data['comments_count'], 2)
+
+        # recount_comments brise dokumente sa starim brojacima
+        BlogPost.objects.filter(id=self.blog_post.id).update(comment_count=7)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recount_comments', stdout=StringIO())
+        self.assertFalse(PostDocument.objects.exists())
+        self.assertEqual(self.get()['blog']['comment_count'], 2)
+
+    def test_other_representations_bypass_document(self):
+        with mock.patch('myblog.documents.document_for', side_effect=AssertionError):
+            response = self.client.get(self.url, {'fields': 'title'})
+            self.assertEqual(response.data['blog'], {'title': 'Test naslov'})
+            response = self.client.get(self.url, HTTP_ACCEPT='text/html')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('text/html', response['Content-Type'])
+        self.assertEqual(self.client.get('/api/blogposts/999/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_rebuild_command(self):
+        BlogPost.objects.create(title='Drugi', content='x', author=self.user)
+        self.add_comments(2)
+        out = StringIO()
+        call_command('rebuild_documents', stdout=out)
+        self.assertIn('Napravljeno dokumenata: 2', out.getvalue())
+        self.assertEqual(PostDocument.objects.count(), 2)
+        # brojac pregleda se prvo ucita u kes
+        self.get()
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.get()['comms']), 2)
+
+
+class PostDocumentCommitTests(TransactionTestCase):
+    # pravi commit-i: van transakcije se krpi odmah, u transakciji jednom posle commit-a
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323')
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+
+    def comments(self):
+        doc = PostDocument.objects.get(post=self.blog_post)
+        return [com['content'] for com in json.loads(bytes(doc.body))['comms']]
+
+    def test_patched_on_commit(self):
+        Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Prvi')
+        self.assertEqual(self.comments(), ['Prvi'])
+
+        with mock.patch('myblog.documents.patch', wraps=documents.patch) as patch:
+            with transaction.atomic():
+                for i in range(3):
+                    Comment.objects.create(blog_post=self.blog_post, author=self.user, content=f'K{i}')
+                Comment.objects.filter(content='Prvi').get().delete()
+                patch.assert_not_called()
+            patch.assert_called_once()
+        self.assertEqual(self.comments(), ['K0', 'K1', 'K2'])
+        self.assertEqual(PostDocument.objects.get().comments_state, 3)
+
+    def test_rolled_back_changes_are_dropped(self):
+        with mock.patch('myblog.documents.patch', wraps=documents.patch) as patch:
+            with self.assertRaises(ValueError), transaction.atomic():
+                Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Odbacen')
+                raise ValueError
+            patch.assert_not_called()
+            with transaction.atomic():
+                Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Prvi')
+                Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Drugi')
+                patch.assert_not_called()
+            patch.assert_called_once()
+        self.assertEqual(self.comments(), ['Prvi', 'Drugi'])
+
+
+# BRZO CITANJE (.values())
+
+class FastReadParityTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323')
+        self.other = User.objects.create_user(username='mika', password='kojot2323')
+        self.first = BlogPost.objects.create(title='Prvi ćšž', content='Sadrzaj ' * 50, author=self.user)
+        self.second = BlogPost.objects.create(title='Drugi', content='y', author=self.other)
+        Comment.objects.create(blog_post=self.first, author=self.other, content='Komentar')
+        Comment.objects.create(blog_post=self.first, author=self.user, content='Drugi komentar')
+
+    def assertSameJSON(self, queryset, serializer_class, fields=None):
+        kwargs = {} if fields is None else {'fields': fields}
+        expected = serializer_class(queryset, many=True, **kwargs).data
+        rows = fastread.values(queryset, serializer_class, fields)
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(fastread.to_dicts(rows, serializer_class, fields)), renderer.render(expected))
+
+    def check_all(self):
+        self.assertSameJSON(BlogPost.objects.order_by('id'), BlogPostSummarySerializer)
+        self.assertSameJSON(BlogPost.objects.order_by('id'), BlogPostSerializer)
+        self.assertSameJSON(BlogPost.objects.order_by('id'), BlogPostSerializer, ['id', 'title', 'created_at', 'author_username'])
+        self.assertSameJSON(Comment.objects.order_by('id'), ComSerializer)
+
+    def test_same_json_as_serializers(self):
+        # last_comment_at je None za drugi post
+        self.check_all()
+
+    @override_settings(TIME_ZONE='Europe/Belgrade')
+    def test_same_json_with_other_time_zone(self):
+        self.check_all()
+
+    def test_same_json_with_other_datetime_formats(self):
+        for output_format in ('iso-8601', None, '%d.%m.%Y %H:%M:%S'):
+            with self.subTest(output_format=output_format), \
+                    override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DATETIME_FORMAT': output_format}):
+                self.check_all()
+
+    def test_list_and_comments_skip_serializers(self):
+        with mock.patch('myblog.serializer.BlogPostSummarySerializer.to_representation', side_effect=AssertionError), \
+                mock.patch('myblog.serializer.ComSerializer.to_representation', side_effect=AssertionError):
+            response = self.client.get('/api/blogposts/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.json()['results']), 2)
+            response = self.client.get(f'/api/blogposts/{self.first.id}/comments/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([com['author_username'] for com in response.json()['comms']], ['mika', 'pera'])
+
+    def test_unknown_fields_do_not_grow_cache(self):
+        self.client.get('/api/blogposts/?fields=id,title')
+        size = fastread._columns.cache_info().currsize
+        for i in range(50):
+            response = self.client.get(f'/api/blogposts/?fields=id,title,junk{i}')
+            self.assertEqual(list(response.json()['results'][0]), ['id', 'title'])
+        self.assertEqual(fastread._columns.cache_info().currsize, size)
+
+    def test_list_selects_only_needed_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/blogposts/?fields=id,title')
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries if 'myblog_blogpost' in query['sql'])
+        self.assertNotIn('"content"', sql)
+        self.assertNotIn('"excerpt"', sql)
+
+
+# BRZI JSON (orjson)
+
+class FastJSONTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        self.blog_post = BlogPost.objects.create(title='Naslov ćšž \u2028', content='x', author=self.user)
+        Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Komentar')
+
+    def assertSameBytes(self, data, accepted_media_type=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type),
+            JSONRenderer().render(data, accepted_media_type),
+        )
+
+    def parse(self, parser_class, body):
+        try:
+            return parser_class().parse(BytesIO(body))
+        except ParseError as exc:
+            return str(exc.detail)
+
+    def test_renders_same_bytes(self):
+        aware = timezone.now()
+        self.assertSameBytes(None)
+        self.assertSameBytes(self.client.get('/api/blogposts/').data)
+        self.assertSameBytes(views.post_with_comments_data(Request(APIRequestFactory().get('/')), self.blog_post.id))
+        self.assertSameBytes({
+            'utc': aware,
+            'belgrade': aware.astimezone(zoneinfo.ZoneInfo('Europe/Belgrade')),
+            'naive': timezone.make_naive(aware, datetime.timezone.utc),
+            'date': aware.date(),
+            'decimal': Decimal('1.50'),
+            'lazy': gettext_lazy('Tekst'),
+            'separators': 'a\u2028b\u2029c',
+            'big': 2 ** 70,
+            1: 'int kljuc',
+        })
+        self.assertSameBytes({'a': [1, {'b': None}]}, 'application/json; indent=4')
+
+    def test_parses_same_data_and_errors(self):
+        bodies = (
+            b'{"title": "Naslov \xc4\x87", "n": [1, 2.5, null, true]}',
+            b'{"big": 123456789012345678901234567890, "max": 18446744073709551615}',
+            b'{"id": "1234567890123456789012"}',
+            b'\xef\xbb\xbf{}',
+            b'{',
+            b'[1,]',
+            b'{"a": NaN}',
+            b'\xff',
+            b'',
+        )
+        for body in bodies:
+            with self.subTest(body=body):
+                self.assertEqual(self.parse(FastJSONParser, body), self.parse(JSONParser, body))
+
+    def test_search_rank_same_value(self):
+        # rank je float: zapis moze da se razlikuje (1e-06 / 1e-6), vrednost ne
+        if not fts_available():
+            self.skipTest('FTS5 nije dostupan')
+        for i in range(3):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content=f'django {i} ' + 'rec ' * i)
+        url = '/api/search/?q=django&page_size=2'
+        response = self.client.get(url)
+        self.assertTrue(all(isinstance(row['rank'], float) for row in response.data['results']))
+        self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(response.data)))
+        # kursor pravi standardni json, pa je isti bez obzira na renderer
+        with mock.patch('myblog.renderers.orjson', None):
+            plain = self.client.get(url)
+        self.assertEqual(response.json()['next'], plain.json()['next'])
+        self.assertEqual(self.client.get(response.json()['next']).json()['results'], self.client.get(plain.json()['next']).json()['results'])
+
+    def test_error_bodies(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/blogposts/', b'{"title": ', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.content, b'{"detail":"JSON parse error - Expecting value: line 1 column 11 (char 10)"}')
+        response = self.client.post('/api/blogposts/', {'title': '  ', 'content': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(response.json(), {'title': ['This field may not be blank.']})
+
+    def test_same_responses_without_orjson(self):
+        urls = ('/api/blogposts/', f'/api/blogposts/{self.blog_post.id}/comments/', '/api/blogposts/?format=json&fields=id,title')
+        fast = [self.client.get(url).content for url in urls]
+        with mock.patch('myblog.renderers.orjson', None), mock.patch('myblog.parsers.orjson', None):
+            self.assertEqual([self.client.get(url).content for url in urls], fast)
+
+    def test_selected_globally_and_per_view(self):
+        self.assertIs(resolve('/api/blogposts/').func.cls.renderer_classes[0], FastJSONRenderer)
+        self.assertIs(resolve('/api/blogposts/').func.cls.parser_classes[0], FastJSONParser)
+
+        @api_view(['GET'])
+        @renderer_classes([JSONRenderer])
+        def plain(request):
+            return Response({'ok': True})
+
+        self.assertIs(plain.cls.renderer_classes[0], JSONRenderer)
+
+
+# KOMPRESIJA ODGOVORA
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323', is_staff=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(10):
+                BlogPost.objects.create(title=f'Naslov {i}', content='Sadrzaj posta. ' * 40, author=self.user)
+            self.blog_post = BlogPost.objects.create(title='Vruc post', content='Sadrzaj ' * 100, author=self.user)
+            for i in range(documents.page_size() + 5):
+                Comment.objects.create(blog_post=self.blog_post, author=self.user, content=f'Komentar broj {i}')
+        self.comment = Comment.objects.first()
+        self.detail = f'/api/blogposts/{self.blog_post.id}/'
+        self.urls = (
+            '/api/blogposts/',
+            self.detail,
+            f'{self.detail}?order=newest',
+            f'{self.detail}comments/',
+            '/api/feed.xml',
+        )
+
+    def get(self, url, encoding=None, **extra):
+        if encoding is not None:
+            extra['HTTP_ACCEPT_ENCODING'] = encoding
+        return self.client.get(url, **extra)
+
+    def vary(self, response):
+        return {value.strip().lower() for value in response.get('Vary', '').split(',') if value.strip()}
+
+    def test_compressed_body_is_identity_body(self):
+        with mock.patch('myblog.viewcounts.record_view', return_value=7):
+            for url in self.urls:
+                with self.subTest(url=url):
+                    identity = self.get(url)
+                    compressed = self.get(url, 'gzip, deflate')
+                    self.assertNotIn('Content-Encoding', identity)
+                    self.assertEqual(compressed['Content-Encoding'], 'gzip')
+                    self.assertEqual(int(compressed['Content-Length']), len(compressed.content))
+                    self.assertLess(len(compressed.content), len(identity.content))
+                    self.assertEqual(gzip.decompress(compressed.content), identity.content)
+
+    def test_vary_on_every_representation(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                identity, compressed = self.get(url), self.get(url, 'gzip')
+                self.assertIn('accept-encoding', self.vary(identity))
+                self.assertIn('accept-encoding', self.vary(compressed))
+        # postojeci Vary (DRF: Accept) ostaje
+        self.assertTrue({'accept', 'accept-encoding'} <= self.vary(self.get('/api/blogposts/?order=oldest', 'gzip')))
+        # malo telo nije kompresovano, ali resurs i dalje zavisi od Accept-Encoding
+        small = self.get(f'/api/comments/{self.comment.id}/', 'gzip')
+        self.assertNotIn('Content-Encoding', small)
+        self.assertIn('accept-encoding', self.vary(small))
+
+    def test_not_modified_keeps_vary(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                compressed = self.get(url, 'gzip')
+                self.assertTrue(compressed['ETag'].startswith('W/"'))
+                response = self.get(url, 'gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertIn('accept-encoding', self.vary(response))
+                # slab ETag iz gzip odgovora odgovara i nekompresovanom (jak ETag ima samo feed)
+                identity = self.get(url)
+                self.assertEqual(identity['ETag'].startswith('W/'), url != '/api/feed.xml')
+                self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=compressed['ETag']).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_shared_cache_keys_differ_by_encoding(self):
+        # kes koji postuje Vary (ovde Django-ov) ne daje gzip klijentu bez gzip-a
+        factory = RequestFactory()
+        response = self.get('/api/blogposts/', 'gzip')
+        learn_cache_key(factory.get('/api/blogposts/', HTTP_ACCEPT_ENCODING='gzip'), response, cache=cache)
+        keys = {
+            get_cache_key(factory.get('/api/blogposts/', HTTP_ACCEPT_ENCODING=encoding), cache=cache)
+            for encoding in ('gzip', 'br', '')
+        }
+        self.assertEqual(len(keys), 3)
+
+    def test_negotiation(self):
+        cases = {
+            '': None,
+            'gzip': 'gzip',
+            'GZIP': 'gzip',
+            'x-gzip': 'gzip',
+            'gzip;q=0': None,
+            'gzip; q=0.0': None,
+            'gzip;q=abc': None,
+            'identity': None,
+            'deflate': None,
+            '*': 'br',
+            '*;q=0': None,
+            'br, gzip': 'br',
+            'br;q=0.5, gzip': 'gzip',
+            'gzip;q=0, *': 'br',
+            'br;q=0, *;q=0.1': 'gzip',
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(compression.negotiate(header, ('br', 'gzip')), expected)
+        # vec kompresovano telo ima prednost samo kod istog q
+        self.assertEqual(compression.negotiate('br, gzip', ('br', 'gzip'), prefer={'gzip'}), 'gzip')
+        self.assertEqual(compression.negotiate('br, gzip;q=0.5', ('br', 'gzip'), prefer={'gzip'}), 'br')
+
+        response = self.get('/api/blogposts/', 'gzip;q=0, identity')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('accept-encoding', self.vary(response))
+
+    def test_min_size(self):
+        url = f'/api/comments/{self.comment.id}/'
+        self.assertNotIn('Content-Encoding', self.get(url, 'gzip'))
+        with override_settings(BLOG_COMPRESS_MIN_SIZE=10):
+            response = self.get(url, 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.get(url).json())
+
+    def test_incompressible_body_stays_identity(self):
+        # gzip bi bio veci od tela
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        body = os.urandom(4000)
+        response = middleware.process_response(request, HttpResponse(body, content_type='application/json'))
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response.content, body)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_only_text_responses(self):
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        image = middleware.process_response(request, HttpResponse(b'\x89PNG' * 1000, content_type='image/png'))
+        self.assertNotIn('Content-Encoding', image)
+        self.assertNotIn('Vary', image)
+        encoded = HttpResponse(b'x' * 5000, content_type='application/json')
+        encoded['Content-Encoding'] = 'gzip'
+        self.assertEqual(middleware.process_response(request, encoded).content, b'x' * 5000)
+
+    def test_html_is_not_compressed(self):
+        # BREACH: CSRF token uz vracen unos u kompresovanom telu
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        for content_type in ('text/html; charset=utf-8', 'text/plain'):
+            response = middleware.process_response(request, HttpResponse(b'<p>x</p>' * 1000, content_type=content_type))
+            self.assertNotIn('Content-Encoding', response, content_type)
+        response = self.get(self.detail + '?format=api', 'gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('text/html', response['Content-Type'])
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('Content-Encoding', self.get(reverse('login_user'), 'gzip'))
+
+    def test_export_is_not_compressed_twice(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(b''.join(response.streaming_content)).splitlines()), 11)
+        self.assertIn('accept-encoding', self.vary(response))
+        response = self.client.get('/api/export/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_hot_post_is_not_recompressed(self):
+        first = self.get(self.detail, 'gzip')
+        with mock.patch('myblog.compression.compress', side_effect=AssertionError), \
+                mock.patch('myblog.compression.deflate_parts', side_effect=AssertionError):
+            for _ in range(3):
+                response = self.get(self.detail, 'gzip')
+                data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(data['blog']['views'], json.loads(gzip.decompress(first.content))['blog']['views'] + 3)
+        self.assertIn('cursor=', data['comments_next'])
+        self.assertEqual(data['comms'], self.get(f'{self.detail}comments/').json()['comms'])
+
+        # nov komentar menja dokument, staticki delovi se kompresuju ponovo
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Najnoviji')
+        with mock.patch('myblog.compression.deflate_parts', wraps=compression.deflate_parts) as deflate:
+            with mock.patch('myblog.viewcounts.record_view', return_value=7):
+                response, identity = self.get(self.detail, 'gzip'), self.get(self.detail)
+        self.assertEqual(deflate.call_count, 1)
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+
+    def test_cached_responses_are_not_recompressed(self):
+        urls = (
+            f'{self.detail}?order=newest', f'{self.detail}?fields=title,views',
+            f'{self.detail}?fields=title', f'{self.detail}comments/',
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.get(url, 'gzip')
+                with mock.patch('myblog.compression.compress', side_effect=AssertionError), \
+                        mock.patch('myblog.compression.deflate_parts', side_effect=AssertionError), \
+                        mock.patch('myblog.viewcounts.record_view', return_value=7):
+                    response, identity = self.get(url, 'gzip'), self.get(url)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(gzip.decompress(response.content), identity.content)
+
+        # uvucen JSON nije telo iz kesa, kompresuje se ono sto je poslato
+        indented = {'HTTP_ACCEPT': 'application/json; indent=4'}
+        with mock.patch('myblog.viewcounts.record_view', return_value=7):
+            response, identity = self.get(urls[0], 'gzip', **indented), self.get(urls[0], **indented)
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+
+        # nov komentar menja verziju posta, pa i kesirani gzip
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(blog_post=self.blog_post, author=self.user, content='Najnoviji')
+        response = self.get(urls[3], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['comments_count'], documents.page_size() + 6)
+
+    def test_feed_is_compressed_once(self):
+        identity = self.get('/api/feed.xml')
+        with mock.patch('myblog.compression.compress', side_effect=AssertionError):
+            response = self.get('/api/feed.xml', 'gzip')
+        self.assertEqual(gzip.decompress(response.content), identity.content)
+
+    def test_gzip_splice(self):
+        parts = [b'{"a":' * 500, b'"' + bytes(range(256)) * 50, b'']
+        for values in ([b'"views":123', b''], [b'', b'x' * 70000]):
+            with self.subTest(lengths=[len(value) for value in values]):
+                body = compression.gzip_splice(parts, compression.deflate_parts(parts), values)
+                expected = parts[0] + values[0] + parts[1] + values[1]
+                self.assertEqual(gzip.decompress(body), expected)
+                self.assertEqual(zlib.decompress(body, 16 + zlib.MAX_WBITS), expected)
+
+    @skipUnless(compression.brotli is not None, 'brotli nije instaliran')
+    def test_brotli(self):
+        import brotli
+        identity = self.get('/api/blogposts/')
+        response = self.get('/api/blogposts/', 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), identity.content)
+        # dokument posta: gzip je vec kompresovan, pa ima prednost kod istog q
+        self.assertEqual(self.get(self.detail, 'gzip, br')['Content-Encoding'], 'gzip')
+        self.assertEqual(self.get(self.detail, 'gzip;q=0.5, br')['Content-Encoding'], 'br')
+
+
+@override_settings(ROOT_URLCONF='blog.urls_async')
+class AsyncCompressionTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323')
+        for i in range(10):
+            self.blog_post = BlogPost.objects.create(title=f'Naslov {i}', content='Sadrzaj ' * 300, author=self.user)
+
+    async def test_async_views_are_compressed(self):
+        for url in ('/api/blogposts/', f'/api/blogposts/{self.blog_post.id}/'):
+            identity = await self.async_client.get(url)
+            response = await self.async_client.get(url, headers={'accept-encoding': 'gzip'})
+            self.assertEqual(response['Content-Encoding'], 'gzip', url)
+            self.assertIn('Accept-Encoding', response['Vary'])
+            data, expected = json.loads(gzip.decompress(response.content)), json.loads(identity.content)
+            if 'blog' in data:
+                self.assertEqual(data['blog'].pop('views'), expected['blog'].pop('views') + 1)
+            self.assertEqual(data, expected)
+
+    async def test_cached_response_is_not_recompressed(self):
+        url = f'/api/blogposts/{self.blog_post.id}/?order=newest'
+        await self.async_client.get(url, headers={'accept-encoding': 'gzip'})
+        with mock.patch('myblog.compression.compress', side_effect=AssertionError), \
+                mock.patch('myblog.compression.deflate_parts', side_effect=AssertionError):
+            response = await self.async_client.get(url, headers={'accept-encoding': 'gzip'})
+        identity = await self.async_client.get(url)
+        data, expected = json.loads(gzip.decompress(response.content)), json.loads(identity.content)
+        self.assertEqual(data['blog'].pop('views'), expected['blog'].pop('views') - 1)
+        self.assertEqual(data, expected)
+
+
+# BROJAC PREGLEDA
+
+class ViewCountTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        # brojaci iz drugih testova ostaju u procesu
+        viewcounts.flush_views()
+        self.user = User.objects.create_user(username='pera', password='kojot2323')
+        self.first = BlogPost.objects.create(title='Prvi', content='x', author=self.user)
+        self.second = BlogPost.objects.create(title='Drugi', content='y', author=self.user)
+
+    def view(self, post):
+        return self.client.get(f'/api/blogposts/{post.id}/')
+
+    def test_reads_do_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            counts = [self.view(self.first).json()['blog']['views'] for _ in range(3)]
+        self.assertEqual(counts, [1, 2, 3])
+        self.assertFalse([q for q in queries.captured_queries if q['sql'].startswith('UPDATE "myblog_blogpost"')])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.views, 0)
+
+        # lista i komentari pokazuju isti broj pre upisa
+        listed = {post['id']: post['views'] for post in self.client.get('/api/blogposts/').data['results']}
+        self.assertEqual(listed, {self.first.id: 3, self.second.id: 0})
+        self.assertEqual(self.client.get(f'/api/blogposts/{self.first.id}/comments/').data['blog']['views'], 3)
+
+    def test_flush_is_one_update(self):
+        update_at = self.first.update_at
+        for _ in range(3):
+            self.view(self.first)
+        self.view(self.second)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(viewcounts.flush_views(), 2)
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.views, self.second.views), (3, 1))
+        # pregled nije izmena posta
+        self.assertEqual(self.first.update_at, update_at)
+        self.assertEqual(viewcounts.flush_views(), 0)
+
+        # posle isteka kesa broj se cita iz baze
+        clear_caches()
+        self.assertEqual(self.view(self.first).json()['blog']['views'], 4)
+
+    @override_settings(BLOG_VIEW_FLUSH_MAX=3)
+    def test_flush_after_max_views(self):
+        for _ in range(3):
+            self.view(self.first)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.views, 3)
+
+    def test_most_viewed_uses_persisted_counts(self):
+        for _ in range(2):
+            self.view(self.second)
+        viewcounts.flush_views()
+        # jos neupisani pregledi ne menjaju redosled
+        for _ in range(5):
+            self.view(self.first)
+
+        response = self.client.get('/api/blogposts/', {'order': 'views'})
+        self.assertEqual([post['id'] for post in response.data['results']], [self.second.id, self.first.id])
+        self.assertEqual(response.data['results'][1]['views'], 5)
+
+        viewcounts.flush_views()
+        response = self.client.get('/api/blogposts/', {'order': 'views', 'page_size': 1})
+        self.assertEqual(response.data['results'][0]['id'], self.first.id)
+        response = self.client.get(response.data['next'])
+        self.assertEqual([post['id'] for post in response.data['results']], [self.second.id])
+
+    def test_not_modified_is_a_view(self):
+        # namerno: i provera kesirane kopije (304) je pregled (BLOG_VIEWS_COUNT_REVALIDATIONS)
+        response = self.view(self.first)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        url = f'/api/blogposts/{self.first.id}/'
+        for _ in range(2):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        # broj pregleda nije deo stanja: isti ETag, a telo ima nov broj
+        response = self.view(self.first)
+        self.assertEqual(response['ETag'], not_modified['ETag'])
+        self.assertEqual(response.json()['blog']['views'], 4)
+        # HEAD i nepostojeci post se ne broje
+        self.client.head(url)
+        self.client.get('/api/blogposts/999/')
+        self.assertEqual(self.view(self.first).json()['blog']['views'], 5)
+        self.assertIsNone(cache.get(viewcounts.total_key(999)))
+
+    @override_settings(BLOG_VIEWS_COUNT_REVALIDATIONS=False)
+    def test_not_modified_is_not_a_view_when_disabled(self):
+        url = f'/api/blogposts/{self.first.id}/'
+        response = self.view(self.first)
+        self.assertEqual(response.json()['blog']['views'], 1)
+        for _ in range(3):
+            self.assertEqual(
+                self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, status.HTTP_304_NOT_MODIFIED
+            )
+        # samo odgovori sa telom, i iz dokumenta i iz kesa (?order=)
+        self.assertEqual(self.view(self.first).json()['blog']['views'], 2)
+        self.assertEqual(self.client.get(url, {'order': 'newest'}).json()['blog']['views'], 3)
+        response = async_to_sync(self.async_client.get)(url)
+        self.assertEqual(json.loads(response.content)['blog']['views'], 4)
+
+    def test_list_views_without_id_field(self):
+        for _ in range(3):
+            self.view(self.first)
+        response = self.client.get('/api/blogposts/', {'fields': 'title,views'})
+        self.assertEqual(
+            response.data['results'], [{'title': 'Drugi', 'views': 0}, {'title': 'Prvi', 'views': 3}]
+        )
+        response = async_to_sync(self.async_client.get)('/api/blogposts/?fields=title,views')
+        self.assertEqual(json.loads(response.content)['results'][1], {'title': 'Prvi', 'views': 3})
+
+    def test_sparse_fields(self):
+        self.view(self.first)
+        response = self.client.get('/api/blogposts/', {'fields': 'id,title'})
+        self.assertNotIn('views', response.data['results'][0])
+        response = self.client.get(f'/api/blogposts/{self.first.id}/', {'fields': 'views'})
+        self.assertEqual(response.data['blog'], {'views': 2})
+
+
+# WRITE-BEHIND KOMENTARI
+
+@override_settings(BLOG_COMMENT_INGEST=True)
+class CommentIngestTests(APITestCase):
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323')
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.url = f'/api/blogposts/{self.blog_post.id}/comments/'
+        # bez writer thread-a, serije se upisuju sa flush() u testu
+        self.ingestor = CommentIngestor(batch_size=2, flush_ms=20, max_queue=5, autostart=False)
+        patcher = mock.patch('myblog.ingest.get_ingestor', return_value=self.ingestor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(user=self.user)
+
+    def post_comment(self, content='Komentar', **params):
+        url = self.url + ('?wait=1' if params.get('wait') else '')
+        return self.client.post(url, {'content': content}, format='json')
+
+    def test_accepted_then_created(self):
+        self.client.get(self.url)
+        response = self.post_comment('Iz reda')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertFalse(Comment.objects.exists())
+
+        poll = self.client.get(f'/api/comments/ingest/{response.data["id"]}/')
+        self.assertEqual(poll.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.data['url'].endswith(f'/api/comments/ingest/{response.data["id"]}/'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.ingestor.flush(), 1)
+        poll = self.client.get(f'/api/comments/ingest/{response.data["id"]}/')
+        self.assertEqual(poll.status_code, status.HTTP_200_OK)
+        self.assertEqual(poll.data['status'], 'created')
+        self.assertEqual(poll.data['comment']['content'], 'Iz reda')
+        self.assertEqual(poll.data['comment']['author_username'], 'pera')
+
+        # brojaci i kes kao kod obicnog komentara
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 1)
+        self.assertIsNotNone(self.blog_post.last_comment_at)
+        self.assertEqual(self.client.get(self.url).data['comments_count'], 1)
+
+    def test_validation_before_queue(self):
+        self.assertEqual(self.post_comment('   ').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/blogposts/999/comments/', {'content': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.post_comment().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.ingestor.queue.qsize(), 0)
+        self.assertEqual(self.client.get('/api/comments/ingest/nepoznat/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_batches_by_size_and_time(self):
+        for i in range(3):
+            self.post_comment(f'Komentar {i}')
+        # batch_size=2: prva serija je puna odmah
+        batch, stop = self.ingestor.next_batch()
+        self.assertEqual(len(batch), 2)
+        self.assertFalse(stop)
+        # ostatak izlazi posle flush_ms
+        start = time.monotonic()
+        batch, stop = self.ingestor.next_batch()
+        self.assertEqual(len(batch), 1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.015)
+
+    def test_one_commit_per_batch(self):
+        for i in range(2):
+            self.post_comment(f'Komentar {i}')
+        batch, _ = self.ingestor.next_batch()
+        with CaptureQueriesContext(connection) as queries:
+            self.ingestor.write(batch)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "myblog_comment"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_order_is_acceptance_order(self):
+        tickets = [self.post_comment(f'Komentar {i}').data['id'] for i in range(5)]
+        self.ingestor.flush()
+        ids = [cache.get(f'myblog:ingest:{ticket}')['comment'] for ticket in tickets]
+        self.assertEqual(ids, sorted(ids))
+        listed = [com['content'] for com in self.client.get(self.url).data['comms']]
+        self.assertEqual(listed, [f'Komentar {i}' for i in range(5)])
+
+    def test_full_queue(self):
+        for i in range(5):
+            self.assertEqual(self.post_comment(f'Komentar {i}').status_code, status.HTTP_202_ACCEPTED)
+        response = self.post_comment('Visak')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', response)
+
+    def test_unexpected_error_fails_only_its_comment(self):
+        other = BlogPost.objects.create(title='Drugi', content='x', author=self.user)
+        bad = self.client.post(f'/api/blogposts/{other.id}/comments/', {'content': 'Los'}, format='json')
+        good = self.post_comment('Dobar')
+        items = list(self.ingestor.queue.queue)
+        comment_added = counters.comment_added
+
+        def added(post_id, *args, **kwargs):
+            if post_id == other.id:
+                raise ValueError('los komentar')
+            return comment_added(post_id, *args, **kwargs)
+
+        with mock.patch('myblog.ingest.comment_added', side_effect=added):
+            self.assertEqual(self.ingestor.flush(), 2)
+        self.assertTrue(all(item.done.is_set() for item in items))
+        self.assertEqual(self.client.get(f'/api/comments/ingest/{bad.data["id"]}/').data['status'], 'failed')
+        self.assertEqual(self.client.get(f'/api/comments/ingest/{good.data["id"]}/').data['status'], 'created')
+        self.assertEqual(list(Comment.objects.values_list('content', flat=True)), ['Dobar'])
+
+    @override_settings(BLOG_INGEST_WAIT_TIMEOUT=0.05)
+    def test_wait_without_flush_falls_back_to_accepted(self):
+        response = self.post_comment(wait=True)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+    @override_settings(BLOG_COMMENT_INGEST=False)
+    def test_disabled(self):
+        self.assertEqual(self.post_comment().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.ingestor.queue.qsize(), 0)
+
+
+@override_settings(BLOG_COMMENT_INGEST=True)
+class CommentIngestWriterTests(TransactionTestCase):
+    # pravi writer thread sa svojom konekcijom, pa podaci moraju biti commit-ovani
+    def setUp(self):
+        clear_caches()
+        self.user = User.objects.create_user(username='pera', password='kojot2323')
+        self.blog_post = BlogPost.objects.create(title='Test naslov', content='Test content', author=self.user)
+        self.ingestor = CommentIngestor(batch_size=50, flush_ms=10)
+        patcher = mock.patch('myblog.ingest.get_ingestor', return_value=self.ingestor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_wait_and_stop(self):
+        url = f'/api/blogposts/{self.blog_post.id}/comments/'
+        response = self.client.post(url + '?wait=1', {'content': 'Sacekan'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['content'], 'Sacekan')
+        self.assertTrue(Comment.objects.filter(id=response.data['id']).exists())
+
+        # stop() upisuje sve sto je vec u redu
+        tickets = [self.client.post(url, {'content': f'K{i}'}, format='json').data['id'] for i in range(3)]
+        self.ingestor.stop(timeout=5)
+        self.assertEqual([cache.get(f'myblog:ingest:{t}')['status'] for t in tickets], ['created'] * 3)
+        self.assertEqual(Comment.objects.count(), 4)
+
+    @override_settings(BLOG_INGEST_WAIT_TIMEOUT=5)
+    def test_writer_survives_unexpected_error(self):
+        url = f'/api/blogposts/{self.blog_post.id}/comments/?wait=1'
+        with mock.patch.object(self.ingestor, 'publish', side_effect=RuntimeError('kes nedostupan')), \
+                self.assertLogs('myblog.ingest', 'ERROR'):
+            response = self.client.post(url, {'content': 'Prvi'}, format='json')
+        # komentar je upisan, a onaj ko ceka nije ostao da visi
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, {'content': 'Drugi'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.ingestor.stop(timeout=5)
+
+    def test_failed_comment_does_not_fail_batch(self):
+        # FK se proverava tek na commit-u, pa treba prava transakcija; upis iz testa
+        self.ingestor.autostart = False
+        url = f'/api/blogposts/{self.blog_post.id}/comments/'
+        other = BlogPost.objects.create(title='Drugi', content='x', author=self.user)
+        bad = self.client.post(f'/api/blogposts/{other.id}/comments/', {'content': 'Izgubljen'}, format='json')
+        good = self.client.post(url, {'content': 'Sacuvan'}, format='json')
+        other.delete()
+
+        self.ingestor.flush()
+        bad = self.client.get(f'/api/comments/ingest/{bad.data["id"]}/')
+        self.assertEqual(bad.data['status'], 'failed')
+        good = self.client.get(f'/api/comments/ingest/{good.data["id"]}/')
+        self.assertEqual(good.data['status'], 'created')
+        self.assertEqual(list(Comment.objects.values_list('content', flat=True)), ['Sacuvan'])
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 1)
@@ -0,0 +1,185 @@
+import hashlib
+import math
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework.throttling import BaseThrottle
+
+
+# Token bucket ogranicenja u kesu. Svaka kanta ima kapacitet N i puni se
+# brzinom N po periodu ('10/min' = najvise 10 odjednom, pa jedan na 6 s).
+# Zahtev prolazi kroz vise kanti (korisnik, IP, svi); token se uzima iz svih
+# samo kad svaka ima bar jedan, pa odbijen klijent ne trosi zajednicku kantu
+# i ne blokira ostale.
+#
+# Kante su u zasebnom aliasu (BLOG_THROTTLE_CACHE_ALIAS), pa ih kesirani
+# odgovori ne istiskuju. Stanje kante (tokeni, vreme) je jedan kljuc; citanje
+# i upis idu pod bravom po kanti (cache.add je atomican), pa dva istovremena
+# zahteva ne mogu potrositi isti token. Brava procesa koji je pao istice
+# posle LOCK_TIMEOUT sekundi.
+
+LOCK_TIMEOUT = 1
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def get_rate(scope):
+    return getattr(settings, 'BLOG_RATE_LIMITS', {}).get(scope)
+
+
+def parse_rate(rate):
+    # '10/min' -> (10, 60), '5/10s' -> (5, 10)
+    count, _, period = rate.partition('/')
+    digits = ''.join(ch for ch in period if ch.isdigit())
+    unit = period[len(digits):][:1]
+    return int(count), int(digits or 1) * PERIODS[unit]
+
+
+def get_throttle_cache():
+    return caches[getattr(settings, 'BLOG_THROTTLE_CACHE_ALIAS', 'default')]
+
+
+@contextmanager
+def _locked(cache, keys):
+    # brave uvek istim redom, da se dva zahteva ne cekaju u krug
+    locks = []
+    try:
+        for key in sorted(set(keys)):
+            lock = key + ':lock'
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while not cache.add(lock, True, LOCK_TIMEOUT) and time.monotonic() < deadline:
+                time.sleep(0.001)
+            locks.append(lock)
+        yield
+    finally:
+        cache.delete_many(locks)
+
+
+def bucket_key(scope, ident):
+    # ident moze biti i korisnicko ime, pa kljuc ide kroz hes (memcached)
+    digest = hashlib.md5(str(ident).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return f'myblog:throttle:{scope}:{digest}'
+
+
+def take(buckets, now=None):
+    """
+    `buckets` su trojke (scope, ident, rate). Token se uzima iz svake kante
+    samo ako sve imaju bar jedan; tada vraca 0. Inace se ne uzima nista i
+    vraca se broj sekundi dok sve kante ne budu imale token.
+    """
+    cache = get_throttle_cache()
+    keys = [bucket_key(scope, ident) for scope, ident, _ in buckets]
+    with _locked(cache, keys):
+        # vreme tek pod bravom, da zahtev koji je cekao ne racuna sa starim
+        now = time.time() if now is None else now
+        states = cache.get_many(keys)
+
+        charges, wait = [], 0
+        for key, (_, _, rate) in zip(keys, buckets):
+            capacity, period = parse_rate(rate)
+            refill = capacity / period
+            available = capacity
+            if key in states:
+                tokens, last = states[key]
+                available = min(capacity, tokens + (now - last) * refill)
+            if available < 1:
+                wait = max(wait, (1 - available) / refill)
+            charges.append((key, available - 1, period))
+
+        if wait:
+            return wait
+        for key, tokens, period in charges:
+            cache.set(key, (tokens, now), period)
+        return 0
+
+
+def consume(scope, ident, rate, now=None):
+    """
+    Uzima jedan token iz kante `scope` za `ident`. Vraca 0 ako je zahtev
+    dozvoljen, a inace broj sekundi do sledeceg tokena.
+    """
+    return take([(scope, ident, rate)], now)
+
+
+def client_ip(request):
+    # ista logika kao DRF (NUM_PROXIES za X-Forwarded-For)
+    return BaseThrottle().get_ident(request)
+
+
+def check(limits):
+    """`limits` su parovi (scope, ident); vraca najduze cekanje ili 0 (sve ili nista, kao take)."""
+    return take([
+        (scope, ident, get_rate(scope))
+        for scope, ident in limits
+        if ident is not None and get_rate(scope)
+    ])
+
+
+def too_many_requests(wait):
+    response = HttpResponse('Previse zahteva, pokusaj kasnije.', status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+def login_limits(request, username):
+    return [('login_user', username or None), ('login_ip', client_ip(request)), ('login', 'all')]
+
+
+def rate_limit_login(view):
+    # za obicne Django view-ove (login_user): 429 sa Retry-After
+    @wraps(view)
+    def inner(request, *args, **kwargs):
+        if request.method == 'POST':
+            wait = check(login_limits(request, request.POST.get('username')))
+            if wait:
+                return too_many_requests(wait)
+        return view(request, *args, **kwargs)
+    return inner
+
+
+class BucketThrottle(BaseThrottle):
+    """
+    DRF throttle nad kantama iz get_limits(); vazi samo za metode iz
+    `methods`. Sve kante endpointa su u jednom throttle-u, jer DRF pita
+    svaki throttle i kad je neki vec odbio zahtev.
+    """
+    methods = ('POST',)
+
+    def get_limits(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_time = 0
+        if request.method not in self.methods:
+            return True
+        self.wait_time = check(self.get_limits(request))
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+def user_ident(request):
+    # prijavljen korisnik po id-ju, anoniman po IP adresi
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f'ip:{client_ip(request)}'
+
+
+class CommentThrottle(BucketThrottle):
+    def get_limits(self, request):
+        return [('comment_user', user_ident(request)), ('comment_ip', client_ip(request)), ('comment', 'all')]
+
+
+class LoginThrottle(BucketThrottle):
+    # korisnicko ime iz zahteva, protiv pogadjanja lozinke sa vise IP adresa
+    def get_limits(self, request):
+        return login_limits(request, request.data.get('username'))
+
+
+COMMENT_THROTTLES = [CommentThrottle]
+LOGIN_THROTTLES = [LoginThrottle]
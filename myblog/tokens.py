@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .models import RevokedToken
+from .routers import use_primary
+
+
+# Potpisani tokeni za API (Authorization: Bearer <token>). Token nosi id
+# korisnika, is_staff i jedinstveni jti, potpisan je HMAC-om (SECRET_KEY) i
+# ima vreme izdavanja, pa se korisnik ne cita iz baze. Opozvani jti-jevi su u
+# tabeli RevokedToken do isteka tokena (jedan upit po primarnom kljucu); kes
+# nije dovoljan jer pod opterecenjem izbacuje kljuceve.
+
+SALT = 'myblog.tokens'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def get_ttl():
+    return getattr(settings, 'BLOG_TOKEN_TTL', 60 * 60)
+
+
+def issue_token(user):
+    payload = {'uid': user.pk, 'staff': user.is_staff, 'jti': get_random_string(16)}
+    return signing.dumps(payload, salt=SALT, compress=True)
+
+
+def read_token(token):
+    """Vraca payload ili baca InvalidToken (los potpis, istekao ili opozvan)."""
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=get_ttl())
+    except signing.SignatureExpired:
+        raise InvalidToken('Token je istekao.')
+    except signing.BadSignature:
+        raise InvalidToken('Neispravan token.')
+    if is_revoked(payload['jti']):
+        raise InvalidToken('Token je opozvan.')
+    return payload
+
+
+def is_revoked(jti):
+    # sa primarne baze: opoziv vazi odmah, i kad replika kasni
+    with use_primary():
+        return RevokedToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+
+
+def revoke(payload):
+    # dovoljno je pamtiti jti dok token ne istekne; istekli se brisu usput
+    now = timezone.now()
+    RevokedToken.objects.filter(expires_at__lte=now).delete()
+    RevokedToken.objects.bulk_create(
+        [RevokedToken(jti=payload['jti'], expires_at=now + timedelta(seconds=get_ttl()))], ignore_conflicts=True
+    )
+
+
+def revoke_token(token):
+    payload = read_token(token)
+    revoke(payload)
+    return payload
+
+
+def token_user(payload):
+    # korisnik bez upita: id i is_staff su iz tokena, ostala polja (npr.
+    # username) su odlozena i citaju se iz baze tek kad zatrebaju
+    return User.from_db('default', ['id', 'is_staff'], [payload['uid'], payload['staff']])
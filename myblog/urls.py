@@ -4,14 +4,24 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, Sp
 
 urlpatterns = [
     path('blogposts/', views.blogposts, name = 'blogposts'),
+    path('blogposts/bulk/', views.blogposts_bulk, name = 'blogposts_bulk'),
     path('blogposts/<int:pk>/', views.post_details, name = 'post_details'), #post+kom, brisanje, menjanje
 
     path('blogposts/<int:pk>/comments/', views.comments, name = 'comments'), #citam sve komentare i dodajem novi
+    path('blogposts/<int:pk>/comments/bulk/', views.comments_bulk, name = 'comments_bulk'),
     path('comments/<int:id>/', views.comments_details, name = 'comments_details'),
+    path('comments/ingest/<str:ticket>/', views.comments_ingest, name = 'comments_ingest'),
+
+    path('feed.xml', views.feed, name = 'feed'),
+    path('search/', views.search, name = 'search'),
+    path('export/', views.export_posts, name = 'export'),
+    path('cache/stats/', views.cache_stats, name = 'cache_stats'),
 
     path('register_user/', views.register_user, name = 'register_user'),
     path('login_user/', views.login_user, name = 'login_user'),
     path('logout_user/', views.logout_user, name = 'logout_user'),
+    path('login_token/', views.login_token, name = 'login_token'),
+    path('logout_token/', views.logout_token, name = 'logout_token'),
 
     path('schema/', SpectacularAPIView.as_view(), name='schema'),
     path('schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
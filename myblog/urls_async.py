@@ -0,0 +1,17 @@
+from django.urls import path
+
+from . import async_views, urls
+
+
+# iste putanje kao myblog/urls.py, samo sa async view-ovima gde postoje
+ASYNC_VIEWS = {
+    'blogposts': async_views.blogposts,
+    'post_details': async_views.post_details,
+    'comments': async_views.comments,
+    'comments_details': async_views.comments_details,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+    for pattern in urls.urlpatterns
+]
@@ -0,0 +1,154 @@
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Case, F, PositiveIntegerField, When
+
+from .cache import get_cache, get_timeout, invalidate_posts
+from .models import BlogPost
+
+
+# Brojac pregleda posta bez upisa u bazu po citanju. Svaki pregled:
+# - povecava ukupan broj u kesu (myblog:views:<pk>), koji se prikazuje kao `views`;
+# - povecava lokalni brojac u memoriji procesa.
+# Lokalni brojaci se na svakih BLOG_VIEW_FLUSH_SECONDS sekundi (ili kad ih
+# se skupi BLOG_VIEW_FLUSH_MAX) upisuju jednim UPDATE-om za sve postove.
+# Sortiranje po broju pregleda koristi upisane vrednosti iz baze, pa kasni
+# najvise jedan interval. Pregledi koji nisu upisani kad proces padne se
+# gube (pri normalnom gasenju se upisuju, atexit).
+
+_lock = threading.Lock()
+_pending = Counter()
+_pending_total = 0
+_last_flush = time.monotonic()
+_atexit_registered = False
+
+
+def get_flush_seconds():
+    return getattr(settings, 'BLOG_VIEW_FLUSH_SECONDS', 10)
+
+
+def get_flush_max():
+    return getattr(settings, 'BLOG_VIEW_FLUSH_MAX', 1000)
+
+
+def counts_revalidations():
+    # da li je i GET sa odgovorom 304 pregled (myblog/conditional.py, counts_view)
+    return getattr(settings, 'BLOG_VIEWS_COUNT_REVALIDATIONS', True)
+
+
+def total_key(pk):
+    return f'myblog:views:{pk}'
+
+
+def _add_pending(pk):
+    """Vraca True kad je vreme za upis u bazu."""
+    global _atexit_registered, _pending_total
+    with _lock:
+        _pending[pk] += 1
+        _pending_total += 1
+        if not _atexit_registered:
+            atexit.register(flush_views)
+            _atexit_registered = True
+        return (
+            _pending_total >= get_flush_max()
+            or time.monotonic() - _last_flush >= get_flush_seconds()
+        )
+
+
+def _pending_for(pk):
+    with _lock:
+        return _pending[pk]
+
+
+def record_view(pk):
+    """Belezi pregled posta `pk` i vraca novi ukupan broj pregleda."""
+    flush_due = _add_pending(pk)
+    cache = get_cache()
+    key = total_key(pk)
+    try:
+        total = cache.incr(key)
+    except ValueError:
+        # nema u kesu: upisano u bazi + ono sto ovaj proces jos nije upisao
+        persisted = BlogPost.objects.filter(id=pk).values_list('views', flat=True).first() or 0
+        total = persisted + _pending_for(pk)
+        if not cache.add(key, total, get_timeout()):
+            total = cache.incr(key)
+    if flush_due:
+        flush_views()
+    return total
+
+
+async def arecord_view(pk):
+    # isto kao record_view, za async view-ove (upis u bazu ide u thread)
+    flush_due = _add_pending(pk)
+    cache = get_cache()
+    key = total_key(pk)
+    try:
+        total = await cache.aincr(key)
+    except ValueError:
+        persisted = await BlogPost.objects.filter(id=pk).values_list('views', flat=True).afirst() or 0
+        total = persisted + _pending_for(pk)
+        if not await cache.aadd(key, total, get_timeout()):
+            total = await cache.aincr(key)
+    if flush_due:
+        await sync_to_async(flush_views)()
+    return total
+
+
+def current_views(posts):
+    """
+    `posts` je lista dict-ova sa 'id' i 'views' (upisano u bazi); vraca
+    id -> broj pregleda iz kesa, a za postove kojih nema u kesu upisani
+    broj + preglede koje ovaj proces jos nije upisao.
+    """
+    totals = get_cache().get_many([total_key(post['id']) for post in posts])
+    with _lock:
+        return {
+            post['id']: totals.get(total_key(post['id']), post['views'] + _pending.get(post['id'], 0))
+            for post in posts
+        }
+
+
+def with_current_views(posts, ids):
+    # lista postova iz serializer-a, `views` zamenjen trenutnim brojem; `ids`
+    # su id-jevi istim redom (iz redova upita), jer `id` ne mora biti u ?fields=
+    if not posts or 'views' not in posts[0]:
+        return posts
+    views = current_views([{'id': pk, 'views': post['views']} for pk, post in zip(ids, posts)])
+    return [{**post, 'views': views[pk]} for pk, post in zip(ids, posts)]
+
+
+def flush_views():
+    """Upisuje sve lokalne brojace jednim UPDATE-om; vraca broj postova."""
+    global _last_flush, _pending_total
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _pending_total = 0
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    # postovi sa istim brojem novih pregleda dele jedan WHEN
+    by_count = defaultdict(list)
+    for pk, count in pending.items():
+        by_count[count].append(pk)
+    whens = [When(id__in=ids, then=F('views') + count) for count, ids in by_count.items()]
+    try:
+        BlogPost.objects.filter(id__in=pending).update(
+            views=Case(*whens, default=F('views'), output_field=PositiveIntegerField())
+        )
+    except DatabaseError:
+        # baza zauzeta: brojaci se vracaju i upisuju sledeci put, citanje ne pada
+        with _lock:
+            _pending.update(pending)
+            _pending_total += sum(pending.values())
+        return 0
+    # lista sortirana po pregledima se menja
+    invalidate_posts()
+    return len(pending)
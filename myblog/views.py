@@ -1,26 +1,140 @@
+from datetime import datetime, time
 from django.shortcuts import render, redirect
 from .forms import RegisterUserForm
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
-from rest_framework.decorators import api_view
+from django.views.decorators.http import condition, require_safe
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.cache import patch_vary_headers
+from django.urls import reverse
+from functools import partial
+from rest_framework.decorators import api_view, authentication_classes, throttle_classes
 from .models import BlogPost, Comment
 from rest_framework.response import Response
 from rest_framework import status
-from .serializer import BlogPostSerializer, ComSerializer
+from .serializer import BlogPostSerializer, BlogPostSummarySerializer, ComSerializer
+from .pagination import BlogPostPagination, CommentPagination, SearchPagination
+from .search import search_rows, search_terms
+from .cache import cached_post_entry, get_response_cache, get_timeout, cache_stats as get_cache_stats
+from . import bulk, compression, conditional, documents, export, fastread, ingest, tokens, viewcounts
+from .authentication import SignedTokenAuthentication
+from .renderers import FastJSONRenderer
+from .throttling import COMMENT_THROTTLES, LOGIN_THROTTLES, rate_limit_login
+
+# ?fields=title,excerpt -> ['title', 'excerpt']
+def requested_fields(request):
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return [name.strip() for name in fields.split(',') if name.strip()]
+
+
+# lista postova: skracen prikaz bez sadrzaja ili samo trazena polja; redovi
+# su .values() sa kolonama serializer-a i kursora (myblog/fastread.py)
+def post_list_query(fields, paginator):
+    serializer_class = BlogPostSummarySerializer if fields is None else BlogPostSerializer
+    rows = fastread.values(BlogPost.objects.all(), serializer_class, fields, extra=paginator.ordering_fields())
+    return rows, serializer_class
+
+
+# ?order=views: najcitaniji prvo (upisani brojaci), inace najnoviji. Redosled
+# po pregledima je priblizan: upis brojaca izmedju dve strane pomera postove,
+# pa se post moze ponoviti ili preskociti (kursor je (views, id) sa prethodne strane)
+def post_paginator(request):
+    if request.query_params.get('order') == 'views':
+        return BlogPostPagination(ordering=('-views', '-id'))
+    return BlogPostPagination()
+
+
+# kesiran post sa trenutnim brojem pregleda (bez `views` se cita iz kesa brojaca)
+def with_views(data, views=None):
+    blog = data['blog']
+    if 'views' not in blog:
+        return data
+    if views is None:
+        views = viewcounts.current_views([blog])[blog['id']]
+    return {**data, 'blog': {**blog, 'views': views}}
+
+
+# gzip odgovora iz kesa (cached_post_entry): delovi tela oko broja pregleda
+# se kompresuju jednom i kesiraju uz podatke pod istim kljucem (verzijom
+# posta), a broj pregleda se umece po zahtevu (compression.gzip_splice)
+def cached_gzip(key, data):
+    cache = get_response_cache()
+    blog = data['blog']
+    entry = cache.get(key + ':gzip')
+    if entry is None:
+        static = {**data, 'blog': {**blog, 'views': None}} if 'views' in blog else data
+        parts = FastJSONRenderer().render(static).split(documents.VIEWS_PLACEHOLDER, 1)
+        entry = (parts, compression.deflate_parts(parts))
+        cache.set(key + ':gzip', entry, get_timeout())
+    parts, deflated = entry
+    values = [b'"views":%d' % blog['views']] if len(parts) > 1 else []
+    return compression.gzip_splice(parts, deflated, values)
+
+
+# kesirani bajtovi (gzip, dokument) odgovaraju samo FastJSONRenderer-u bez uvlacenja
+def renders_plain_json(request):
+    renderer = request.accepted_renderer
+    return isinstance(renderer, FastJSONRenderer) and renderer.get_indent(request.accepted_media_type, {}) is None
+
+
+def cached_response(request, key, data):
+    response = Response(data, status = status.HTTP_200_OK)
+    if renders_plain_json(request):
+        compression.precompressed(response, {'gzip': lambda: cached_gzip(key, data)})
+    return response
+
+
+# ?order=newest|oldest, ?cursor=, ?page_size= se odnose na komentare
+def comment_paginator(request):
+    if request.query_params.get('order') == 'newest':
+        return CommentPagination(ordering=('-created_at', '-id'))
+    return CommentPagination()
+
+
+def post_comments_query(pk, paginator):
+    comms = Comment.objects.filter(blog_post_id=pk)
+    return fastread.values(comms, ComSerializer, extra=paginator.ordering_fields())
+
+
+def post_with_comments_payload(post, comms, paginator, fields=None):
+    return {
+        'blog' : BlogPostSerializer(post, fields=fields).data,
+        'comms' : fastread.to_dicts(comms, ComSerializer),
+        'comments_count' : post.comment_count,
+        'comments_next' : paginator.get_next_link(),
+        'comments_previous' : paginator.get_previous_link(),
+    }
+
+
+# post sa autorom i jedna strana komentara (sa autorima), bez obzira na broj komentara
+def post_with_comments_data(request, pk, fields=None):
+    post = BlogPost.objects.select_related('author').get(id=pk)
+    paginator = comment_paginator(request)
+    comms = paginator.paginate_queryset(post_comments_query(pk, paginator), request)
+    return post_with_comments_payload(post, comms, paginator, fields)
+
 
 # POST
 
 # svi postovi i pravljenje novog
+@condition(etag_func=conditional.posts_etag, last_modified_func=conditional.posts_last_modified)
 @api_view(['POST','GET'])
 def blogposts(request):
     if request.method=='GET':
-        post_list  = BlogPost.objects.all()
-
-        if post_list.count == 0:
-            return Response({'detail':'Jos nema postova.'}, status = status.HTTP_200_OK)
-        
-        serializer = BlogPostSerializer(post_list, many = True)
-        return Response(serializer.data, status = status.HTTP_200_OK)
+        fields = requested_fields(request)
+        paginator = post_paginator(request)
+        post_list, serializer_class = post_list_query(fields, paginator)
+
+        post_list = paginator.paginate_queryset(post_list, request)
+        data = fastread.to_dicts(post_list, serializer_class, fields)
+        # id je uvek u redovima (kolona kursora), i kad nije u ?fields=
+        ids = [row['id'] for row in post_list]
+        return paginator.get_paginated_response(viewcounts.with_current_views(data, ids))
     
     elif request.method=='POST':
         if not request.user.is_authenticated:
@@ -39,27 +153,49 @@ def blogposts(request):
 
 
 
+# vise postova odjednom, lista u jednoj transakciji
+@api_view(['POST'])
+def blogposts_bulk(request):
+    if not request.user.is_authenticated:
+        return Response({'detail':'Morate biti ulogovani!'}, status = status.HTTP_401_UNAUTHORIZED)
+
+    if not request.user.is_staff:
+        return Response({'detail':'Nije vam dozvoljeno pisanje postova!'}, status=status.HTTP_403_FORBIDDEN)
+
+    validated_data, errors = bulk.validate_items(BlogPostSerializer, request.data, context={'request': request})
+    if not validated_data:
+        return Response({'created': [], 'errors': errors}, status = status.HTTP_400_BAD_REQUEST)
+
+    posts = bulk.create_posts(request.user, validated_data)
+    data = {
+        'created': BlogPostSerializer(posts, many=True).data,
+        'errors': errors,
+    }
+    return Response(data, status = status.HTTP_201_CREATED)
+
+
+
 #pokusaj spajanja details, update, delete
+@conditional.counts_view(conditional.document_state)
+@condition(etag_func=conditional.document_etag, last_modified_func=conditional.document_last_modified)
 @api_view(['PUT', 'GET', 'DELETE'])
 def post_details(request, pk):
     if request.method=='GET':
+        # podrazumevani JSON prikaz je gotov dokument (myblog/documents.py);
+        # bez dokumenta ili uz zastareo odgovor ide iz kesa
+        if documents.can_serve(request) and renders_plain_json(request):
+            doc = documents.document_for(pk, conditional.document_state(request, pk))
+            if doc is not None:
+                return documents.response(request, doc, conditional.view_count(request, pk))
+
         try:
-            post = BlogPost.objects.get(id=pk)
+            key, data = cached_post_entry(pk, 'detail', request, lambda: post_with_comments_data(
+                request, pk, fields=requested_fields(request)
+            ))
         except BlogPost.DoesNotExist:
             return Response({'details': 'Post ne postoji!'}, status=status.HTTP_404_NOT_FOUND)
 
-        blog_serializer = BlogPostSerializer(post)
-
-        comms = Comment.objects.filter(blog_post_id=pk)
-        comms_serializer = ComSerializer(comms, many=True)
-
-
-        data = {
-            'blog' : blog_serializer.data,
-            'comms' : comms_serializer.data,
-        }
-
-        return Response(data, status = status.HTTP_200_OK)
+        return cached_response(request, key, with_views(data, conditional.view_count(request, pk)))
 
 
 
@@ -70,7 +206,7 @@ def post_details(request, pk):
         if not request.user.is_staff:
             return Response({'details': 'Nije vam dozvoljeno menjanje posta!'}, status=status.HTTP_403_FORBIDDEN)
 
-        post = BlogPost.objects.get(id=pk)
+        post = BlogPost.objects.select_related('author').get(id=pk)
         serializer = BlogPostSerializer(instance=post, data = request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -93,26 +229,19 @@ def post_details(request, pk):
 
 # KOMENTARI
 
+@condition(etag_func=conditional.post_etag, last_modified_func=conditional.post_last_modified)
 @api_view(['POST', 'GET']) 
+@throttle_classes(COMMENT_THROTTLES)
 def comments(request, pk):
     if request.method == 'GET':
         try:
-            post = BlogPost.objects.get(id=pk)
+            key, data = cached_post_entry(pk, 'comments', request, lambda: post_with_comments_data(
+                request, pk
+            ))
         except BlogPost.DoesNotExist:
             return Response({'detail': 'Post ne postoji!'}, status=status.HTTP_404_NOT_FOUND)
 
-        blog_serializer = BlogPostSerializer(post)
-
-        comms = Comment.objects.filter(blog_post_id=pk)
-        comms_serializer = ComSerializer(comms, many=True)
-
-
-        data = {
-            'blog' : blog_serializer.data,
-            'comms' : comms_serializer.data,
-        }
-
-        return Response(data, status = status.HTTP_200_OK)
+        return cached_response(request, key, with_views(data))
 
 
     elif request.method == 'POST':
@@ -122,6 +251,8 @@ def comments(request, pk):
         serializer = ComSerializer(data=request.data, context={'request': request, 'pk': pk})
 
         if serializer.is_valid():
+            if ingest.enabled():
+                return ingest_comment(request, pk, serializer.validated_data)
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -129,11 +260,77 @@ def comments(request, pk):
 
 
 
+# write-behind: komentar ide u red (myblog/ingest.py), upis je u seriji
+def ingest_comment(request, pk, validated_data):
+    if not BlogPost.objects.filter(id=pk).exists():
+        return Response({'detail': 'Post ne postoji!'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        item = ingest.get_ingestor().submit(Comment(blog_post_id=pk, author=request.user, **validated_data))
+    except ingest.IngestQueueFull:
+        return Response({'detail': 'Previse komentara, pokusaj kasnije.'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+    # ?wait=1: odgovor tek kad je serija upisana
+    if request.query_params.get('wait') in ('1', 'true') and item.done.wait(ingest.get_wait_timeout()):
+        if item.error is not None:
+            return Response({'id': item.ticket, 'status': 'failed', 'detail': 'Komentar nije sacuvan.'},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(ComSerializer(item.comment).data, status=status.HTTP_201_CREATED)
+
+    data = {
+        'id': item.ticket,
+        'status': 'pending',
+        'url': request.build_absolute_uri(reverse('comments_ingest', args=[item.ticket])),
+    }
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+# stanje komentara iz reda: 202 dok ceka, 200 kad je upisan ili odbijen
+@api_view(['GET'])
+def comments_ingest(request, ticket):
+    state = ingest.get_status(ticket)
+    if state is None:
+        return Response({'detail': 'Nepoznat zahtev!'}, status=status.HTTP_404_NOT_FOUND)
+
+    data = {'id': ticket, **state}
+    if state['status'] == 'pending':
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+    if state['status'] == 'created':
+        com = Comment.objects.select_related('author').filter(id=state['comment']).first()
+        data['comment'] = ComSerializer(com).data if com else None
+    return Response(data, status=status.HTTP_200_OK)
+
+
+# vise komentara na post odjednom, lista u jednoj transakciji
+@api_view(['POST'])
+@throttle_classes(COMMENT_THROTTLES)
+def comments_bulk(request, pk):
+    if not request.user.is_authenticated:
+        return Response({'detail':'Nisi ulogovan!'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    if not BlogPost.objects.filter(id=pk).exists():
+        return Response({'detail': 'Post ne postoji!'}, status=status.HTTP_404_NOT_FOUND)
+
+    validated_data, errors = bulk.validate_items(ComSerializer, request.data, context={'request': request, 'pk': pk})
+    if not validated_data:
+        return Response({'created': [], 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    comms = bulk.create_comments(request.user, pk, validated_data)
+    data = {
+        'created': ComSerializer(comms, many=True).data,
+        'errors': errors,
+    }
+    return Response(data, status=status.HTTP_201_CREATED)
+
+
+
+@condition(etag_func=conditional.comment_etag, last_modified_func=conditional.comment_last_modified)
 @api_view(['GET','PUT','DELETE'])
 def comments_details(request, id):
     if request.method=='GET':
         try:
-            com = Comment.objects.get(id=id)
+            com = Comment.objects.select_related('author').get(id=id)
         except Comment.DoesNotExist:
             return Response({'detail': 'Komentar ne postoji!'}, status=status.HTTP_404_NOT_FOUND)
         
@@ -141,7 +338,7 @@ def comments_details(request, id):
         return Response(serializer.data, status=status.HTTP_200_OK)
     
     if request.method=='PUT':
-        com = Comment.objects.get(id=id)
+        com = Comment.objects.select_related('author').get(id=id)
         serializer = ComSerializer(com)
         if not request.user.is_authenticated:
             return Response({'detail': 'Nisi prijavljen'}, status=status.HTTP_401_UNAUTHORIZED)
@@ -164,12 +361,100 @@ def comments_details(request, id):
         if request.user != com.author:
             return Response({'detail': 'Nije dozvoljeno brisanje ovog komentara'}, status=status.HTTP_403_FORBIDDEN)
         
-        com.delete()
+        # brisanje i brojaci na postu zajedno
+        with transaction.atomic():
+            com.delete()
         return Response({'detail': 'Uspesno obrisano'}, status=status.HTTP_204_NO_CONTENT)
 
 
 
 
+# PRETRAGA
+
+@api_view(['GET'])
+def search(request):
+    query = request.query_params.get('q', '')
+    if not search_terms(query):
+        return Response({'detail':'Unesi pojam za pretragu.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    paginator = SearchPagination()
+    rows = paginator.paginate_queryset(partial(search_rows, query), request)
+    results = [{key: value for key, value in row.items() if key != 'rowid'} for row in rows]
+    return paginator.get_paginated_response(results)
+
+
+
+
+# FEED
+
+# Atom (podrazumevano) ili RSS (?format=rss) poslednjih postova, iz kesa
+@condition(etag_func=conditional.feed_etag, last_modified_func=conditional.feed_last_modified)
+@require_safe
+def feed(request):
+    state = conditional.feed_state(request)
+    response = HttpResponse(state['body'], content_type=state['content_type'])
+    return compression.precompressed(response, state.get('compressed', {}))
+
+
+
+# KES
+
+@api_view(['GET'])
+def cache_stats(request):
+    if not request.user.is_staff:
+        return Response({'detail':'Nije vam dozvoljeno!'}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response(get_cache_stats(), status=status.HTTP_200_OK)
+
+
+
+# IZVOZ
+
+# ?since=2024-05-01 ili ?since=2024-05-01T10:00:00+02:00
+def parse_since(value):
+    try:
+        since = parse_datetime(value)
+        if since is None:
+            date = parse_date(value)
+            if date is not None:
+                since = datetime.combine(date, time.min)
+    except ValueError:
+        return None
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+# ceo blog kao NDJSON (jedan post sa komentarima po redu), strimovano
+@api_view(['GET'])
+def export_posts(request):
+    if not request.user.is_staff:
+        return Response({'detail':'Nije vam dozvoljeno!'}, status=status.HTTP_403_FORBIDDEN)
+
+    since = None
+    if request.query_params.get('since'):
+        since = parse_since(request.query_params['since'])
+        if since is None:
+            return Response({'detail':'Neispravan since parametar.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # sledeci inkrementalni izvoz moze da krene od ovog trenutka
+    started = timezone.now()
+    lines = export.ndjson_lines(export.export_posts(since))
+    use_gzip = compression.negotiate(request.META.get('HTTP_ACCEPT_ENCODING'), ('gzip',)) == 'gzip'
+    if use_gzip:
+        lines = export.gzip_stream(lines)
+
+    response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="blog-export.ndjson"'
+    response['X-Export-Until'] = started.isoformat()
+    if use_gzip:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
+
+
+
+
 #USER
 
 def register_user(request):
@@ -187,6 +472,7 @@ def register_user(request):
     return render(request, 'register_user.html', {'form' : form})
 
 
+@rate_limit_login
 def login_user(request):
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -209,6 +495,41 @@ def login_user(request):
 
 
 
+# API token umesto sesije (Authorization: Bearer <token>)
+@api_view(['POST'])
+@authentication_classes([])
+@throttle_classes(LOGIN_THROTTLES)
+def login_token(request):
+    username = request.data.get('username')
+    password = request.data.get('password')
+
+    if not username or not password:
+        return Response({'detail':'Unesi korisnicko ime i lozinku'}, status = status.HTTP_400_BAD_REQUEST)
+
+    user = authenticate(request, username=username, password=password)
+    if user is None:
+        return Response({'detail':'Greska pri logovanju. Pokusaj ponovo.'}, status = status.HTTP_401_UNAUTHORIZED)
+
+    data = {
+        'token': tokens.issue_token(user),
+        'token_type': 'Bearer',
+        'expires_in': tokens.get_ttl(),
+    }
+    return Response(data, status = status.HTTP_200_OK)
+
+
+# opoziva token kojim je zahtev poslat
+@api_view(['POST'])
+@authentication_classes([SignedTokenAuthentication])
+def logout_token(request):
+    if request.auth is None:
+        return Response({'detail':'Morate biti ulogovani!'}, status = status.HTTP_401_UNAUTHORIZED)
+
+    tokens.revoke(request.auth)
+    return Response(status = status.HTTP_204_NO_CONTENT)
+
+
+
 def logout_user(request):
     if request.method == 'POST':
         logout(request)